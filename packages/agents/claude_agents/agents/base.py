@@ -1,9 +1,13 @@
 import logging
+import time
 import uuid
 from abc import ABC, abstractmethod
 from typing import Any, Callable, Dict, List, Optional, Union
 
 from ..api.client import ClaudeAPIClient
+from ..api.model_router import current_route
+from ..monitoring.tracing import record_usage
+from ..utils.context_packer import ContextItem, ContextPacker, to_compact_json
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +22,7 @@ class Agent(ABC):
         system_prompt: Optional[str] = None,
         temperature: float = 0.7,
         max_tokens: int = 4096,
+        context_token_budget: Optional[int] = 8000,
     ):
         """
         Initialize the base agent.
@@ -29,6 +34,8 @@ class Agent(ABC):
             system_prompt: System prompt for the agent
             temperature: Temperature for responses (0-1)
             max_tokens: Maximum tokens in the response
+            context_token_budget: Token budget for structured context in prompts
+                (None to include context in full)
         """
         self.id = str(uuid.uuid4())
         self.name = name
@@ -38,6 +45,10 @@ class Agent(ABC):
         self.temperature = temperature
         self.max_tokens = max_tokens
         self.history = []  # Will store message history
+        self.context_packer = ContextPacker(
+            token_counter=getattr(api_client, "token_counter", None),
+            budget=context_token_budget,
+        ) if context_token_budget is not None else None
         
     def _default_system_prompt(self) -> str:
         """Default system prompt based on agent role."""
@@ -57,6 +68,37 @@ class Agent(ABC):
         """
         pass
     
+    def _format_context(
+        self,
+        context: Any,
+        scores: Optional[Dict[str, float]] = None,
+        budget: Optional[int] = None,
+    ) -> str:
+        """
+        Format context for a prompt, packing it into the token budget.
+        
+        Args:
+            context: Text, a dictionary, a list of ContextItem or other JSON data
+            scores: Optional relevance scores by dictionary key
+            budget: Token budget (defaults to the agent's context budget)
+            
+        Returns:
+            Context text (compact JSON for structured context)
+        """
+        if isinstance(context, (str, int, float, bool)):
+            return str(context)
+        
+        if isinstance(context, dict):
+            items = ContextPacker.items_from_dict(context, scores)
+        elif isinstance(context, list) and context and all(isinstance(item, ContextItem) for item in context):
+            items = context
+        else:
+            return to_compact_json(context)
+        
+        if self.context_packer is None:
+            return to_compact_json({item.key: item.content for item in items})
+        return self.context_packer.render(items, budget)
+    
     def add_to_history(self, message: Dict[str, Any]) -> None:
         """
         Add a message to the agent's conversation history.
@@ -84,6 +126,7 @@ class Agent(ABC):
         messages: List[Dict[str, Any]],
         system: Optional[str] = None,
         tools: Optional[List[Dict[str, Any]]] = None,
+        record_history: bool = True,
     ) -> Dict[str, Any]:
         """
         Make a Claude API call with appropriate settings.
@@ -92,25 +135,87 @@ class Agent(ABC):
             messages: List of message objects
             system: Optional system message (defaults to agent's system prompt)
             tools: Optional tool definitions
+            record_history: Whether to add the response to the agent's history
+                (False for self-contained calls that may run concurrently)
             
         Returns:
             Claude API response
         """
         system = system or self.system_prompt
         
-        response = self.api_client.send_message(
-            messages=messages,
-            system=system,
-            max_tokens=self.max_tokens,
-            temperature=self.temperature,
-            tools=tools
-        )
+        # Use the model selected by an enclosing ModelRouter.route block, if any
+        route = current_route()
+        model_kwargs = {"model": route.model} if route else {}
+        
+        start_time = time.time()
+        try:
+            response = self.api_client.send_message(
+                messages=messages,
+                system=system,
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                tools=tools,
+                **model_kwargs
+            )
+        except Exception as e:
+            if route:
+                route.router.record_call(route.tier, None, time.time() - start_time, error=e)
+            raise
+        
+        if route:
+            route.router.record_call(route.tier, response, time.time() - start_time)
+        record_usage(response)
         
         # Add to history if not in streaming mode
-        self.add_to_history({
-            "role": "assistant",
-            "content": response.content[0].text
-        })
+        if record_history:
+            self.add_to_history({
+                "role": "assistant",
+                "content": response.content[0].text
+            })
+        
+        return response
+    
+    async def _call_claude_async(
+        self,
+        messages: List[Dict[str, Any]],
+        system: Optional[str] = None,
+        tools: Optional[List[Dict[str, Any]]] = None,
+    ) -> Any:
+        """
+        Make a Claude API call through an AsyncClaudeAPIClient.
+        
+        Async calls are self-contained: the response is not added to the
+        agent's history, since many tasks may share one agent concurrently.
+        
+        Args:
+            messages: List of message objects
+            system: Optional system message (defaults to agent's system prompt)
+            tools: Optional tool definitions
+            
+        Returns:
+            Claude API response
+        """
+        route = current_route()
+        model_kwargs = {"model": route.model} if route else {}
+        
+        start_time = time.time()
+        try:
+            response = await self.api_client.send_message_async(
+                messages=messages,
+                system=system or self.system_prompt,
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                tools=tools,
+                **model_kwargs
+            )
+        except Exception as e:
+            if route:
+                route.router.record_call(route.tier, None, time.time() - start_time, error=e)
+            raise
+        
+        if route:
+            route.router.record_call(route.tier, response, time.time() - start_time)
+        record_usage(response)
         
         return response
     
@@ -7,6 +7,167 @@ from .base import Agent
 
 logger = logging.getLogger(__name__)
 
+# Tool schemas are module-level constants so the serialized schemas are byte-identical
+# across calls and stay prompt-cacheable.
+EVALUATE_OUTPUT_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "evaluate_output",
+        "description": "Evaluate output quality and provide feedback",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "quality_score": {
+                    "type": "number",
+                    "description": "Overall quality score (0-10, where 10 is perfect)"
+                },
+                "correctness_score": {
+                    "type": "number",
+                    "description": "Correctness score (0-10, where 10 is completely correct)"
+                },
+                "completeness_score": {
+                    "type": "number",
+                    "description": "Completeness score (0-10, where 10 is fully complete)"
+                },
+                "issues": {
+                    "type": "array",
+                    "description": "List of identified issues or problems",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "severity": {
+                                "type": "string",
+                                "enum": ["critical", "major", "minor", "suggestion"],
+                                "description": "Severity of the issue"
+                            },
+                            "description": {
+                                "type": "string",
+                                "description": "Description of the issue"
+                            },
+                            "location": {
+                                "type": "string",
+                                "description": "Where the issue occurs (section, line number, etc.)"
+                            }
+                        },
+                        "required": ["severity", "description"]
+                    }
+                },
+                "strengths": {
+                    "type": "array",
+                    "description": "List of strengths or positive aspects",
+                    "items": {
+                        "type": "string"
+                    }
+                },
+                "improvement_suggestions": {
+                    "type": "array",
+                    "description": "Specific suggestions for improvement",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "area": {
+                                "type": "string",
+                                "description": "Area for improvement"
+                            },
+                            "suggestion": {
+                                "type": "string",
+                                "description": "Specific suggestion"
+                            }
+                        },
+                        "required": ["area", "suggestion"]
+                    }
+                },
+                "meets_requirements": {
+                    "type": "boolean",
+                    "description": "Whether the output meets the stated requirements"
+                },
+                "overall_feedback": {
+                    "type": "string", 
+                    "description": "Summary of evaluation and recommendations"
+                }
+            },
+            "required": [
+                "quality_score", 
+                "issues", 
+                "improvement_suggestions", 
+                "meets_requirements",
+                "overall_feedback"
+            ]
+        }
+    }
+}
+
+COMPARE_OUTPUTS_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "compare_outputs",
+        "description": "Compare multiple outputs and rank them",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "rankings": {
+                    "type": "array",
+                    "description": "Ranked outputs from best to worst",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "rank": {
+                                "type": "integer",
+                                "description": "Rank position (1 is best)"
+                            },
+                            "output_index": {
+                                "type": "integer",
+                                "description": "Index of the output (1-based)"
+                            },
+                            "score": {
+                                "type": "number",
+                                "description": "Quality score (0-10)"
+                            },
+                            "rationale": {
+                                "type": "string",
+                                "description": "Rationale for this ranking"
+                            }
+                        },
+                        "required": ["rank", "output_index", "rationale"]
+                    }
+                },
+                "comparison_criteria": {
+                    "type": "array",
+                    "description": "Criteria used for comparison",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "criterion": {
+                                "type": "string",
+                                "description": "Name of comparison criterion"
+                            },
+                            "weights": {
+                                "type": "number",
+                                "description": "Weight of this criterion (0-1)"
+                            },
+                            "description": {
+                                "type": "string",
+                                "description": "Description of how this criterion was applied"
+                            }
+                        },
+                        "required": ["criterion", "description"]
+                    }
+                },
+                "recommended_output": {
+                    "type": "integer",
+                    "description": "Index of the recommended output (1-based)"
+                },
+                "analysis": {
+                    "type": "string",
+                    "description": "Detailed analysis of the comparison"
+                }
+            },
+            "required": ["rankings", "recommended_output", "analysis"]
+        }
+    }
+}
+
+
 class CriticAgent(Agent):
     """
     Agent responsible for evaluating outputs, finding errors, and suggesting improvements.
@@ -20,6 +181,7 @@ class CriticAgent(Agent):
         temperature: float = 0.3,
         max_tokens: int = 4096,
         system_prompt: Optional[str] = None,
+        context_token_budget: Optional[int] = 8000,
     ):
         """
         Initialize the critic agent.
@@ -30,6 +192,8 @@ class CriticAgent(Agent):
             temperature: Temperature for responses (lower for more consistent evaluation)
             max_tokens: Maximum tokens in the response
             system_prompt: Custom system prompt (if None, a default is used)
+            context_token_budget: Token budget for structured outputs and requirements
+                (None to include them in full)
         """
         role = "evaluation, error detection, and quality improvement"
         super().__init__(
@@ -39,6 +203,7 @@ class CriticAgent(Agent):
             system_prompt=system_prompt,
             temperature=temperature,
             max_tokens=max_tokens,
+            context_token_budget=context_token_budget,
         )
     
     def _default_system_prompt(self) -> str:
@@ -63,109 +228,48 @@ class CriticAgent(Agent):
         Returns:
             Evaluation results with scores and feedback
         """
-        tools = [
-            {
-                "type": "function",
-                "function": {
-                    "name": "evaluate_output",
-                    "description": "Evaluate output quality and provide feedback",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "quality_score": {
-                                "type": "number",
-                                "description": "Overall quality score (0-10, where 10 is perfect)"
-                            },
-                            "correctness_score": {
-                                "type": "number",
-                                "description": "Correctness score (0-10, where 10 is completely correct)"
-                            },
-                            "completeness_score": {
-                                "type": "number",
-                                "description": "Completeness score (0-10, where 10 is fully complete)"
-                            },
-                            "issues": {
-                                "type": "array",
-                                "description": "List of identified issues or problems",
-                                "items": {
-                                    "type": "object",
-                                    "properties": {
-                                        "severity": {
-                                            "type": "string",
-                                            "enum": ["critical", "major", "minor", "suggestion"],
-                                            "description": "Severity of the issue"
-                                        },
-                                        "description": {
-                                            "type": "string",
-                                            "description": "Description of the issue"
-                                        },
-                                        "location": {
-                                            "type": "string",
-                                            "description": "Where the issue occurs (section, line number, etc.)"
-                                        }
-                                    },
-                                    "required": ["severity", "description"]
-                                }
-                            },
-                            "strengths": {
-                                "type": "array",
-                                "description": "List of strengths or positive aspects",
-                                "items": {
-                                    "type": "string"
-                                }
-                            },
-                            "improvement_suggestions": {
-                                "type": "array",
-                                "description": "Specific suggestions for improvement",
-                                "items": {
-                                    "type": "object",
-                                    "properties": {
-                                        "area": {
-                                            "type": "string",
-                                            "description": "Area for improvement"
-                                        },
-                                        "suggestion": {
-                                            "type": "string",
-                                            "description": "Specific suggestion"
-                                        }
-                                    },
-                                    "required": ["area", "suggestion"]
-                                }
-                            },
-                            "meets_requirements": {
-                                "type": "boolean",
-                                "description": "Whether the output meets the stated requirements"
-                            },
-                            "overall_feedback": {
-                                "type": "string", 
-                                "description": "Summary of evaluation and recommendations"
-                            }
-                        },
-                        "required": [
-                            "quality_score", 
-                            "issues", 
-                            "improvement_suggestions", 
-                            "meets_requirements",
-                            "overall_feedback"
-                        ]
-                    }
-                }
-            }
-        ]
+        tools = [EVALUATE_OUTPUT_TOOL]
+        
+        # Add to history
+        self.add_to_history(self._evaluation_request(output, requirements))
         
+        # Make API call with tool
+        response = self._call_claude(
+            messages=self.history,
+            tools=tools
+        )
+        
+        return self._extract_evaluation(response)
+    
+    async def process_async(self, output: Any, requirements: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Evaluate an output without using the shared history (for use with an async API client).
+        
+        Args:
+            output: The output to evaluate (text, code, or structured data)
+            requirements: Optional requirements to evaluate against
+            
+        Returns:
+            Evaluation results with scores and feedback
+        """
+        response = await self._call_claude_async(
+            messages=[self._evaluation_request(output, requirements)],
+            tools=[EVALUATE_OUTPUT_TOOL]
+        )
+        
+        return self._extract_evaluation(response)
+    
+    def _evaluation_request(self, output: Any, requirements: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Build the user message asking for an output to be evaluated."""
         # Format output and requirements for prompt
-        output_str = str(output) if isinstance(output, (str, int, float, bool)) else json.dumps(output, indent=2)
+        output_str = self._format_context(output)
         
         # Format requirements if present
         req_str = ""
         if requirements:
-            if isinstance(requirements, str):
-                req_str = requirements
-            else:
-                req_str = json.dumps(requirements, indent=2)
+            req_str = self._format_context(requirements)
         
-        # Add to history
-        self.add_to_history({
+        return {
             "role": "user",
             "content": (
                 f"Please evaluate the following output:\n\n"
@@ -173,14 +277,62 @@ class CriticAgent(Agent):
                 f"{f'REQUIREMENTS:\n```\n{req_str}\n```\n\n' if req_str else ''}"
                 f"Provide a detailed evaluation identifying issues, strengths, and suggestions for improvement."
             )
-        })
+        }
+    
+    def evaluate_step(
+        self,
+        step: Dict[str, Any],
+        result: Any,
+        objective: str = "",
+    ) -> Dict[str, Any]:
+        """
+        Evaluate the result of a single plan step.
+        
+        Unlike process, this does not use or extend the agent's conversation
+        history, so steps can be evaluated concurrently as their results arrive.
+        
+        Args:
+            step: Step definition from a plan
+            result: The step's execution result
+            objective: Overall plan objective
+            
+        Returns:
+            Evaluation results with scores and feedback
+        """
+        result_str = self._format_context(result)
+        objective_str = f"PLAN OBJECTIVE: {objective}\n" if objective else ""
+        
+        messages = [{
+            "role": "user",
+            "content": (
+                f"Please evaluate the result of the following step of a larger plan:\n\n"
+                f"{objective_str}"
+                f"STEP: {step.get('description', '')}\n"
+                f"EXPECTED OUTCOME: {step.get('expected_outcome', '')}\n\n"
+                f"RESULT:\n```\n{result_str}\n```\n\n"
+                f"Judge only whether this step achieved its expected outcome. "
+                f"Be concise and identify any issues that would require refining the plan."
+            )
+        }]
         
-        # Make API call with tool
         response = self._call_claude(
-            messages=self.history,
-            tools=tools
+            messages=messages,
+            tools=[EVALUATE_OUTPUT_TOOL],
+            record_history=False
         )
         
+        return self._extract_evaluation(response)
+    
+    def _extract_evaluation(self, response: Any) -> Dict[str, Any]:
+        """
+        Extract an evaluation from a Claude response.
+        
+        Args:
+            response: Claude API response
+            
+        Returns:
+            Evaluation results with scores and feedback
+        """
         # Extract evaluation from tool calls if present
         evaluation = {}
         if hasattr(response, 'tool_calls') and response.tool_calls:
@@ -234,88 +386,18 @@ class CriticAgent(Agent):
         """
         # Format outputs for prompt
         outputs_str = ""
+        # Each output gets an equal share of the context budget
+        output_budget = None
+        if self.context_packer is not None:
+            output_budget = self.context_packer.budget // max(len(outputs), 1)
         for i, output in enumerate(outputs, 1):
-            output_text = str(output) if isinstance(output, (str, int, float, bool)) else json.dumps(output, indent=2)
+            output_text = self._format_context(output, budget=output_budget)
             outputs_str += f"OUTPUT {i}:\n```\n{output_text}\n```\n\n"
         
         # Format requirements if present
         req_str = ""
         if requirements:
-            if isinstance(requirements, str):
-                req_str = requirements
-            else:
-                req_str = json.dumps(requirements, indent=2)
-        
-        # Define comparison tool
-        comparison_tool = {
-            "type": "function",
-            "function": {
-                "name": "compare_outputs",
-                "description": "Compare multiple outputs and rank them",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "rankings": {
-                            "type": "array",
-                            "description": "Ranked outputs from best to worst",
-                            "items": {
-                                "type": "object",
-                                "properties": {
-                                    "rank": {
-                                        "type": "integer",
-                                        "description": "Rank position (1 is best)"
-                                    },
-                                    "output_index": {
-                                        "type": "integer",
-                                        "description": "Index of the output (1-based)"
-                                    },
-                                    "score": {
-                                        "type": "number",
-                                        "description": "Quality score (0-10)"
-                                    },
-                                    "rationale": {
-                                        "type": "string",
-                                        "description": "Rationale for this ranking"
-                                    }
-                                },
-                                "required": ["rank", "output_index", "rationale"]
-                            }
-                        },
-                        "comparison_criteria": {
-                            "type": "array",
-                            "description": "Criteria used for comparison",
-                            "items": {
-                                "type": "object",
-                                "properties": {
-                                    "criterion": {
-                                        "type": "string",
-                                        "description": "Name of comparison criterion"
-                                    },
-                                    "weights": {
-                                        "type": "number",
-                                        "description": "Weight of this criterion (0-1)"
-                                    },
-                                    "description": {
-                                        "type": "string",
-                                        "description": "Description of how this criterion was applied"
-                                    }
-                                },
-                                "required": ["criterion", "description"]
-                            }
-                        },
-                        "recommended_output": {
-                            "type": "integer",
-                            "description": "Index of the recommended output (1-based)"
-                        },
-                        "analysis": {
-                            "type": "string",
-                            "description": "Detailed analysis of the comparison"
-                        }
-                    },
-                    "required": ["rankings", "recommended_output", "analysis"]
-                }
-            }
-        }
+            req_str = self._format_context(requirements)
         
         # Add to history
         self.add_to_history({
@@ -331,7 +413,7 @@ class CriticAgent(Agent):
         # Make API call with tool
         response = self._call_claude(
             messages=self.history,
-            tools=[comparison_tool]
+            tools=[COMPARE_OUTPUTS_TOOL]
         )
         
         # Extract comparison from tool calls if present
@@ -3,6 +3,7 @@ import logging
 from typing import Any, Callable, Dict, List, Optional, Union
 
 from ..api.client import ClaudeAPIClient
+from ..utils.context_packer import ContextItem
 from .base import Agent
 
 logger = logging.getLogger(__name__)
@@ -21,6 +22,7 @@ class ExecutorAgent(Agent):
         max_tokens: int = 4096,
         system_prompt: Optional[str] = None,
         tools: Optional[List[Dict[str, Any]]] = None,
+        context_token_budget: Optional[int] = 8000,
     ):
         """
         Initialize the executor agent.
@@ -32,6 +34,7 @@ class ExecutorAgent(Agent):
             max_tokens: Maximum tokens in the response
             system_prompt: Custom system prompt (if None, a default is used)
             tools: Optional list of tool definitions the executor can use
+            context_token_budget: Token budget for task context (None to include it in full)
         """
         role = "executing tasks and producing concrete outputs"
         super().__init__(
@@ -41,6 +44,7 @@ class ExecutorAgent(Agent):
             system_prompt=system_prompt,
             temperature=temperature,
             max_tokens=max_tokens,
+            context_token_budget=context_token_budget,
         )
         self.tools = tools or []
         self.tool_callbacks = {}  # Map of tool name to callback function
@@ -77,44 +81,87 @@ class ExecutorAgent(Agent):
         
         logger.info(f"Registered tool '{tool_name}' with executor agent")
     
-    def process(self, task: Dict[str, Any]) -> Dict[str, Any]:
+    def process(self, task: Dict[str, Any], isolated: bool = False) -> Dict[str, Any]:
         """
         Process a task and execute it.
         
+        Args:
+            task: Task definition with description and any required context.
+                Context may be text, a dictionary (optionally with relevance
+                scores by key in "context_scores") or a list of ContextItem.
+            isolated: Whether to execute the task in its own context: only this
+                task's prompt is sent and the shared history is left untouched,
+                so concurrent calls are safe and prompts don't grow with history
+            
+        Returns:
+            Execution results
+        """
+        task_message = self._task_request(task)
+        
+        if isolated:
+            messages = [task_message]
+        else:
+            # Add to history
+            self.add_to_history(task_message)
+            messages = self.history
+        
+        # Make API call with tools
+        response = self._call_claude(
+            messages=messages,
+            tools=self.tools,
+            record_history=not isolated
+        )
+        
+        return self._process_response(task, response)
+    
+    async def process_async(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Execute a task in its own context through an async API client.
+        
         Args:
             task: Task definition with description and any required context
             
         Returns:
             Execution results
         """
+        response = await self._call_claude_async(
+            messages=[self._task_request(task)],
+            tools=self.tools
+        )
+        
+        return self._process_response(task, response)
+    
+    def _task_request(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the user message asking for a task to be executed."""
         # Prepare task description
         task_description = task.get("description", "")
         task_context = task.get("context", {})
         
-        # Format context as string if needed
+        # Format context as string if needed, keeping it within the token budget
         context_str = ""
         if task_context:
-            if isinstance(task_context, str):
-                context_str = task_context
-            else:
-                context_str = json.dumps(task_context, indent=2)
+            context_str = self._format_context(task_context, task.get("context_scores"))
         
-        # Add to history
-        self.add_to_history({
+        return {
             "role": "user",
             "content": (
                 f"Please execute the following task:\n\n"
                 f"TASK: {task_description}\n\n"
                 f"{f'CONTEXT:\n{context_str}' if context_str else ''}"
             )
-        })
-        
-        # Make API call with tools
-        response = self._call_claude(
-            messages=self.history,
-            tools=self.tools
-        )
+        }
+    
+    def _process_response(self, task: Dict[str, Any], response: Any) -> Dict[str, Any]:
+        """
+        Collect the completion and run any tool calls from a task response.
         
+        Args:
+            task: The executed task
+            response: Claude API response
+            
+        Returns:
+            Execution results
+        """
         # Process tool calls if present
         execution_results = {
             "task_id": task.get("id", "unknown"),
@@ -170,21 +217,48 @@ class ExecutorAgent(Agent):
         Returns:
             Step execution results
         """
+        # Execute the task in its own context, so parallel steps don't share history
+        result = self.process(self._step_task(step, plan_context), isolated=True)
+        
+        return self._step_result(step, result)
+    
+    async def process_step_async(self, step: Dict[str, Any], plan_context: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Process a specific step from a plan through an async API client.
+        
+        Args:
+            step: Step definition from a plan
+            plan_context: Overall plan context and previous results
+            
+        Returns:
+            Step execution results
+        """
+        result = await self.process_async(self._step_task(step, plan_context))
+        
+        return self._step_result(step, result)
+    
+    def _step_task(self, step: Dict[str, Any], plan_context: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the task for a plan step."""
+        # Each step sees only the results of the steps it declares as dependencies
+        context = [
+            ContextItem("plan_objective", plan_context.get("objective", ""), score=10.0, truncatable=False),
+            ContextItem("expected_outcome", step.get("expected_outcome", ""), score=10.0, truncatable=False),
+        ]
+        previous_results = plan_context.get("previous_results", {})
+        for dependency in step.get("dependencies", []):
+            if dependency in previous_results:
+                context.append(ContextItem(f"previous_results.{dependency}", previous_results[dependency]))
+        
         # Format task for this specific step
-        task = {
+        return {
             "id": step.get("id", "unknown_step"),
             "description": step.get("description", ""),
-            "context": {
-                "plan_objective": plan_context.get("objective", ""),
-                "expected_outcome": step.get("expected_outcome", ""),
-                "previous_results": plan_context.get("previous_results", {}),
-                # Add any other relevant context
-            }
+            "context": context
         }
-        
-        # Execute the task
-        result = self.process(task)
-        
+    
+    @staticmethod
+    def _step_result(step: Dict[str, Any], result: Dict[str, Any]) -> Dict[str, Any]:
+        """Add step-specific metadata to a task result."""
         # Add step-specific metadata
         result["step_id"] = step.get("id", "unknown_step")
         result["step_description"] = step.get("description", "")
@@ -3,10 +3,72 @@ import logging
 from typing import Any, Dict, List, Optional, Union
 
 from ..api.client import ClaudeAPIClient
+from ..utils.context_packer import to_compact_json
 from .base import Agent
 
 logger = logging.getLogger(__name__)
 
+# Tool schema shared by process and refine_plan. Kept as a module-level constant so
+# the serialized schema is byte-identical across calls and stays prompt-cacheable.
+CREATE_PLAN_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "create_plan",
+        "description": "Create a structured plan with steps and metadata",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "objective": {
+                    "type": "string",
+                    "description": "Refined main objective of the task"
+                },
+                "steps": {
+                    "type": "array",
+                    "description": "Ordered list of steps to complete the objective",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "id": {
+                                "type": "string",
+                                "description": "Unique step identifier (e.g., 'step_1')"
+                            },
+                            "description": {
+                                "type": "string",
+                                "description": "Clear description of the step"
+                            },
+                            "expected_outcome": {
+                                "type": "string",
+                                "description": "What should be achieved after this step"
+                            },
+                            "dependencies": {
+                                "type": "array",
+                                "description": "IDs of steps that must be completed before this one",
+                                "items": {
+                                    "type": "string"
+                                }
+                            }
+                        },
+                        "required": ["id", "description", "expected_outcome"]
+                    }
+                },
+                "estimated_completion_time": {
+                    "type": "string",
+                    "description": "Estimated time to complete the full plan"
+                },
+                "potential_challenges": {
+                    "type": "array",
+                    "description": "Potential issues that might arise",
+                    "items": {
+                        "type": "string"
+                    }
+                }
+            },
+            "required": ["objective", "steps"]
+        }
+    }
+}
+
+
 class PlannerAgent(Agent):
     """
     Agent responsible for developing plans and decomposing tasks into subtasks.
@@ -61,75 +123,10 @@ class PlannerAgent(Agent):
         Returns:
             Structured plan with steps, dependencies, and metadata
         """
-        tools = [
-            {
-                "type": "function",
-                "function": {
-                    "name": "create_plan",
-                    "description": "Create a structured plan with steps and metadata",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "objective": {
-                                "type": "string",
-                                "description": "Refined main objective of the task"
-                            },
-                            "steps": {
-                                "type": "array",
-                                "description": "Ordered list of steps to complete the objective",
-                                "items": {
-                                    "type": "object",
-                                    "properties": {
-                                        "id": {
-                                            "type": "string",
-                                            "description": "Unique step identifier (e.g., 'step_1')"
-                                        },
-                                        "description": {
-                                            "type": "string",
-                                            "description": "Clear description of the step"
-                                        },
-                                        "expected_outcome": {
-                                            "type": "string",
-                                            "description": "What should be achieved after this step"
-                                        },
-                                        "dependencies": {
-                                            "type": "array",
-                                            "description": "IDs of steps that must be completed before this one",
-                                            "items": {
-                                                "type": "string"
-                                            }
-                                        }
-                                    },
-                                    "required": ["id", "description", "expected_outcome"]
-                                }
-                            },
-                            "estimated_completion_time": {
-                                "type": "string",
-                                "description": "Estimated time to complete the full plan"
-                            },
-                            "potential_challenges": {
-                                "type": "array",
-                                "description": "Potential issues that might arise",
-                                "items": {
-                                    "type": "string"
-                                }
-                            }
-                        },
-                        "required": ["objective", "steps"]
-                    }
-                }
-            }
-        ]
+        tools = [CREATE_PLAN_TOOL]
         
         # Add to history
-        self.add_to_history({
-            "role": "user",
-            "content": (
-                f"I need a detailed plan for the following task:\n\n"
-                f"{task_description}\n\n"
-                f"Please break it down into clear, logical steps with dependencies where appropriate."
-            )
-        })
+        self.add_to_history(self._plan_request(task_description))
         
         # Make API call with tool
         response = self._call_claude(
@@ -137,6 +134,47 @@ class PlannerAgent(Agent):
             tools=tools
         )
         
+        return self._extract_plan(response, task_description)
+    
+    async def process_async(self, task_description: str) -> Dict[str, Any]:
+        """
+        Create a plan without using the shared history (for use with an async API client).
+        
+        Args:
+            task_description: Description of the task to plan for
+            
+        Returns:
+            Structured plan with steps, dependencies, and metadata
+        """
+        response = await self._call_claude_async(
+            messages=[self._plan_request(task_description)],
+            tools=[CREATE_PLAN_TOOL]
+        )
+        
+        return self._extract_plan(response, task_description)
+    
+    def _plan_request(self, task_description: str) -> Dict[str, Any]:
+        """Build the user message asking for a plan."""
+        return {
+            "role": "user",
+            "content": (
+                f"I need a detailed plan for the following task:\n\n"
+                f"{task_description}\n\n"
+                f"Please break it down into clear, logical steps with dependencies where appropriate."
+            )
+        }
+    
+    def _extract_plan(self, response: Any, task_description: str) -> Dict[str, Any]:
+        """
+        Extract a plan from a Claude response.
+        
+        Args:
+            response: Claude API response
+            task_description: Description of the task being planned
+            
+        Returns:
+            Structured plan with steps, dependencies, and metadata
+        """
         # Extract plan from tool calls if present
         plan = {}
         if hasattr(response, 'tool_calls') and response.tool_calls:
@@ -186,80 +224,11 @@ class PlannerAgent(Agent):
         Returns:
             Refined plan
         """
-        # Convert plan to string for prompt
-        plan_str = json.dumps(original_plan, indent=2)
-        
         # Add to history
-        self.add_to_history({
-            "role": "user",
-            "content": (
-                f"Please refine the following plan based on this feedback:\n\n"
-                f"ORIGINAL PLAN:\n```json\n{plan_str}\n```\n\n"
-                f"FEEDBACK:\n{feedback}\n\n"
-                f"Please provide an improved version of the plan addressing the feedback."
-            )
-        })
+        self.add_to_history(self._refine_request(original_plan, feedback))
         
         # Use the same tools as in process
-        tools = [
-            {
-                "type": "function",
-                "function": {
-                    "name": "create_plan",
-                    "description": "Create a structured plan with steps and metadata",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "objective": {
-                                "type": "string",
-                                "description": "Refined main objective of the task"
-                            },
-                            "steps": {
-                                "type": "array",
-                                "description": "Ordered list of steps to complete the objective",
-                                "items": {
-                                    "type": "object",
-                                    "properties": {
-                                        "id": {
-                                            "type": "string",
-                                            "description": "Unique step identifier (e.g., 'step_1')"
-                                        },
-                                        "description": {
-                                            "type": "string",
-                                            "description": "Clear description of the step"
-                                        },
-                                        "expected_outcome": {
-                                            "type": "string",
-                                            "description": "What should be achieved after this step"
-                                        },
-                                        "dependencies": {
-                                            "type": "array",
-                                            "description": "IDs of steps that must be completed before this one",
-                                            "items": {
-                                                "type": "string"
-                                            }
-                                        }
-                                    },
-                                    "required": ["id", "description", "expected_outcome"]
-                                }
-                            },
-                            "estimated_completion_time": {
-                                "type": "string",
-                                "description": "Estimated time to complete the full plan"
-                            },
-                            "potential_challenges": {
-                                "type": "array",
-                                "description": "Potential issues that might arise",
-                                "items": {
-                                    "type": "string"
-                                }
-                            }
-                        },
-                        "required": ["objective", "steps"]
-                    }
-                }
-            }
-        ]
+        tools = [CREATE_PLAN_TOOL]
         
         # Make API call with tool
         response = self._call_claude(
@@ -267,6 +236,52 @@ class PlannerAgent(Agent):
             tools=tools
         )
         
+        return self._extract_refined_plan(response, original_plan)
+    
+    async def refine_plan_async(self, original_plan: Dict[str, Any], feedback: str) -> Dict[str, Any]:
+        """
+        Refine a plan without using the shared history (for use with an async API client).
+        
+        Args:
+            original_plan: The original plan to refine
+            feedback: Feedback about the plan
+            
+        Returns:
+            Refined plan
+        """
+        response = await self._call_claude_async(
+            messages=[self._refine_request(original_plan, feedback)],
+            tools=[CREATE_PLAN_TOOL]
+        )
+        
+        return self._extract_refined_plan(response, original_plan)
+    
+    def _refine_request(self, original_plan: Dict[str, Any], feedback: str) -> Dict[str, Any]:
+        """Build the user message asking for a refined plan."""
+        # Convert plan to compact string for prompt
+        plan_str = to_compact_json(original_plan)
+        
+        return {
+            "role": "user",
+            "content": (
+                f"Please refine the following plan based on this feedback:\n\n"
+                f"ORIGINAL PLAN:\n```json\n{plan_str}\n```\n\n"
+                f"FEEDBACK:\n{feedback}\n\n"
+                f"Please provide an improved version of the plan addressing the feedback."
+            )
+        }
+    
+    def _extract_refined_plan(self, response: Any, original_plan: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Extract a refined plan from a Claude response.
+        
+        Args:
+            response: Claude API response
+            original_plan: The plan being refined (returned if extraction fails)
+            
+        Returns:
+            Refined plan
+        """
         # Extract plan from tool calls if present
         refined_plan = {}
         if hasattr(response, 'tool_calls') and response.tool_calls:
@@ -0,0 +1,272 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, AsyncIterator, Deque, Dict, List, Optional
+
+import anthropic
+from anthropic import AsyncAnthropic
+from anthropic.types import Message, MessageParam
+
+from ..monitoring.tracing import record_queue_wait
+from ..utils.token_optimizer import TokenOptimizer
+from .client import ClaudeAPIClient
+from .rate_limiter import RateLimiter
+
+if TYPE_CHECKING:
+    from ..monitoring.dashboard import AgentMonitor
+
+logger = logging.getLogger(__name__)
+
+# Key of the task an async call is made for, used to share the in-flight budget
+# fairly between tasks. Set by the async pipeline for each task it runs; asyncio
+# copies it into every coroutine the task spawns.
+current_task_key: ContextVar[str] = ContextVar("current_task_key", default="default")
+
+class FairConcurrencyBudget:
+    """
+    Global cap on in-flight API calls, shared fairly between tasks.
+
+    Calls over the cap wait in one queue per task key. When a call finishes,
+    its slot is handed to the next waiting task in round-robin order, so a
+    task with many parallel steps cannot starve tasks with few.
+    """
+
+    def __init__(self, max_in_flight: int = 10):
+        """
+        Initialize the budget.
+
+        Args:
+            max_in_flight: Maximum number of calls in flight at once
+        """
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+
+        self.max_in_flight = max_in_flight
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._waiters: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._acquired: Dict[str, int] = {}
+
+    async def acquire(self, key: Optional[str] = None) -> None:
+        """
+        Wait for a free slot.
+
+        Args:
+            key: Task key to queue under (defaults to current_task_key)
+        """
+        key = key or current_task_key.get()
+
+        if self._in_flight < self.max_in_flight and not self._waiters:
+            self._in_flight += 1
+            self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.setdefault(key, deque()).append(future)
+            try:
+                await future
+            except asyncio.CancelledError:
+                # A slot handed over just before cancellation must be passed on
+                if future.done() and not future.cancelled():
+                    self.release()
+                raise
+
+        self._acquired[key] = self._acquired.get(key, 0) + 1
+
+    def release(self) -> None:
+        """Release a slot, handing it to the next task in round-robin order."""
+        while self._waiters:
+            key, queue = next(iter(self._waiters.items()))
+            future = queue.popleft()
+            if queue:
+                self._waiters.move_to_end(key)
+            else:
+                del self._waiters[key]
+
+            # Skip waiters that were cancelled while queued
+            if not future.done():
+                future.set_result(None)
+                return
+
+        self._in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self, key: Optional[str] = None) -> AsyncIterator[None]:
+        """
+        Hold a slot for the duration of a block.
+
+        Args:
+            key: Task key to queue under (defaults to current_task_key)
+        """
+        await self.acquire(key)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get current budget usage.
+
+        Returns:
+            Dictionary with calls in flight (now and at peak), waiting calls
+            per task and calls started per task
+        """
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self._in_flight,
+            "peak_in_flight": self._peak_in_flight,
+            "waiting": {
+                key: sum(not future.done() for future in queue)
+                for key, queue in self._waiters.items()
+            },
+            "acquired": dict(self._acquired),
+        }
+
+class AsyncClaudeAPIClient(ClaudeAPIClient):
+    """
+    Claude API client with an asyncio interface for running many tasks in one event loop.
+
+    Adds send_message_async, which paces calls with the rate limiter without
+    blocking the loop and caps in-flight calls with a FairConcurrencyBudget.
+    The synchronous interface of ClaudeAPIClient remains available.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: str = "claude-3-opus-20240229",
+        max_retries: int = 5,
+        backoff_factor: float = 1.5,
+        max_tokens: int = 4096,
+        prompt_caching: bool = True,
+        rate_limiter: Optional[RateLimiter] = None,
+        base_url: Optional[str] = None,
+        monitor: Optional["AgentMonitor"] = None,
+        budget: Optional[FairConcurrencyBudget] = None,
+        max_in_flight: int = 10,
+    ):
+        """
+        Initialize the async Claude API client.
+
+        Args:
+            api_key: Claude API key (defaults to ANTHROPIC_API_KEY environment variable)
+            model: Claude model to use
+            max_retries: Maximum number of retries for failed API calls
+            backoff_factor: Exponential backoff factor for retries
+            max_tokens: Maximum number of tokens in the response
+            prompt_caching: Whether to mark stable prompt prefixes as cacheable
+            rate_limiter: Optional rate limiter used to pace calls to every
+                model (defaults to the process-wide limiter of each model)
+            base_url: Optional API base URL (e.g. a local stub server for offline tests)
+            monitor: Optional AgentMonitor that receives exact per-call usage and latency
+            budget: Optional in-flight call budget (e.g. shared between clients)
+            max_in_flight: Maximum calls in flight when no budget is given
+        """
+        super().__init__(
+            api_key=api_key,
+            model=model,
+            max_retries=max_retries,
+            backoff_factor=backoff_factor,
+            max_tokens=max_tokens,
+            prompt_caching=prompt_caching,
+            rate_limiter=rate_limiter,
+            base_url=base_url,
+            monitor=monitor,
+        )
+
+        self.async_client = AsyncAnthropic(api_key=self.api_key, base_url=base_url)
+        self.budget = budget or FairConcurrencyBudget(max_in_flight=max_in_flight)
+
+    async def send_message_async(
+        self,
+        messages: List[MessageParam],
+        system: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        temperature: float = 0.7,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        cache_prefix: Optional[bool] = None,
+        model: Optional[str] = None,
+    ) -> Message:
+        """
+        Send a message to Claude with retry logic, without blocking the event loop.
+
+        Args:
+            messages: List of message objects for the conversation
+            system: System prompt for Claude
+            max_tokens: Maximum number of tokens to generate (overrides default)
+            temperature: Sampling temperature (0-1)
+            tools: Optional list of tool definitions
+            cache_prefix: Optional override for prompt_caching on this call
+            model: Optional model override for this call (defaults to the client's model)
+
+        Returns:
+            Claude API response
+        """
+        attempts = 0
+        max_tokens = max_tokens or self.max_tokens
+        use_prompt_cache = self.prompt_caching if cache_prefix is None else cache_prefix
+
+        params = {
+            "model": model or self.model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+        }
+        if system:
+            params["system"] = system
+        if tools:
+            params["tools"] = tools
+
+        # Mark the stable prompt prefix as cacheable
+        if use_prompt_cache:
+            params = TokenOptimizer.apply_prompt_caching(params)
+
+        while attempts < self.max_retries:
+            # Pace the request, then wait for a slot in the in-flight budget
+            waited = await self._rate_limiter(params["model"]).acquire_async(
+                input_tokens=RateLimiter.estimate_input_tokens(params),
+                output_tokens=max_tokens
+            )
+            record_queue_wait(waited)
+
+            start_time = time.time()
+            try:
+                async with self.budget.slot():
+                    raw_response = await self.async_client.messages.with_raw_response.create(**params)
+                self._rate_limiter(params["model"]).update_from_headers(raw_response.headers)
+                response = raw_response.parse()
+                self._report_call(response, time.time() - start_time)
+                return response
+
+            except anthropic.APIError as e:
+                attempts += 1
+                self._report_call(None, time.time() - start_time, error=e)
+
+                # Failed responses carry rate limit headers too
+                response_headers = getattr(getattr(e, "response", None), "headers", None)
+                self._rate_limiter(params["model"]).update_from_headers(response_headers)
+
+                if attempts >= self.max_retries:
+                    logger.error(f"Max retries exceeded. Last error: {str(e)}")
+                    raise
+
+                status_code = getattr(e, "status_code", None)
+
+                # Hold back every caller sharing the limiter
+                if status_code == 429:
+                    if not (response_headers and response_headers.get("retry-after")):
+                        self._rate_limiter(params["model"]).penalize(self._exponential_backoff(attempts))
+                    logger.warning("Rate limited. Retrying once the rate limiter allows it...")
+                    continue
+
+                if status_code is None or status_code >= 500:
+                    backoff_time = self._exponential_backoff(attempts)
+                    logger.warning(f"Server error {status_code}. Retrying in {backoff_time} seconds...")
+                    await asyncio.sleep(backoff_time)
+                    continue
+
+                logger.error(f"API error: {str(e)}")
+                raise
@@ -1,15 +1,24 @@
 import logging
 import os
 import time
-from typing import Any, Dict, List, Optional, Union
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
 
 import anthropic
 from anthropic import Anthropic
 from anthropic.types import Message, MessageParam
 
+from ..monitoring.tracing import record_queue_wait
+from ..utils.token_counter import TokenCounter
+from ..utils.token_optimizer import TokenOptimizer
+from .rate_limiter import RateLimiter
+from .resilience import CircuitBreaker, ResilientClientMixin
+
+if TYPE_CHECKING:
+    from ..monitoring.dashboard import AgentMonitor
+
 logger = logging.getLogger(__name__)
 
-class ClaudeAPIClient:
+class ClaudeAPIClient(ResilientClientMixin):
     """Client for interacting with the Claude API with built-in retry and error handling."""
     
     def __init__(
@@ -19,6 +28,14 @@ class ClaudeAPIClient:
         max_retries: int = 5,
         backoff_factor: float = 1.5,
         max_tokens: int = 4096,
+        prompt_caching: bool = True,
+        rate_limiter: Optional[RateLimiter] = None,
+        base_url: Optional[str] = None,
+        hedge_requests: bool = False,
+        hedge_percentile: float = 95.0,
+        fallback_model: Optional[str] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        monitor: Optional["AgentMonitor"] = None,
     ):
         """
         Initialize the Claude API client.
@@ -29,21 +46,77 @@ class ClaudeAPIClient:
             max_retries: Maximum number of retries for failed API calls
             backoff_factor: Exponential backoff factor for retries
             max_tokens: Maximum number of tokens in the response
+            prompt_caching: Whether to mark stable prompt prefixes (system prompt,
+                tools, older history) as cacheable with Anthropic prompt caching
+            rate_limiter: Optional rate limiter used to pace calls to every model
+                (defaults to the process-wide limiter of each model, shared across
+                processes via the file named by CLAUDE_AGENTS_RATE_LIMIT_FILE if set)
+            base_url: Optional API base URL (e.g. a local stub server for offline tests)
+            hedge_requests: Whether to send a duplicate request when a call runs longer
+                than hedge_percentile of this client's recorded latencies
+            hedge_percentile: Latency percentile (0-100) after which calls are hedged
+            fallback_model: Optional model to fail over to while the circuit breaker is open
+            circuit_breaker: Optional circuit breaker for the primary model (a default
+                breaker is created when fallback_model is set); other models get
+                a breaker with the same settings
+            monitor: Optional AgentMonitor that receives exact per-call usage and latency
         """
         self.api_key = api_key or os.environ.get("ANTHROPIC_API_KEY")
         if not self.api_key:
             raise ValueError("API key must be provided or set as ANTHROPIC_API_KEY environment variable")
         
-        self.client = Anthropic(api_key=self.api_key)
+        self.client = Anthropic(api_key=self.api_key, base_url=base_url)
         self.model = model
         self.max_retries = max_retries
         self.backoff_factor = backoff_factor
         self.max_tokens = max_tokens
+        self.prompt_caching = prompt_caching
+        
+        # Per-model rate limiting, tail-latency and outage handling
+        self._init_resilience(rate_limiter, hedge_requests, hedge_percentile, fallback_model, circuit_breaker)
+        self.monitor = monitor
+        self.token_counter = TokenCounter(model_name=model)
         
     def _exponential_backoff(self, attempt: int) -> float:
         """Calculate exponential backoff time in seconds."""
         return min(60, self.backoff_factor ** attempt)
     
+    def _report_call(
+        self,
+        response: Optional[Message],
+        response_time: float,
+        error: Optional[Exception] = None,
+    ) -> None:
+        """Report exact usage (from response.usage) and latency of a call to the monitor."""
+        if self.monitor is None:
+            return
+        
+        usage = TokenCounter.usage_from_response(response)
+        model = getattr(response, "model", None) or self.model
+        cost = self.token_counter.estimate_cost(
+            prompt_tokens=usage["input_tokens"],
+            completion_tokens=usage["output_tokens"],
+            model=model,
+            cache_creation_tokens=usage["cache_creation_input_tokens"],
+            cache_read_tokens=usage["cache_read_input_tokens"]
+        )
+        
+        self.monitor.track_api_call(
+            success=error is None,
+            prompt_tokens=usage["input_tokens"],
+            completion_tokens=usage["output_tokens"],
+            model=model,
+            response_time=response_time,
+            cost=cost,
+            error=type(error).__name__ if error is not None else None,
+            cache_creation_tokens=usage["cache_creation_input_tokens"],
+            cache_read_tokens=usage["cache_read_input_tokens"]
+        )
+    
+    def _report_discarded_call(self, response: Message, response_time: float) -> None:
+        """Report the usage of a hedged request that lost the race but was still billed."""
+        self._report_call(response, response_time)
+    
     def send_message(
         self, 
         messages: List[MessageParam],
@@ -51,6 +124,8 @@ class ClaudeAPIClient:
         max_tokens: Optional[int] = None,
         temperature: float = 0.7,
         tools: Optional[List[Dict[str, Any]]] = None,
+        cache_prefix: Optional[bool] = None,
+        model: Optional[str] = None,
     ) -> Message:
         """
         Send a message to Claude with retry logic and error handling.
@@ -61,18 +136,21 @@ class ClaudeAPIClient:
             max_tokens: Maximum number of tokens to generate (overrides default)
             temperature: Sampling temperature (0-1)
             tools: Optional list of tool definitions
+            cache_prefix: Optional override for prompt_caching on this call
+            model: Optional model override for this call (defaults to the client's model)
             
         Returns:
             Claude API response
         """
         attempts = 0
         max_tokens = max_tokens or self.max_tokens
+        use_prompt_cache = self.prompt_caching if cache_prefix is None else cache_prefix
         
         while attempts < self.max_retries:
             try:
                 # Prepare API call parameters
                 params = {
-                    "model": self.model,
+                    "model": model or self.model,
                     "messages": messages,
                     "max_tokens": max_tokens,
                     "temperature": temperature,
@@ -84,23 +162,44 @@ class ClaudeAPIClient:
                 if tools:
                     params["tools"] = tools
                 
-                # Make the API call
-                response = self.client.messages.create(**params)
+                # Mark the stable prompt prefix as cacheable
+                if use_prompt_cache:
+                    params = TokenOptimizer.apply_prompt_caching(params)
+                
+                # Pace the request against the shared rate limit buckets
+                waited = self._rate_limiter(params["model"]).acquire(
+                    input_tokens=RateLimiter.estimate_input_tokens(params),
+                    output_tokens=max_tokens
+                )
+                record_queue_wait(waited)
+                
+                # Make the API call (the buckets are refilled from the response headers)
+                start_time = time.time()
+                raw_response = self._create_message(params)
+                response = raw_response.parse()
+                self._report_call(response, time.time() - start_time)
                 return response
                 
             except anthropic.APIError as e:
                 attempts += 1
+                self._report_call(None, time.time() - start_time, error=e)
+                
+                # Failed responses carry rate limit headers too
+                response_headers = getattr(getattr(e, "response", None), "headers", None)
+                self._rate_limiter(params["model"]).update_from_headers(response_headers)
                 
                 # Check if we should retry
                 if attempts >= self.max_retries:
                     logger.error(f"Max retries exceeded. Last error: {str(e)}")
                     raise
                 
-                # Handle rate limiting specifically
+                # Handle rate limiting specifically: hold back every caller sharing
+                # the limiter (retry-after was already applied from the headers)
                 if e.status_code == 429:
-                    backoff_time = self._exponential_backoff(attempts)
-                    logger.warning(f"Rate limited. Retrying in {backoff_time} seconds...")
-                    time.sleep(backoff_time)
+                    if not (response_headers and response_headers.get("retry-after")):
+                        backoff_time = self._exponential_backoff(attempts)
+                        self._rate_limiter(params["model"]).penalize(backoff_time)
+                    logger.warning("Rate limited. Retrying once the rate limiter allows it...")
                     continue
                     
                 # Handle server errors (5xx)
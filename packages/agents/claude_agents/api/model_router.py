@@ -0,0 +1,192 @@
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, NamedTuple, Optional, Union
+
+from ..utils.token_counter import TokenCounter
+
+logger = logging.getLogger(__name__)
+
+# Model tiers from smallest to largest
+TIER_ORDER = ["fast", "standard", "large"]
+
+DEFAULT_MODEL_TIERS = {
+    "fast": "claude-3-haiku-20240307",
+    "standard": "claude-3-sonnet-20240229",
+    "large": "claude-3-opus-20240229",
+}
+
+# Tier per agent role, or per step complexity for roles that run steps
+DEFAULT_ROUTES: Dict[str, Union[str, Dict[str, str]]] = {
+    "planner": "large",
+    "critic": "large",
+    "summary": "fast",
+    "executor": {"low": "fast", "medium": "standard", "high": "large"},
+}
+
+class Route(NamedTuple):
+    """Model selected for the calls made within a ModelRouter.route block."""
+    router: "ModelRouter"
+    tier: str
+    model: str
+
+# Route of the block currently running in this thread or asyncio task
+_current_route: ContextVar[Optional[Route]] = ContextVar("current_route", default=None)
+
+def current_route() -> Optional[Route]:
+    """
+    Get the route selected for API calls in the current thread or asyncio task.
+
+    Returns:
+        The current route, or None outside of any routed block
+    """
+    return _current_route.get()
+
+class ModelRouter:
+    """
+    Routes agent calls to model tiers by agent role and step complexity.
+
+    Cheap work (low-complexity steps, summaries) goes to a fast model and
+    planning and critique to the large model. Steps can be escalated to a
+    larger tier, e.g. after they fail critique. Agents pick up the model of
+    the enclosing ``route`` block for their API calls, and report latency,
+    tokens and cost per tier back to the router.
+    """
+
+    def __init__(
+        self,
+        tiers: Optional[Dict[str, str]] = None,
+        routes: Optional[Dict[str, Union[str, Dict[str, str]]]] = None,
+        default_tier: str = "large",
+        token_counter: Optional[TokenCounter] = None,
+    ):
+        """
+        Initialize the model router.
+
+        Args:
+            tiers: Model per tier (overrides DEFAULT_MODEL_TIERS entries)
+            routes: Tier per role, or per complexity for a role (overrides DEFAULT_ROUTES entries)
+            default_tier: Tier for roles and complexities without a route
+            token_counter: Optional token counter used to estimate cost per tier
+        """
+        self.tiers = {**DEFAULT_MODEL_TIERS, **(tiers or {})}
+        self.routes = {**DEFAULT_ROUTES, **(routes or {})}
+        self.default_tier = default_tier
+        self.token_counter = token_counter or TokenCounter()
+
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def tier_for(self, role: str, complexity: Optional[str] = None, escalation: int = 0) -> str:
+        """
+        Select the tier for a call.
+
+        Args:
+            role: Agent role ("planner", "executor", "critic" or "summary")
+            complexity: Optional step complexity ("low", "medium" or "high")
+            escalation: Number of tiers to move up from the routed tier
+
+        Returns:
+            Tier name
+        """
+        route = self.routes.get(role, self.default_tier)
+        tier = route.get(complexity or "medium", self.default_tier) if isinstance(route, dict) else route
+
+        if escalation and tier in TIER_ORDER:
+            tier = TIER_ORDER[min(TIER_ORDER.index(tier) + escalation, len(TIER_ORDER) - 1)]
+        return tier
+
+    def can_escalate(self, role: str, complexity: Optional[str] = None, escalation: int = 0) -> bool:
+        """
+        Check whether another escalation would select a larger tier.
+
+        Args:
+            role: Agent role
+            complexity: Optional step complexity
+            escalation: Current escalation
+
+        Returns:
+            True if escalating once more changes the tier
+        """
+        return self.tier_for(role, complexity, escalation + 1) != self.tier_for(role, complexity, escalation)
+
+    @contextmanager
+    def route(
+        self,
+        role: str,
+        complexity: Optional[str] = None,
+        escalation: int = 0,
+        tier: Optional[str] = None,
+    ) -> Iterator[Route]:
+        """
+        Route the agent calls made within a block.
+
+        Args:
+            role: Agent role
+            complexity: Optional step complexity
+            escalation: Number of tiers to move up from the routed tier
+            tier: Optional tier to use instead of the routed one
+
+        Yields:
+            The selected route
+        """
+        tier = tier or self.tier_for(role, complexity, escalation)
+        route = Route(self, tier, self.tiers[tier])
+
+        token = _current_route.set(route)
+        try:
+            yield route
+        finally:
+            _current_route.reset(token)
+
+    def record_call(self, tier: str, response: Any, latency: float, error: Optional[Exception] = None) -> None:
+        """
+        Record the latency, token usage and cost of a call made on a tier.
+
+        Args:
+            tier: Tier the call was routed to
+            response: Claude API response (None if the call failed)
+            latency: Call latency in seconds
+            error: Exception raised by the call, if it failed
+        """
+        usage = TokenCounter.usage_from_response(response)
+        cost = self.token_counter.estimate_cost(
+            prompt_tokens=usage["input_tokens"],
+            completion_tokens=usage["output_tokens"],
+            model=getattr(response, "model", None) or self.tiers.get(tier, ""),
+            cache_creation_tokens=usage["cache_creation_input_tokens"],
+            cache_read_tokens=usage["cache_read_input_tokens"]
+        )
+
+        with self._lock:
+            stats = self._stats.setdefault(tier, {
+                "calls": 0,
+                "errors": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "total_latency": 0.0,
+                "cost": 0.0,
+            })
+            stats["calls"] += 1
+            stats["errors"] += error is not None
+            stats["prompt_tokens"] += usage["input_tokens"]
+            stats["completion_tokens"] += usage["output_tokens"]
+            stats["total_latency"] += latency
+            stats["cost"] += cost
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get latency, token and cost totals per tier.
+
+        Returns:
+            Dictionary of tier names to their model, call counts, tokens,
+            total and average latency, and estimated cost
+        """
+        with self._lock:
+            stats = {tier: dict(tier_stats) for tier, tier_stats in self._stats.items()}
+
+        for tier, tier_stats in stats.items():
+            tier_stats["model"] = self.tiers.get(tier)
+            tier_stats["avg_latency"] = tier_stats["total_latency"] / tier_stats["calls"] if tier_stats["calls"] else 0.0
+        return stats
@@ -1,18 +1,25 @@
 import logging
 import os
 import time
-from typing import Any, Dict, List, Optional, Union
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
 
 import anthropic
 from anthropic import Anthropic
 from anthropic.types import Message, MessageParam
 
+from ..monitoring.tracing import record_queue_wait
 from ..utils.token_counter import TokenCounter
 from ..utils.token_optimizer import TokenOptimizer
+from .rate_limiter import RateLimiter
+from .resilience import CircuitBreaker, ResilientClientMixin
+from .semantic_cache import SemanticCache
+
+if TYPE_CHECKING:
+    from ..monitoring.dashboard import AgentMonitor
 
 logger = logging.getLogger(__name__)
 
-class OptimizedClaudeClient:
+class OptimizedClaudeClient(ResilientClientMixin):
     """
     Optimized client for Claude API with built-in token optimization,
     caching, and cost controls.
@@ -29,6 +36,15 @@ class OptimizedClaudeClient:
         enable_caching: bool = True,
         cache_ttl: int = 3600,  # Cache time-to-live in seconds
         cost_tracking: bool = True,
+        prompt_caching: bool = True,
+        rate_limiter: Optional[RateLimiter] = None,
+        base_url: Optional[str] = None,
+        hedge_requests: bool = False,
+        hedge_percentile: float = 95.0,
+        fallback_model: Optional[str] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        monitor: Optional["AgentMonitor"] = None,
+        semantic_cache: Optional[SemanticCache] = None,
     ):
         """
         Initialize the optimized Claude API client.
@@ -43,12 +59,28 @@ class OptimizedClaudeClient:
             enable_caching: Whether to enable response caching
             cache_ttl: Cache time-to-live in seconds
             cost_tracking: Whether to track API costs
+            prompt_caching: Whether to mark stable prompt prefixes (system prompt,
+                tools, older history) as cacheable with Anthropic prompt caching
+            rate_limiter: Optional rate limiter used to pace calls to every model
+                (defaults to the process-wide limiter of each model, shared across
+                processes via the file named by CLAUDE_AGENTS_RATE_LIMIT_FILE if set)
+            base_url: Optional API base URL (e.g. a local stub server for offline tests)
+            hedge_requests: Whether to send a duplicate request when a call runs longer
+                than hedge_percentile of this client's recorded latencies
+            hedge_percentile: Latency percentile (0-100) after which calls are hedged
+            fallback_model: Optional model to fail over to while the circuit breaker is open
+            circuit_breaker: Optional circuit breaker for the primary model (a default
+                breaker is created when fallback_model is set); other models get
+                a breaker with the same settings
+            monitor: Optional AgentMonitor that receives exact per-call usage and latency
+            semantic_cache: Optional semantic cache consulted after an exact cache miss,
+                reusing responses to near-duplicate prompts
         """
         self.api_key = api_key or os.environ.get("ANTHROPIC_API_KEY")
         if not self.api_key:
             raise ValueError("API key must be provided or set as ANTHROPIC_API_KEY environment variable")
         
-        self.client = Anthropic(api_key=self.api_key)
+        self.client = Anthropic(api_key=self.api_key, base_url=base_url)
         self.model = model
         self.max_retries = max_retries
         self.backoff_factor = backoff_factor
@@ -57,18 +89,26 @@ class OptimizedClaudeClient:
         self.enable_caching = enable_caching
         self.cache_ttl = cache_ttl
         self.cost_tracking = cost_tracking
+        self.prompt_caching = prompt_caching
+        
+        # Per-model rate limiting, tail-latency and outage handling
+        self._init_resilience(rate_limiter, hedge_requests, hedge_percentile, fallback_model, circuit_breaker)
+        self.monitor = monitor
         
         # Initialize token counter
         self.token_counter = TokenCounter(model_name=model)
         
         # Initialize response cache
         self.response_cache = {}
+        self.semantic_cache = semantic_cache
         
         # Initialize cost tracking
         self.cost_tracker = {
             "prompt_tokens": 0,
             "completion_tokens": 0,
             "total_tokens": 0,
+            "cache_creation_input_tokens": 0,
+            "cache_read_input_tokens": 0,
             "total_cost": 0.0,
             "request_count": 0,
             "cache_hits": 0,
@@ -79,6 +119,10 @@ class OptimizedClaudeClient:
         """Calculate exponential backoff time in seconds."""
         return min(60, self.backoff_factor ** attempt)
     
+    def _report_discarded_call(self, response: Message, response_time: float) -> None:
+        """Track the usage of a hedged request that lost the race but was still billed."""
+        self._track_usage(response, response_time=response_time)
+    
     def _generate_cache_key(self, params: Dict[str, Any]) -> str:
         """Generate a cache key from request parameters."""
         import hashlib
@@ -102,25 +146,71 @@ class OptimizedClaudeClient:
         """Check if a cached response is still valid based on TTL."""
         return (time.time() - timestamp) < self.cache_ttl
     
-    def _track_usage(self, prompt_tokens: int, completion_tokens: int) -> None:
-        """Track token usage and cost."""
-        if not self.cost_tracking:
-            return
-            
-        # Add to counts
-        self.cost_tracker["prompt_tokens"] += prompt_tokens
-        self.cost_tracker["completion_tokens"] += completion_tokens
-        self.cost_tracker["total_tokens"] += prompt_tokens + completion_tokens
-        self.cost_tracker["request_count"] += 1
+    def _track_usage(
+        self,
+        response: Message,
+        response_time: Optional[float] = None,
+        cost_multiplier: float = 1.0,
+    ) -> float:
+        """
+        Track exact token usage and cost of a response, keeping prompt-cache tokens separate.
+        
+        Usage is taken from response.usage and priced for the model that answered
+        (which may be the fallback model). Calls with a response_time are also
+        reported to the attached monitor.
+        
+        Returns:
+            Cost of the call in USD
+        """
+        usage = TokenCounter.usage_from_response(response)
+        model = getattr(response, "model", None) or self.model
         
         # Calculate cost based on the model
         cost = self.token_counter.estimate_cost(
-            prompt_tokens=prompt_tokens,
-            completion_tokens=completion_tokens,
-            model=self.model
-        )
+            prompt_tokens=usage["input_tokens"],
+            completion_tokens=usage["output_tokens"],
+            model=model,
+            cache_creation_tokens=usage["cache_creation_input_tokens"],
+            cache_read_tokens=usage["cache_read_input_tokens"]
+        ) * cost_multiplier
+        
+        if self.cost_tracking:
+            self.cost_tracker["prompt_tokens"] += usage["input_tokens"]
+            self.cost_tracker["completion_tokens"] += usage["output_tokens"]
+            self.cost_tracker["cache_creation_input_tokens"] += usage["cache_creation_input_tokens"]
+            self.cost_tracker["cache_read_input_tokens"] += usage["cache_read_input_tokens"]
+            self.cost_tracker["total_tokens"] += sum(usage.values())
+            self.cost_tracker["request_count"] += 1
+            self.cost_tracker["total_cost"] += cost
+        
+        if self.monitor is not None and response_time is not None:
+            self.monitor.track_api_call(
+                success=True,
+                prompt_tokens=usage["input_tokens"],
+                completion_tokens=usage["output_tokens"],
+                model=model,
+                response_time=response_time,
+                cost=cost,
+                cache_creation_tokens=usage["cache_creation_input_tokens"],
+                cache_read_tokens=usage["cache_read_input_tokens"]
+            )
         
-        self.cost_tracker["total_cost"] += cost
+        return cost
+    
+    def _track_failure(self, error: Exception, response_time: float) -> None:
+        """Report a failed call to the attached monitor."""
+        if self.monitor is None:
+            return
+        
+        self.monitor.track_api_call(
+            success=False,
+            prompt_tokens=0,
+            completion_tokens=0,
+            model=self.model,
+            response_time=response_time,
+            cost=0.0,
+            error=type(error).__name__
+        )
     
     def _track_cache_hit(self) -> None:
         """Track cache hit."""
@@ -129,6 +219,72 @@ class OptimizedClaudeClient:
             
         self.cost_tracker["cache_hits"] += 1
     
+    def _build_params(
+        self,
+        messages: List[MessageParam],
+        system: Optional[str],
+        max_tokens: Optional[int],
+        temperature: float,
+        tools: Optional[List[Dict[str, Any]]],
+        opt_level: str,
+    ) -> Dict[str, Any]:
+        """Build token-optimized API parameters for a request."""
+        params = {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": max_tokens or self.max_tokens,
+            "temperature": temperature,
+        }
+        
+        if system:
+            params["system"] = system
+            
+        if tools:
+            params["tools"] = tools
+        
+        return TokenOptimizer.optimize_api_parameters(params, budget_tier=opt_level)
+    
+    def _get_cached_response(self, cache_key: str) -> Optional[Message]:
+        """Return a still-valid cached response for a cache key, tracking the hit."""
+        if cache_key in self.response_cache:
+            cached_response, timestamp = self.response_cache[cache_key]
+            
+            if self._is_cache_valid(timestamp):
+                logger.debug(f"Cache hit for request {cache_key[:8]}")
+                self._track_cache_hit()
+                return cached_response
+        
+        return None
+    
+    def _get_similar_response(self, params: Dict[str, Any]) -> Optional[Message]:
+        """Return a cached response to a near-duplicate request, tracking the hit."""
+        if self.semantic_cache is None:
+            return None
+        
+        match = self.semantic_cache.lookup(params)
+        if match is None:
+            return None
+        
+        self._track_cache_hit()
+        return match[0]
+    
+    def _store_cached_response(self, cache_key: str, response: Message, params: Dict[str, Any]) -> None:
+        """Cache a response, evicting the oldest entries when the cache grows too large."""
+        self.response_cache[cache_key] = (response, time.time())
+        if self.semantic_cache is not None:
+            self.semantic_cache.add(params, response)
+        
+        # Clean cache if it gets too large (>1000 entries)
+        if len(self.response_cache) > 1000:
+            # Remove oldest entries
+            oldest_keys = sorted(
+                self.response_cache.keys(),
+                key=lambda k: self.response_cache[k][1]
+            )[:200]  # Remove oldest 200
+            
+            for key in oldest_keys:
+                del self.response_cache[key]
+    
     def send_message(
         self, 
         messages: List[MessageParam],
@@ -138,6 +294,8 @@ class OptimizedClaudeClient:
         tools: Optional[List[Dict[str, Any]]] = None,
         optimization_level: Optional[str] = None,  # Override budget_tier for this call
         bypass_cache: bool = False,
+        cache_prefix: Optional[bool] = None,
+        model: Optional[str] = None,
     ) -> Message:
         """
         Send a message to Claude with optimization and caching.
@@ -150,6 +308,8 @@ class OptimizedClaudeClient:
             tools: Optional list of tool definitions
             optimization_level: Optional override for budget_tier
             bypass_cache: Whether to bypass the cache for this request
+            cache_prefix: Optional override for prompt_caching on this call
+            model: Optional model override for this call (defaults to the client's model)
             
         Returns:
             Claude API response
@@ -157,34 +317,25 @@ class OptimizedClaudeClient:
         # Set up optimization level
         opt_level = optimization_level or self.budget_tier
         
-        # Prepare API call parameters
-        params = {
-            "model": self.model,
-            "messages": messages,
-            "max_tokens": max_tokens or self.max_tokens,
-            "temperature": temperature,
-        }
-        
-        if system:
-            params["system"] = system
-            
-        if tools:
-            params["tools"] = tools
-        
-        # Apply token optimization
-        optimized_params = TokenOptimizer.optimize_api_parameters(params, budget_tier=opt_level)
+        # Prepare token-optimized API call parameters
+        optimized_params = self._build_params(messages, system, max_tokens, temperature, tools, opt_level)
+        if model:
+            optimized_params["model"] = model
         
         # Check cache before API call (if enabled and not bypassed)
         if self.enable_caching and not bypass_cache and not tools:  # Don't cache tool calls
-            cache_key = self._generate_cache_key(optimized_params)
-            
-            if cache_key in self.response_cache:
-                cached_response, timestamp = self.response_cache[cache_key]
-                
-                if self._is_cache_valid(timestamp):
-                    logger.debug(f"Cache hit for request {cache_key[:8]}")
-                    self._track_cache_hit()
-                    return cached_response
+            cached_response = self._get_cached_response(self._generate_cache_key(optimized_params))
+            if cached_response is None:
+                cached_response = self._get_similar_response(optimized_params)
+            if cached_response is not None:
+                return cached_response
+        
+        # Mark the stable prompt prefix as cacheable on the server side
+        use_prompt_cache = self.prompt_caching if cache_prefix is None else cache_prefix
+        request_params = (
+            TokenOptimizer.apply_prompt_caching(optimized_params)
+            if use_prompt_cache else optimized_params
+        )
         
         # Send request to API with retry logic
         attempts = 0
@@ -192,51 +343,50 @@ class OptimizedClaudeClient:
         
         while attempts < self.max_retries:
             try:
-                # Track token usage before API call
-                estimated_prompt_tokens = 0
-                if optimized_params.get("messages"):
-                    token_data = self.token_counter.count_message_tokens(optimized_params["messages"])
-                    estimated_prompt_tokens = token_data["prompt_tokens"]
+                # Pace the request against the shared rate limit buckets
+                waited = self._rate_limiter(request_params["model"]).acquire(
+                    input_tokens=RateLimiter.estimate_input_tokens(request_params),
+                    output_tokens=request_params["max_tokens"]
+                )
+                record_queue_wait(waited)
                 
-                # Make the API call
-                response = self.client.messages.create(**optimized_params)
+                # Make the API call (the buckets are refilled from the response headers)
+                start_time = time.time()
+                raw_response = self._create_message(request_params)
+                response = raw_response.parse()
                 
-                # Track usage after successful call
-                completion_tokens = len(response.content[0].text) // 4  # Simple approximation
-                self._track_usage(estimated_prompt_tokens, completion_tokens)
+                # Track exact usage reported by the API
+                self._track_usage(response, response_time=time.time() - start_time)
                 
                 # Cache the response if caching is enabled and not a tool call
                 if self.enable_caching and not tools:
-                    cache_key = self._generate_cache_key(optimized_params)
-                    self.response_cache[cache_key] = (response, time.time())
-                    
-                    # Clean cache if it gets too large (>1000 entries)
-                    if len(self.response_cache) > 1000:
-                        # Remove oldest entries
-                        oldest_keys = sorted(
-                            self.response_cache.keys(),
-                            key=lambda k: self.response_cache[k][1]
-                        )[:200]  # Remove oldest 200
-                        
-                        for key in oldest_keys:
-                            del self.response_cache[key]
+                    self._store_cached_response(
+                        self._generate_cache_key(optimized_params), response, optimized_params
+                    )
                 
                 return response
                 
             except anthropic.APIError as e:
                 attempts += 1
                 last_error = e
+                self._track_failure(e, time.time() - start_time)
+                
+                # Failed responses carry rate limit headers too
+                response_headers = getattr(getattr(e, "response", None), "headers", None)
+                self._rate_limiter(request_params["model"]).update_from_headers(response_headers)
                 
                 # Check if we should retry
                 if attempts >= self.max_retries:
                     logger.error(f"Max retries exceeded. Last error: {str(e)}")
                     raise
                 
-                # Handle rate limiting specifically
+                # Handle rate limiting specifically: hold back every caller sharing
+                # the limiter (retry-after was already applied from the headers)
                 if e.status_code == 429:
-                    backoff_time = self._exponential_backoff(attempts)
-                    logger.warning(f"Rate limited. Retrying in {backoff_time} seconds...")
-                    time.sleep(backoff_time)
+                    if not (response_headers and response_headers.get("retry-after")):
+                        backoff_time = self._exponential_backoff(attempts)
+                        self._rate_limiter(request_params["model"]).penalize(backoff_time)
+                    logger.warning("Rate limited. Retrying once the rate limiter allows it...")
                     continue
                     
                 # Handle server errors (5xx)
@@ -253,7 +403,187 @@ class OptimizedClaudeClient:
             except Exception as e:
                 logger.error(f"Unexpected error: {str(e)}")
                 raise
-    
+
+    @staticmethod
+    def _batch_custom_ids(requests: List[Dict[str, Any]]) -> List[str]:
+        """
+        Assign a unique custom_id to every request of a batch.
+
+        Args:
+            requests: Batch request dictionaries
+
+        Returns:
+            Custom IDs in input order: the caller's own, or "request-<index>"
+            with a numeric suffix if the caller already uses that ID
+
+        Raises:
+            ValueError: If two requests were given the same custom_id
+        """
+        supplied = set()
+        for request in requests:
+            custom_id = request.get("custom_id")
+            if custom_id and custom_id in supplied:
+                raise ValueError(f"Duplicate custom_id in batch: {custom_id}")
+            supplied.add(custom_id)
+
+        custom_ids = []
+        for index, request in enumerate(requests):
+            custom_id = request.get("custom_id")
+            if not custom_id:
+                custom_id = f"request-{index}"
+                suffix = 1
+                while custom_id in supplied:
+                    custom_id = f"request-{index}-{suffix}"
+                    suffix += 1
+                supplied.add(custom_id)
+            custom_ids.append(custom_id)
+
+        return custom_ids
+
+    def send_batch(
+        self,
+        requests: List[Dict[str, Any]],
+        optimization_level: Optional[str] = None,
+        poll_interval: float = 10.0,
+        timeout: Optional[float] = None,
+        max_batch_size: int = 10000,
+    ) -> List[Dict[str, Any]]:
+        """
+        Send many independent requests through the Message Batches API.
+
+        Requests are optimized and checked against the response cache like
+        send_message, submitted in batches, polled until processing has ended and
+        mapped back to the input order. Throughput is bound by batch processing
+        rather than per-request latency, and batch usage is billed at 50%.
+
+        Args:
+            requests: Request dictionaries with send_message keys (messages, system,
+                max_tokens, temperature, tools) and an optional custom_id
+            optimization_level: Optional override for budget_tier
+            poll_interval: Seconds between batch status checks
+            timeout: Optional maximum time in seconds to wait for the batches;
+                unfinished batches are canceled and TimeoutError is raised
+            max_batch_size: Maximum number of requests per submitted batch
+
+        Returns:
+            One result per request, in input order, with custom_id, status
+            ("succeeded", "cached", "errored", "canceled" or "expired"),
+            response (Claude API response or None) and error
+        """
+        opt_level = optimization_level or self.budget_tier
+        results: List[Optional[Dict[str, Any]]] = [None] * len(requests)
+        pending = {}  # custom_id -> (index, optimized_params, cache_key)
+        custom_ids = self._batch_custom_ids(requests)
+
+        for index, request in enumerate(requests):
+            custom_id = custom_ids[index]
+
+            optimized_params = self._build_params(
+                request["messages"],
+                request.get("system"),
+                request.get("max_tokens"),
+                request.get("temperature", 0.7),
+                request.get("tools"),
+                opt_level
+            )
+
+            # Serve from the response cache where possible
+            cache_key = None
+            if self.enable_caching and not request.get("tools"):
+                cache_key = self._generate_cache_key(optimized_params)
+                cached_response = self._get_cached_response(cache_key)
+                if cached_response is None:
+                    cached_response = self._get_similar_response(optimized_params)
+                if cached_response is not None:
+                    results[index] = {
+                        "custom_id": custom_id,
+                        "status": "cached",
+                        "response": cached_response,
+                        "error": None
+                    }
+                    continue
+
+            pending[custom_id] = (index, optimized_params, cache_key)
+
+        # Submit the remaining requests in chunks
+        batch_ids = []
+        pending_items = list(pending.items())
+        for start in range(0, len(pending_items), max_batch_size):
+            chunk = pending_items[start:start + max_batch_size]
+            batch = self.client.messages.batches.create(
+                requests=[
+                    {
+                        "custom_id": custom_id,
+                        "params": (
+                            TokenOptimizer.apply_prompt_caching(optimized_params)
+                            if self.prompt_caching else optimized_params
+                        )
+                    }
+                    for custom_id, (_, optimized_params, _) in chunk
+                ]
+            )
+            batch_ids.append(batch.id)
+            logger.info(f"Submitted message batch {batch.id} with {len(chunk)} requests")
+
+        # Poll until every batch has ended
+        start_time = time.time()
+        unfinished = set(batch_ids)
+        while unfinished:
+            for batch_id in list(unfinished):
+                batch = self.client.messages.batches.retrieve(batch_id)
+                if batch.processing_status == "ended":
+                    unfinished.discard(batch_id)
+
+            if not unfinished:
+                break
+
+            if timeout is not None and time.time() - start_time > timeout:
+                for batch_id in unfinished:
+                    self.client.messages.batches.cancel(batch_id)
+                raise TimeoutError(f"Message batches did not finish within {timeout} seconds: {sorted(unfinished)}")
+
+            time.sleep(poll_interval)
+
+        # Map results back to the original requests
+        for batch_id in batch_ids:
+            for entry in self.client.messages.batches.results(batch_id):
+                if entry.custom_id not in pending:
+                    logger.warning(f"Ignoring unknown custom_id in batch {batch_id}: {entry.custom_id}")
+                    continue
+
+                index, optimized_params, cache_key = pending[entry.custom_id]
+                result = {
+                    "custom_id": entry.custom_id,
+                    "status": entry.result.type,
+                    "response": None,
+                    "error": None
+                }
+
+                if entry.result.type == "succeeded":
+                    response = entry.result.message
+                    result["response"] = response
+
+                    self._track_usage(response, cost_multiplier=0.5)  # Batch API discount
+
+                    if cache_key is not None:
+                        self._store_cached_response(cache_key, response, optimized_params)
+                elif entry.result.type == "errored":
+                    result["error"] = str(getattr(entry.result, "error", "unknown error"))
+
+                results[index] = result
+
+        # Requests without a result entry are reported as expired
+        for custom_id, (index, _, _) in pending.items():
+            if results[index] is None:
+                results[index] = {
+                    "custom_id": custom_id,
+                    "status": "expired",
+                    "response": None,
+                    "error": "No result returned for request"
+                }
+
+        return results
+
     def get_usage_stats(self) -> Dict[str, Any]:
         """
         Get usage statistics and cost tracking information.
@@ -283,6 +613,16 @@ class OptimizedClaudeClient:
         if (self.cost_tracker["request_count"] + self.cost_tracker["cache_hits"]) > 0:
             cache_hit_rate = self.cost_tracker["cache_hits"] / (self.cost_tracker["request_count"] + self.cost_tracker["cache_hits"])
         
+        # Share of input tokens served from the server-side prompt cache
+        prompt_cache_read_rate = 0
+        total_input_tokens = (
+            self.cost_tracker["prompt_tokens"]
+            + self.cost_tracker["cache_creation_input_tokens"]
+            + self.cost_tracker["cache_read_input_tokens"]
+        )
+        if total_input_tokens > 0:
+            prompt_cache_read_rate = self.cost_tracker["cache_read_input_tokens"] / total_input_tokens
+        
         # Project monthly cost based on current usage
         projected_monthly_cost = 0
         if runtime_days > 0:
@@ -290,7 +630,7 @@ class OptimizedClaudeClient:
             projected_monthly_cost = daily_cost * 30.44  # Average days in month
         
         # Create stats dictionary
-        return {
+        stats = {
             "model": self.model,
             "budget_tier": self.budget_tier,
             "runtime_seconds": runtime_seconds,
@@ -300,6 +640,9 @@ class OptimizedClaudeClient:
             "cache_hit_rate": cache_hit_rate,
             "prompt_tokens": self.cost_tracker["prompt_tokens"],
             "completion_tokens": self.cost_tracker["completion_tokens"],
+            "cache_creation_input_tokens": self.cost_tracker["cache_creation_input_tokens"],
+            "cache_read_input_tokens": self.cost_tracker["cache_read_input_tokens"],
+            "prompt_cache_read_rate": prompt_cache_read_rate,
             "total_tokens": self.cost_tracker["total_tokens"],
             "avg_prompt_tokens": avg_prompt_tokens,
             "avg_completion_tokens": avg_completion_tokens,
@@ -308,6 +651,20 @@ class OptimizedClaudeClient:
             "projected_monthly_cost": projected_monthly_cost,
             "projected_annual_cost": projected_monthly_cost * 12
         }
+        
+        if self.semantic_cache is not None:
+            stats["semantic_cache"] = self.semantic_cache.get_stats()
+        
+        stats["latency"] = {
+            model: tracker.get_stats() for model, tracker in self.latency_trackers.items()
+        }
+        if self.circuit_breaker is not None:
+            stats["circuit_breaker"] = self.circuit_breaker.get_state()
+            stats["circuit_breakers"] = {
+                model: breaker.get_state() for model, breaker in self.circuit_breakers.items()
+            }
+        
+        return stats
     
     def reset_usage_stats(self) -> None:
         """Reset usage statistics."""
@@ -315,6 +672,8 @@ class OptimizedClaudeClient:
             "prompt_tokens": 0,
             "completion_tokens": 0,
             "total_tokens": 0,
+            "cache_creation_input_tokens": 0,
+            "cache_read_input_tokens": 0,
             "total_cost": 0.0,
             "request_count": 0,
             "cache_hits": 0,
@@ -324,6 +683,8 @@ class OptimizedClaudeClient:
     def clear_cache(self) -> None:
         """Clear the response cache."""
         self.response_cache = {}
+        if self.semantic_cache is not None:
+            self.semantic_cache.clear()
         logger.info("Response cache cleared")
     
     def get_budget_projection(self, target_budget: float = 500.0) -> Dict[str, Any]:
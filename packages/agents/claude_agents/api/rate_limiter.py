@@ -0,0 +1,324 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterator, Mapping, Optional, Tuple
+
+# fcntl is only available on POSIX systems; without it the limiter is
+# still shared between threads but not between processes
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+class RateLimiter:
+    """
+    Client-side token buckets for Claude API rate limits.
+
+    Tracks requests, input tokens and output tokens per minute. Buckets start
+    unlimited (or at the configured limits) and are refilled from the
+    ``anthropic-ratelimit-*`` response headers, so calls are paced before they
+    are sent instead of piling into 429s. State is shared between threads of a
+    process and, when a state file is configured, between processes.
+    """
+
+    DIMENSIONS = ("requests", "input_tokens", "output_tokens")
+
+    # Header prefix for each dimension
+    HEADER_NAMES = {
+        "requests": "anthropic-ratelimit-requests",
+        "input_tokens": "anthropic-ratelimit-input-tokens",
+        "output_tokens": "anthropic-ratelimit-output-tokens",
+    }
+
+    # Process-wide limiters keyed by state file and model
+    _shared_instances: Dict[Tuple[Optional[str], Optional[str]], "RateLimiter"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(
+        self,
+        state_file: Optional[str] = None,
+        requests_per_minute: Optional[int] = None,
+        input_tokens_per_minute: Optional[int] = None,
+        output_tokens_per_minute: Optional[int] = None,
+        max_wait: float = 60.0,
+    ):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            state_file: Optional path of a local file used to share bucket state
+                between processes (thread-only sharing if None)
+            requests_per_minute: Initial requests/min limit (None until learned from headers)
+            input_tokens_per_minute: Initial input tokens/min limit
+            output_tokens_per_minute: Initial output tokens/min limit
+            max_wait: Maximum time in seconds to sleep in a single wait
+        """
+        self.state_file = state_file
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+
+        if state_file and not FCNTL_AVAILABLE:
+            logger.warning("fcntl not available. Rate limit state will only be shared between threads.")
+
+        now = time.time()
+        limits = {
+            "requests": requests_per_minute,
+            "input_tokens": input_tokens_per_minute,
+            "output_tokens": output_tokens_per_minute,
+        }
+        self._state = {
+            "buckets": {
+                dimension: {"limit": limit, "tokens": limit or 0, "updated": now}
+                for dimension, limit in limits.items()
+            },
+            "blocked_until": 0.0,
+        }
+
+    @classmethod
+    def shared(cls, state_file: Optional[str] = None, model: Optional[str] = None) -> "RateLimiter":
+        """
+        Get the process-wide rate limiter for a state file and model.
+
+        Rate limits apply per model, so each model gets its own buckets (and
+        its own state file, next to the given one).
+
+        Args:
+            state_file: Optional path of the cross-process state file
+            model: Optional model whose limits the limiter tracks
+
+        Returns:
+            Shared RateLimiter instance
+        """
+        key = (state_file, model)
+        with cls._shared_lock:
+            if key not in cls._shared_instances:
+                model_state_file = f"{state_file}.{model}" if state_file and model else state_file
+                cls._shared_instances[key] = cls(state_file=model_state_file)
+            return cls._shared_instances[key]
+
+    @staticmethod
+    def estimate_input_tokens(params: Dict[str, Any]) -> int:
+        """
+        Cheaply estimate the input tokens of a request (~4 characters per token).
+
+        Args:
+            params: Claude API parameters
+
+        Returns:
+            Estimated input token count
+        """
+        chars = len(str(params.get("system") or ""))
+        for message in params.get("messages") or []:
+            content = message.get("content", "")
+            chars += len(content) if isinstance(content, str) else len(str(content))
+        if params.get("tools"):
+            chars += len(str(params["tools"]))
+        return chars // 4
+
+    def acquire(self, input_tokens: int = 0, output_tokens: int = 0) -> float:
+        """
+        Block until the buckets have capacity for a request, then reserve it.
+
+        Args:
+            input_tokens: Estimated input tokens of the request
+            output_tokens: Output tokens to reserve (usually max_tokens)
+
+        Returns:
+            Total time spent waiting in seconds
+        """
+        costs = {"requests": 1, "input_tokens": input_tokens, "output_tokens": output_tokens}
+        waited = 0.0
+
+        while True:
+            wait = self._try_acquire(costs)
+            if wait == 0.0:
+                return waited
+
+            logger.debug(f"Rate limiter pacing request for {wait:.2f} seconds")
+            time.sleep(wait)
+            waited += wait
+
+    async def acquire_async(self, input_tokens: int = 0, output_tokens: int = 0) -> float:
+        """
+        Wait without blocking the event loop until the buckets have capacity, then reserve it.
+
+        Args:
+            input_tokens: Estimated input tokens of the request
+            output_tokens: Output tokens to reserve (usually max_tokens)
+
+        Returns:
+            Total time spent waiting in seconds
+        """
+        costs = {"requests": 1, "input_tokens": input_tokens, "output_tokens": output_tokens}
+        waited = 0.0
+
+        while True:
+            wait = self._try_acquire(costs)
+            if wait == 0.0:
+                return waited
+
+            logger.debug(f"Rate limiter pacing request for {wait:.2f} seconds")
+            await asyncio.sleep(wait)
+            waited += wait
+
+    def update_from_headers(self, headers: Optional[Mapping[str, str]]) -> None:
+        """
+        Refill the buckets from ``anthropic-ratelimit-*`` response headers.
+
+        Args:
+            headers: Response headers (case-insensitive mapping or plain dict)
+        """
+        if not headers:
+            return
+
+        normalized = {str(key).lower(): value for key, value in headers.items()}
+        now = time.time()
+
+        with self._locked_state() as state:
+            for dimension, prefix in self.HEADER_NAMES.items():
+                limit = self._parse_number(normalized.get(f"{prefix}-limit"))
+                remaining = self._parse_number(normalized.get(f"{prefix}-remaining"))
+                if limit is None or remaining is None:
+                    continue
+
+                bucket = state["buckets"][dimension]
+                bucket["limit"] = limit
+                bucket["tokens"] = remaining
+                bucket["updated"] = now
+
+            # Honour retry-after on rate limited responses
+            retry_after = self._parse_number(normalized.get("retry-after"))
+            if retry_after is not None:
+                state["blocked_until"] = max(state["blocked_until"], now + retry_after)
+
+    def penalize(self, seconds: float) -> None:
+        """
+        Block all callers sharing this limiter for a period (e.g. after a 429).
+
+        Args:
+            seconds: Time in seconds to hold back new requests
+        """
+        with self._locked_state() as state:
+            state["blocked_until"] = max(state["blocked_until"], time.time() + seconds)
+
+    def get_state(self) -> Dict[str, Any]:
+        """
+        Get a snapshot of the current bucket state.
+
+        Returns:
+            Dictionary with per-dimension limits and remaining capacity
+        """
+        with self._locked_state() as state:
+            now = time.time()
+            for bucket in state["buckets"].values():
+                self._refill(bucket, now)
+            return json.loads(json.dumps(state))
+
+    # Helper methods
+
+    def _try_acquire(self, costs: Dict[str, float]) -> float:
+        """
+        Reserve capacity for a request if all buckets can cover it.
+
+        Args:
+            costs: Cost of the request per dimension
+
+        Returns:
+            0 if capacity was reserved, otherwise the time to wait before retrying
+        """
+        with self._locked_state() as state:
+            now = time.time()
+            wait = max(0.0, state["blocked_until"] - now)
+
+            if wait == 0.0:
+                for dimension in self.DIMENSIONS:
+                    bucket = state["buckets"][dimension]
+                    self._refill(bucket, now)
+                    wait = max(wait, self._time_until_available(bucket, costs[dimension]))
+
+            if wait == 0.0:
+                for dimension in self.DIMENSIONS:
+                    bucket = state["buckets"][dimension]
+                    if bucket["limit"]:
+                        bucket["tokens"] -= min(costs[dimension], bucket["limit"])
+                return 0.0
+
+        return min(wait, self.max_wait)
+
+    @contextmanager
+    def _locked_state(self) -> Iterator[Dict[str, Any]]:
+        """Yield the bucket state under the thread lock and, if configured, the file lock."""
+        with self._lock:
+            if not self.state_file or not FCNTL_AVAILABLE:
+                yield self._state
+                return
+
+            directory = os.path.dirname(self.state_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            with open(self.state_file, "a+") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.seek(0)
+                    raw = f.read()
+                    if raw.strip():
+                        try:
+                            self._state = json.loads(raw)
+                        except json.JSONDecodeError:
+                            logger.warning(f"Ignoring corrupt rate limit state in {self.state_file}")
+
+                    yield self._state
+
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps(self._state))
+                    f.flush()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _refill(bucket: Dict[str, Any], now: float) -> None:
+        """Refill a per-minute bucket for the time elapsed since its last update."""
+        limit = bucket["limit"]
+        if not limit:
+            return
+
+        elapsed = max(0.0, now - bucket["updated"])
+        bucket["tokens"] = min(limit, bucket["tokens"] + elapsed * limit / 60.0)
+        bucket["updated"] = now
+
+    @staticmethod
+    def _time_until_available(bucket: Dict[str, Any], cost: float) -> float:
+        """Seconds until a bucket can cover a cost (0 if unlimited or available)."""
+        limit = bucket["limit"]
+        if not limit or cost <= 0:
+            return 0.0
+
+        # Requests larger than the whole bucket only need a full bucket
+        needed = min(cost, limit) - bucket["tokens"]
+        if needed <= 0:
+            return 0.0
+        return needed / (limit / 60.0)
+
+    @staticmethod
+    def _parse_number(value: Optional[str]) -> Optional[float]:
+        """Parse a numeric header value, returning None if absent or invalid."""
+        if value is None:
+            return None
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            # retry-after may also be an HTTP date
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                return None
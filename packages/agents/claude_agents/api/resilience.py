@@ -0,0 +1,408 @@
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+import anthropic
+
+from .rate_limiter import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit breaker is open."""
+    pass
+
+class LatencyTracker:
+    """
+    Rolling window of call latencies with percentile queries.
+
+    Used by the API clients to derive hedging delays from their own recorded
+    history instead of a fixed timeout.
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        """
+        Initialize the latency tracker.
+
+        Args:
+            window: Number of most recent latencies to keep
+            min_samples: Minimum number of samples before percentiles are reported
+        """
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        """
+        Record the latency of a completed call.
+
+        Args:
+            seconds: Call duration in seconds
+        """
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """
+        Get a latency percentile over the recorded window.
+
+        Args:
+            percentile: Percentile to compute (0-100)
+
+        Returns:
+            Latency in seconds, or None if fewer than min_samples were recorded
+        """
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            samples = sorted(self._samples)
+
+        # Nearest-rank percentile
+        rank = max(1, math.ceil(percentile / 100 * len(samples)))
+        return samples[min(rank, len(samples)) - 1]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get summary statistics for the recorded latencies.
+
+        Returns:
+            Dictionary with sample count and p50/p95/p99 latencies
+        """
+        with self._lock:
+            count = len(self._samples)
+
+        return {
+            "samples": count,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99)
+        }
+
+class CircuitBreaker:
+    """
+    Circuit breaker over a rolling window of call outcomes.
+
+    The circuit opens when the failure rate over the last ``window`` calls
+    reaches ``failure_threshold``. While open, calls are rejected (so clients
+    fail fast, e.g. to a fallback model) until ``recovery_time`` has passed.
+    The circuit then half-opens and lets a single trial call through; its
+    outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: float = 0.5,
+        window: int = 20,
+        min_calls: int = 5,
+        recovery_time: float = 30.0,
+    ):
+        """
+        Initialize the circuit breaker.
+
+        Args:
+            failure_threshold: Failure rate (0-1) at which the circuit opens
+            window: Number of recent call outcomes considered
+            min_calls: Minimum number of outcomes before the circuit can open
+            recovery_time: Seconds the circuit stays open before a trial call
+        """
+        self.failure_threshold = failure_threshold
+        self.window = window
+        self.min_calls = min_calls
+        self.recovery_time = recovery_time
+
+        self._outcomes = deque(maxlen=window)  # True for success, False for failure
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """Current circuit state (closed, open or half_open)."""
+        with self._lock:
+            self._update_state()
+            return self._state
+
+    def allow_request(self) -> bool:
+        """
+        Check whether a call may go through, reserving the trial call when half-open.
+
+        Returns:
+            True if the call should be made, False if it should fail fast
+        """
+        with self._lock:
+            self._update_state()
+
+            if self._state == self.CLOSED:
+                return True
+
+            if self._state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+
+            return False
+
+    def record_success(self) -> None:
+        """Record a successful call."""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                logger.info("Circuit breaker closed after successful trial call")
+                self._state = self.CLOSED
+                self._outcomes.clear()
+                self._trial_in_flight = False
+
+            self._outcomes.append(True)
+
+    def record_failure(self) -> None:
+        """Record a failed call, opening the circuit if the failure rate is too high."""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._open()
+                return
+
+            self._outcomes.append(False)
+
+            if self._state == self.CLOSED and len(self._outcomes) >= self.min_calls:
+                failure_rate = self._outcomes.count(False) / len(self._outcomes)
+                if failure_rate >= self.failure_threshold:
+                    self._open()
+
+    def copy(self) -> "CircuitBreaker":
+        """
+        Create a closed breaker with the same settings (e.g. for another model).
+
+        Returns:
+            New CircuitBreaker instance
+        """
+        return CircuitBreaker(self.failure_threshold, self.window, self.min_calls, self.recovery_time)
+
+    def get_state(self) -> Dict[str, Any]:
+        """
+        Get a snapshot of the breaker state.
+
+        Returns:
+            Dictionary with state, failure rate and number of recorded outcomes
+        """
+        with self._lock:
+            self._update_state()
+            calls = len(self._outcomes)
+            return {
+                "state": self._state,
+                "failure_rate": self._outcomes.count(False) / calls if calls else 0.0,
+                "calls": calls
+            }
+
+    # Helper methods
+
+    def _open(self) -> None:
+        """Open the circuit (lock must be held)."""
+        logger.warning("Circuit breaker opened")
+        self._state = self.OPEN
+        self._opened_at = time.time()
+        self._trial_in_flight = False
+
+    def _update_state(self) -> None:
+        """Move from open to half-open once the recovery time has passed (lock must be held)."""
+        if self._state == self.OPEN and time.time() - self._opened_at >= self.recovery_time:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+
+def hedged_call(
+    primary: Callable[[], T],
+    hedge_delay: float,
+    executor: Executor,
+    hedge: Optional[Callable[[], T]] = None,
+    on_discarded: Optional[Callable[[T], None]] = None,
+) -> T:
+    """
+    Run a call and fire a duplicate if it has not finished after a delay.
+
+    Whichever call completes successfully first wins; the slower one is left
+    to finish in the background and its result is discarded. An error is only
+    raised once both calls have failed.
+
+    Args:
+        primary: Call to make
+        hedge_delay: Seconds to wait before firing the duplicate
+        executor: Executor running the calls
+        hedge: Optional callable for the duplicate (defaults to primary)
+        on_discarded: Optional callback receiving the result of the losing call
+            if it succeeds too (e.g. to account for its usage)
+
+    Returns:
+        Result of the first successful call
+    """
+    futures = {executor.submit(primary)}
+    done, _ = wait(futures, timeout=hedge_delay)
+
+    if not done:
+        logger.debug(f"Call exceeded {hedge_delay:.2f}s, sending hedged request")
+        futures.add(executor.submit(hedge or primary))
+
+    def discard(future: Future) -> None:
+        if not future.cancelled() and future.exception() is None:
+            on_discarded(future.result())
+
+    first_error: Optional[BaseException] = None
+    while futures:
+        done, futures = wait(futures, return_when=FIRST_COMPLETED)
+        for future in done:
+            error = future.exception()
+            if error is None:
+                if on_discarded is not None:
+                    for other in (done | futures) - {future}:
+                        other.add_done_callback(discard)
+                return future.result()
+            first_error = first_error or error
+
+    raise first_error
+
+class ResilientClientMixin:
+    """
+    Circuit breaking, model fallback and request hedging for the Claude clients.
+
+    Rate limits, latencies and outages are tracked per model, so routing
+    calls to several models does not pace one model against another's limits
+    or let one model's outage open the circuit for the others.
+
+    Classes using the mixin set ``model`` and call ``_init_resilience`` from
+    their constructor, provide ``client`` (an Anthropic client), and
+    implement ``_report_discarded_call`` to account for hedged requests that
+    lost the race but were still billed.
+    """
+
+    def _init_resilience(
+        self,
+        rate_limiter: Optional[RateLimiter],
+        hedge_requests: bool,
+        hedge_percentile: float,
+        fallback_model: Optional[str],
+        circuit_breaker: Optional[CircuitBreaker],
+    ) -> None:
+        """Set up the rate limiting, tail-latency and outage handling state."""
+        # A caller-supplied limiter paces every model; otherwise each model
+        # gets the process-wide limiter for its own limits
+        self._rate_limit_file = os.environ.get("CLAUDE_AGENTS_RATE_LIMIT_FILE")
+        self._per_model_rate_limits = rate_limiter is None
+        self.rate_limiter = rate_limiter or RateLimiter.shared(self._rate_limit_file, model=self.model)
+
+        self.hedge_requests = hedge_requests
+        self.hedge_percentile = hedge_percentile
+        self.fallback_model = fallback_model
+        self.circuit_breaker = circuit_breaker or (CircuitBreaker() if fallback_model else None)
+        self.circuit_breakers: Dict[str, CircuitBreaker] = {}
+        if self.circuit_breaker is not None:
+            self.circuit_breakers[self.model] = self.circuit_breaker
+        self.latency_trackers: Dict[str, LatencyTracker] = {}
+        self._resilience_lock = threading.Lock()
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+
+    def _report_discarded_call(self, response: Any, response_time: float) -> None:
+        """Account for the usage of a successful call whose response was discarded."""
+        raise NotImplementedError
+
+    def _latency_tracker(self, model: str) -> LatencyTracker:
+        """Get the latency history recorded for a model."""
+        with self._resilience_lock:
+            if model not in self.latency_trackers:
+                self.latency_trackers[model] = LatencyTracker()
+            return self.latency_trackers[model]
+
+    def _rate_limiter(self, model: str) -> RateLimiter:
+        """Get the rate limiter pacing calls to a model."""
+        if not self._per_model_rate_limits or model == self.model:
+            return self.rate_limiter
+        return RateLimiter.shared(self._rate_limit_file, model=model)
+
+    def _circuit_breaker(self, model: str) -> Optional[CircuitBreaker]:
+        """Get the circuit breaker for a model (None if circuit breaking is off)."""
+        if self.circuit_breaker is None:
+            return None
+        with self._resilience_lock:
+            if model not in self.circuit_breakers:
+                self.circuit_breakers[model] = self.circuit_breaker.copy()
+            return self.circuit_breakers[model]
+
+    def _hedge_pool(self) -> ThreadPoolExecutor:
+        """Get the executor running hedged calls, creating it on first use."""
+        with self._resilience_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(thread_name_prefix="claude-hedge")
+            return self._hedge_executor
+
+    def _create_message(self, params: Dict[str, Any]) -> Any:
+        """
+        Make the raw API call with circuit breaking and, if enabled, hedging.
+
+        The rate limiter of the model that answered is refilled from the
+        response headers.
+        """
+        # Fail fast to the fallback model while the model's circuit is open
+        breaker = self._circuit_breaker(params["model"])
+        if breaker is not None and not breaker.allow_request():
+            if not self.fallback_model or self.fallback_model == params["model"]:
+                raise CircuitOpenError(f"Circuit breaker open for {params['model']}")
+            logger.warning(f"Circuit breaker open for {params['model']}. Using fallback model {self.fallback_model}")
+            params = {**params, "model": self.fallback_model}
+            breaker = None
+
+        tracker = self._latency_tracker(params["model"])
+        rate_limiter = self._rate_limiter(params["model"])
+
+        def call() -> Tuple[Any, float]:
+            start_time = time.time()
+            raw_response = self.client.messages.with_raw_response.create(**params)
+            response_time = time.time() - start_time
+            tracker.record(response_time)
+            rate_limiter.update_from_headers(raw_response.headers)
+            return raw_response, response_time
+
+        def hedge() -> Tuple[Any, float]:
+            # The duplicate request is paced like any other
+            rate_limiter.acquire(
+                input_tokens=RateLimiter.estimate_input_tokens(params),
+                output_tokens=params["max_tokens"]
+            )
+            return call()
+
+        def discarded(result: Tuple[Any, float]) -> None:
+            # The losing request was billed too
+            raw_response, response_time = result
+            try:
+                self._report_discarded_call(raw_response.parse(), response_time)
+            except Exception as e:
+                logger.warning(f"Could not account for discarded hedged response: {str(e)}")
+
+        # Hedge once a call runs past the tail latency seen so far
+        hedge_delay = tracker.percentile(self.hedge_percentile) if self.hedge_requests else None
+
+        try:
+            if hedge_delay is None:
+                raw_response, _ = call()
+            else:
+                raw_response, _ = hedged_call(
+                    call, hedge_delay, self._hedge_pool(), hedge=hedge, on_discarded=discarded
+                )
+        except anthropic.APIError as e:
+            # Only outages (5xx, connection errors) count against the breaker
+            if breaker is not None:
+                if getattr(e, "status_code", None) is None or e.status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+            raise
+
+        if breaker is not None:
+            breaker.record_success()
+        return raw_response
@@ -0,0 +1,347 @@
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+# NumPy is required for the semantic cache; FAISS is used for the
+# nearest-neighbor search when installed, with a NumPy fallback otherwise
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+class SemanticCache:
+    """
+    Response cache that matches near-duplicate prompts by embedding similarity.
+
+    Prompts are normalized and embedded, then looked up in a small local index
+    of previously answered prompts. A cached response is reused when the cosine
+    similarity is above the configured threshold. Only the final turn is
+    embedded; entries are scoped by the generation settings, the earlier turns
+    and the symbols of the final turn, so a response is only ever reused for a
+    request with the same settings and history.
+
+    The default embedding is lexical: it cannot tell "ascending" from
+    "descending" or "Python 3.8" from "Python 3.12". Without a caller-supplied
+    embedding_fn, a hit therefore also requires the exact same set of words
+    and numbers, so only differences in formatting, case and word order are
+    served from the cache.
+    """
+
+    def __init__(
+        self,
+        similarity_threshold: float = 0.99,
+        embedding_fn: Optional[Callable[[str], Any]] = None,
+        embedding_dim: int = 512,
+        max_entries: int = 1000,
+        ttl: Optional[int] = 3600,
+        use_faiss: bool = True,
+    ):
+        """
+        Initialize the semantic cache.
+
+        Args:
+            similarity_threshold: Minimum cosine similarity (0-1) for a cache hit
+            embedding_fn: Optional function mapping normalized prompt text to a
+                vector of size embedding_dim (defaults to hashed n-gram features,
+                with hits restricted to prompts with the same tokens)
+            embedding_dim: Dimension of the embedding vectors
+            max_entries: Maximum number of cached responses across all scopes
+            ttl: Optional time-to-live in seconds for cached responses
+            use_faiss: Whether to use FAISS for the index when it is installed
+        """
+        if not NUMPY_AVAILABLE:
+            raise ImportError("numpy is required for SemanticCache. Install with 'pip install numpy'.")
+
+        self.similarity_threshold = similarity_threshold
+        self.embedding_fn = embedding_fn or self._hashed_ngram_embedding
+        self.match_tokens = embedding_fn is None
+        self.embedding_dim = embedding_dim
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.use_faiss = use_faiss and FAISS_AVAILABLE
+
+        self._lock = threading.Lock()
+        self._scopes: Dict[str, Dict[str, Any]] = {}  # scope key -> {"vectors", "entries", "index"}
+        self._entry_count = 0
+
+        self.stats = {
+            "lookups": 0,
+            "hits": 0,
+            "misses": 0,
+            "additions": 0,
+            "evictions": 0,
+            "hit_similarity_total": 0.0
+        }
+
+    # Public interface
+
+    def lookup(self, params: Dict[str, Any]) -> Optional[Tuple[Any, float]]:
+        """
+        Find a cached response for a semantically similar request.
+
+        Args:
+            params: Claude API parameters (model, messages, system, temperature,
+                max_tokens)
+
+        Returns:
+            Tuple of (cached response, similarity), or None on a miss
+        """
+        text = self.prompt_text(params)
+        vector = self._embed(text)
+        tokens = self._tokens(text)
+        scope_key = self.scope_key(params)
+
+        with self._lock:
+            self.stats["lookups"] += 1
+            scope = self._scopes.get(scope_key)
+
+            if scope and scope["entries"]:
+                for similarity, position in self._search(scope, vector, k=5):
+                    if similarity < self.similarity_threshold:
+                        break
+
+                    response, timestamp, entry_tokens = scope["entries"][position]
+                    if self._is_valid(timestamp) and entry_tokens == tokens:
+                        self.stats["hits"] += 1
+                        self.stats["hit_similarity_total"] += similarity
+                        logger.debug(f"Semantic cache hit (similarity {similarity:.3f})")
+                        return response, similarity
+
+            self.stats["misses"] += 1
+            return None
+
+    def add(self, params: Dict[str, Any], response: Any) -> None:
+        """
+        Cache a response for a request.
+
+        Args:
+            params: Claude API parameters of the request
+            response: Claude API response to cache
+        """
+        text = self.prompt_text(params)
+        vector = self._embed(text)
+        tokens = self._tokens(text)
+        scope_key = self.scope_key(params)
+
+        with self._lock:
+            scope = self._scopes.setdefault(scope_key, {
+                "vectors": np.zeros((0, self.embedding_dim), dtype=np.float32),
+                "entries": [],
+                "index": None
+            })
+            scope["vectors"] = np.vstack([scope["vectors"], vector[None, :]])
+            scope["entries"].append((response, time.time(), tokens))
+            if self.use_faiss:
+                if scope["index"] is None:
+                    scope["index"] = faiss.IndexFlatIP(self.embedding_dim)
+                scope["index"].add(vector[None, :])
+
+            self._entry_count += 1
+            self.stats["additions"] += 1
+
+            if self._entry_count > self.max_entries:
+                self._evict_oldest()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get hit statistics for the cache.
+
+        Returns:
+            Dictionary with lookup, hit and eviction counts, hit rate and
+            average similarity of hits
+        """
+        with self._lock:
+            hits = self.stats["hits"]
+            lookups = self.stats["lookups"]
+            return {
+                "lookups": lookups,
+                "hits": hits,
+                "misses": self.stats["misses"],
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "avg_hit_similarity": self.stats["hit_similarity_total"] / hits if hits else 0.0,
+                "additions": self.stats["additions"],
+                "evictions": self.stats["evictions"],
+                "entries": self._entry_count,
+                "scopes": len(self._scopes),
+                "backend": "faiss" if self.use_faiss else "numpy"
+            }
+
+    def clear(self) -> None:
+        """Remove all cached responses (statistics are kept)."""
+        with self._lock:
+            self._scopes = {}
+            self._entry_count = 0
+
+    # Request normalization
+
+    @classmethod
+    def scope_key(cls, params: Dict[str, Any]) -> str:
+        """
+        Build the scope a request's cached responses are shared within.
+
+        Only the final turn of a request is embedded, so everything else that
+        decides the response has to match exactly: the generation settings,
+        the earlier turns of the conversation and the operators and symbols of
+        the final turn, which barely move its embedding but change its meaning
+        (``a - b`` against ``a + b``).
+
+        Args:
+            params: Claude API parameters
+
+        Returns:
+            Scope key derived from model, temperature, max_tokens, system
+            prompt, a hash of the earlier turns and the final turn's symbols
+        """
+        messages = params.get("messages", [])
+        history = json.dumps(messages[:-1], sort_keys=True, default=str)
+
+        return json.dumps([
+            params.get("model", ""),
+            params.get("temperature", 0.7),
+            params.get("max_tokens"),
+            params.get("system", ""),
+            hashlib.sha256(history.encode()).hexdigest(),
+            "".join(re.findall(r"[^\w\s]", cls.prompt_text(params)))
+        ], sort_keys=True, default=str)
+
+    @classmethod
+    def prompt_text(cls, params: Dict[str, Any]) -> str:
+        """
+        Extract and normalize the final turn of a request for embedding.
+
+        Earlier turns are not embedded: a long shared history would dominate
+        the embedding and hide a changed final question. They are part of the
+        scope key instead.
+
+        Args:
+            params: Claude API parameters
+
+        Returns:
+            Normalized text of the final message
+        """
+        messages = params.get("messages", [])
+        if not messages:
+            return ""
+
+        message = messages[-1]
+        content = message.get("content", "")
+        if isinstance(content, list):
+            content = " ".join(
+                block.get("text", "") for block in content if isinstance(block, dict)
+            )
+
+        return cls.normalize_text(f"{message.get('role', 'user')} {content}")
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """
+        Normalize text so formatting-only differences embed identically.
+
+        Sentence punctuation ending a word is dropped, while operators and
+        other symbols are kept as tokens of their own, so ``a-b`` and
+        ``a - b`` normalize alike but ``a + b`` does not.
+
+        Args:
+            text: Text to normalize
+
+        Returns:
+            Lowercased text of words and symbols separated by single spaces
+        """
+        text = re.sub(r"[.,!?;:]+(?=\s|$)", " ", text.lower())
+        return " ".join(re.findall(r"\w+|[^\w\s]", text))
+
+    # Helper methods
+
+    def _embed(self, text: str) -> "np.ndarray":
+        """Embed text as an L2-normalized float32 vector."""
+        vector = np.asarray(self.embedding_fn(text), dtype=np.float32).reshape(-1)
+        if vector.shape[0] != self.embedding_dim:
+            raise ValueError(
+                f"Embedding has dimension {vector.shape[0]}, expected {self.embedding_dim}"
+            )
+
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _tokens(self, text: str) -> Optional[FrozenSet[str]]:
+        """Token set a hit must match exactly (None when any similar prompt may match)."""
+        return frozenset(text.split()) if self.match_tokens else None
+
+    def _hashed_ngram_embedding(self, text: str) -> "np.ndarray":
+        """Default embedding: signed feature hashing of words and character trigrams."""
+        vector = np.zeros(self.embedding_dim, dtype=np.float32)
+        words = text.split()
+
+        features = list(words)
+        for word in words:
+            padded = f" {word} "
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+
+        for feature in features:
+            digest = zlib.crc32(feature.encode())
+            vector[digest % self.embedding_dim] += 1.0 if digest & 0x80000000 else -1.0
+
+        return vector
+
+    def _search(self, scope: Dict[str, Any], vector: "np.ndarray", k: int) -> List[Tuple[float, int]]:
+        """Return (similarity, position) pairs of the nearest entries in a scope."""
+        k = min(k, len(scope["entries"]))
+
+        if scope["index"] is not None:
+            similarities, positions = scope["index"].search(vector[None, :], k)
+            return [
+                (float(similarity), int(position))
+                for similarity, position in zip(similarities[0], positions[0])
+                if position >= 0
+            ]
+
+        similarities = scope["vectors"] @ vector
+        nearest = np.argsort(-similarities)[:k]
+        return [(float(similarities[position]), int(position)) for position in nearest]
+
+    def _is_valid(self, timestamp: float) -> bool:
+        """Check if a cached response is still valid based on TTL."""
+        return self.ttl is None or (time.time() - timestamp) < self.ttl
+
+    def _evict_oldest(self) -> None:
+        """Drop the oldest 20% of entries across all scopes and rebuild their indexes."""
+        timestamps = sorted(
+            timestamp
+            for scope in self._scopes.values()
+            for _, timestamp, _ in scope["entries"]
+        )
+        cutoff = timestamps[max(1, len(timestamps) // 5) - 1]
+
+        for scope_key in list(self._scopes):
+            scope = self._scopes[scope_key]
+            keep = [i for i, entry in enumerate(scope["entries"]) if entry[1] > cutoff]
+            removed = len(scope["entries"]) - len(keep)
+            if not removed:
+                continue
+
+            self.stats["evictions"] += removed
+            self._entry_count -= removed
+
+            if not keep:
+                del self._scopes[scope_key]
+                continue
+
+            scope["entries"] = [scope["entries"][i] for i in keep]
+            scope["vectors"] = scope["vectors"][keep]
+            if self.use_faiss:
+                scope["index"] = faiss.IndexFlatIP(self.embedding_dim)
+                scope["index"].add(scope["vectors"])
@@ -0,0 +1,234 @@
+import itertools
+import json
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class StubAnthropicServer:
+    """
+    Local stand-in for the Anthropic Messages API, for offline tests and dry runs.
+
+    Serves ``POST /v1/messages`` and the Message Batches endpoints
+    (``/v1/messages/batches``) on localhost. Point a client at it with
+    ``base_url=server.base_url``. Responses are produced by a responder
+    callable that receives the request parameters and returns the reply text.
+    """
+
+    def __init__(
+        self,
+        responder: Optional[Callable[[Dict[str, Any]], str]] = None,
+        batch_processing_time: float = 0.0,
+        response_delay: float = 0.0,
+        rate_limit_headers: Optional[Dict[str, str]] = None,
+        port: int = 0,
+    ):
+        """
+        Initialize the stub server.
+
+        Args:
+            responder: Function mapping request parameters to reply text
+                (defaults to echoing the last user message)
+            batch_processing_time: Seconds before a submitted batch reports "ended"
+            response_delay: Artificial latency in seconds for /v1/messages
+            rate_limit_headers: Optional anthropic-ratelimit-* headers to send
+            port: Port to listen on (0 picks a free port)
+        """
+        self.responder = responder or self._echo_last_user_message
+        self.batch_processing_time = batch_processing_time
+        self.response_delay = response_delay
+        self.rate_limit_headers = rate_limit_headers or {}
+
+        self.requests: List[Dict[str, Any]] = []  # Every /v1/messages request body
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._make_handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """Base URL to pass to the Anthropic client."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubAnthropicServer":
+        """Start serving in a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"Stub Anthropic server running at {self.base_url}")
+        return self
+
+    def stop(self) -> None:
+        """Stop the server."""
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> "StubAnthropicServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    # Response builders
+
+    def build_message(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Build a Messages API response body for request parameters.
+
+        Args:
+            params: Request parameters
+
+        Returns:
+            Message object as a dictionary
+        """
+        text = self.responder(params)
+        input_chars = len(json.dumps(params.get("messages", []))) + len(json.dumps(params.get("system", "")))
+        return {
+            "id": f"msg_stub_{next(self._ids)}",
+            "type": "message",
+            "role": "assistant",
+            "model": params.get("model", "claude-stub"),
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {
+                "input_tokens": max(1, input_chars // 4),
+                "output_tokens": max(1, len(text) // 4),
+                "cache_creation_input_tokens": 0,
+                "cache_read_input_tokens": 0
+            }
+        }
+
+    def _batch_object(self, batch: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the Message Batch object for a stored batch."""
+        canceled = batch["canceled"]
+        ended = canceled or time.time() - batch["created"] >= self.batch_processing_time
+        created_at = datetime.fromtimestamp(batch["created"], tz=timezone.utc)
+        count = len(batch["requests"])
+        return {
+            "id": batch["id"],
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {
+                "processing": 0 if ended else count,
+                "succeeded": count if ended and not canceled else 0,
+                "errored": 0,
+                "canceled": count if canceled else 0,
+                "expired": 0
+            },
+            "created_at": created_at.isoformat(),
+            "expires_at": (created_at + timedelta(hours=24)).isoformat(),
+            "ended_at": datetime.now(timezone.utc).isoformat() if ended else None,
+            "cancel_initiated_at": None,
+            "archived_at": None,
+            "results_url": f"{self.base_url}/v1/messages/batches/{batch['id']}/results" if ended else None
+        }
+
+    @staticmethod
+    def _echo_last_user_message(params: Dict[str, Any]) -> str:
+        """Default responder: echo the text of the last user message."""
+        for message in reversed(params.get("messages", [])):
+            if message.get("role") == "user":
+                content = message.get("content", "")
+                if isinstance(content, list):
+                    content = "".join(part.get("text", "") for part in content if isinstance(part, dict))
+                return f"Echo: {content}"
+        return "Echo"
+
+    def _make_handler(self) -> type:
+        """Create the request handler class bound to this server."""
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format: str, *args: Any) -> None:
+                logger.debug("stub server: " + format % args)
+
+            def _send_json(self, status: int, body: Any, content_type: str = "application/json") -> None:
+                payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.send_header("request-id", f"req_stub_{uuid.uuid4().hex[:12]}")
+                for name, value in stub.rate_limit_headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _read_body(self) -> Dict[str, Any]:
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length) or b"{}")
+
+            def _not_found(self) -> None:
+                self._send_json(404, {
+                    "type": "error",
+                    "error": {"type": "not_found_error", "message": f"Unknown path {self.path}"}
+                })
+
+            def do_POST(self) -> None:
+                path = self.path.split("?")[0].rstrip("/")
+
+                if path == "/v1/messages":
+                    params = self._read_body()
+                    with stub._lock:
+                        stub.requests.append(params)
+                    if stub.response_delay:
+                        time.sleep(stub.response_delay)
+                    self._send_json(200, stub.build_message(params))
+
+                elif path == "/v1/messages/batches":
+                    body = self._read_body()
+                    batch = {
+                        "id": f"msgbatch_stub_{next(stub._ids)}",
+                        "requests": body.get("requests", []),
+                        "created": time.time(),
+                        "canceled": False
+                    }
+                    with stub._lock:
+                        stub.batches[batch["id"]] = batch
+                    self._send_json(200, stub._batch_object(batch))
+
+                elif path.startswith("/v1/messages/batches/") and path.endswith("/cancel"):
+                    batch = stub.batches.get(path.split("/")[4])
+                    if not batch:
+                        return self._not_found()
+                    batch["canceled"] = True
+                    self._send_json(200, stub._batch_object(batch))
+
+                else:
+                    self._not_found()
+
+            def do_GET(self) -> None:
+                parts = self.path.split("?")[0].rstrip("/").split("/")
+
+                # /v1/messages/batches/{id}[/results]
+                if len(parts) < 5 or parts[1:4] != ["v1", "messages", "batches"]:
+                    return self._not_found()
+
+                batch = stub.batches.get(parts[4])
+                if not batch:
+                    return self._not_found()
+
+                if len(parts) == 5:
+                    self._send_json(200, stub._batch_object(batch))
+                elif len(parts) == 6 and parts[5] == "results":
+                    lines = []
+                    for request in batch["requests"]:
+                        if batch["canceled"]:
+                            result = {"type": "canceled"}
+                        else:
+                            result = {"type": "succeeded", "message": stub.build_message(request["params"])}
+                        lines.append(json.dumps({"custom_id": request["custom_id"], "result": result}))
+                    self._send_json(200, ("\n".join(lines) + "\n").encode(), content_type="application/binary")
+                else:
+                    self._not_found()
+
+        return Handler
@@ -28,6 +28,10 @@ class AgentMonitor:
     and API costs. Can output metrics to log files, JSON, or a web dashboard.
     """
     
+    # Upper bounds of the per-model histogram buckets (the last bucket is open-ended)
+    LATENCY_BUCKETS = (0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0)  # seconds
+    TOKEN_BUCKETS = (64, 256, 512, 1024, 2048, 4096, 8192)  # output tokens
+    
     def __init__(
         self,
         log_dir: str = "logs",
@@ -58,6 +62,9 @@ class AgentMonitor:
         # Create log directory if it doesn't exist
         os.makedirs(log_dir, exist_ok=True)
         
+        # API calls may be tracked from several threads at once
+        self._lock = threading.Lock()
+        
         # Initialize metrics storage
         self.metrics = {
             "api": {
@@ -67,12 +74,15 @@ class AgentMonitor:
                 "total_tokens": 0,
                 "prompt_tokens": 0,
                 "completion_tokens": 0,
+                "cache_creation_input_tokens": 0,
+                "cache_read_input_tokens": 0,
                 "total_cost": 0.0,
                 "hourly_costs": defaultdict(float),
                 "daily_costs": defaultdict(float),
                 "model_usage": defaultdict(int),
                 "response_times": [],
-                "error_counts": defaultdict(int)
+                "error_counts": defaultdict(int),
+                "model_stats": {}  # Per-model latency/token histograms and throughput
             },
             "agents": {
                 "planner": {
@@ -135,49 +145,61 @@ class AgentMonitor:
         model: str,
         response_time: float,
         cost: float,
-        error: Optional[str] = None
+        error: Optional[str] = None,
+        cache_creation_tokens: int = 0,
+        cache_read_tokens: int = 0
     ) -> None:
         """
         Track an API call to Claude.
         
         Args:
             success: Whether the call was successful
-            prompt_tokens: Number of prompt tokens used
+            prompt_tokens: Number of uncached prompt tokens used
             completion_tokens: Number of completion tokens used
             model: Claude model used
             response_time: Time taken for the API call in seconds
             cost: Estimated cost of the API call
             error: Error message if the call failed
+            cache_creation_tokens: Prompt tokens written to the prompt cache
+            cache_read_tokens: Prompt tokens served from the prompt cache
         """
-        # Update API metrics
-        self.metrics["api"]["total_requests"] += 1
-        
-        if success:
-            self.metrics["api"]["successful_requests"] += 1
-        else:
-            self.metrics["api"]["failed_requests"] += 1
-            if error:
-                self.metrics["api"]["error_counts"][error] += 1
-        
-        # Update token and cost metrics
-        self.metrics["api"]["prompt_tokens"] += prompt_tokens
-        self.metrics["api"]["completion_tokens"] += completion_tokens
-        self.metrics["api"]["total_tokens"] += prompt_tokens + completion_tokens
-        self.metrics["api"]["total_cost"] += cost
-        
-        # Update model usage
-        self.metrics["api"]["model_usage"][model] += 1
-        
-        # Update response times
-        self.metrics["api"]["response_times"].append(response_time)
-        
-        # Update hourly and daily costs
-        now = datetime.datetime.now()
-        hour_key = now.strftime("%Y-%m-%d %H:00")
-        day_key = now.strftime("%Y-%m-%d")
-        
-        self.metrics["api"]["hourly_costs"][hour_key] += cost
-        self.metrics["api"]["daily_costs"][day_key] += cost
+        with self._lock:
+            # Update API metrics
+            self.metrics["api"]["total_requests"] += 1
+            
+            if success:
+                self.metrics["api"]["successful_requests"] += 1
+            else:
+                self.metrics["api"]["failed_requests"] += 1
+                if error:
+                    self.metrics["api"]["error_counts"][error] += 1
+            
+            # Update token and cost metrics
+            input_tokens = prompt_tokens + cache_creation_tokens + cache_read_tokens
+            self.metrics["api"]["prompt_tokens"] += prompt_tokens
+            self.metrics["api"]["completion_tokens"] += completion_tokens
+            self.metrics["api"]["cache_creation_input_tokens"] += cache_creation_tokens
+            self.metrics["api"]["cache_read_input_tokens"] += cache_read_tokens
+            self.metrics["api"]["total_tokens"] += input_tokens + completion_tokens
+            self.metrics["api"]["total_cost"] += cost
+            
+            # Update model usage
+            self.metrics["api"]["model_usage"][model] += 1
+            
+            # Update response times
+            self.metrics["api"]["response_times"].append(response_time)
+            
+            # Update per-model histograms and throughput
+            if success:
+                self._track_model_call(model, response_time, input_tokens, completion_tokens)
+            
+            # Update hourly and daily costs
+            now = datetime.datetime.now()
+            hour_key = now.strftime("%Y-%m-%d %H:00")
+            day_key = now.strftime("%Y-%m-%d")
+            
+            self.metrics["api"]["hourly_costs"][hour_key] += cost
+            self.metrics["api"]["daily_costs"][day_key] += cost
         
         # Update system metrics
         self.metrics["system"]["last_update"] = time.time()
@@ -188,10 +210,74 @@ class AgentMonitor:
             import psutil
             process = psutil.Process(os.getpid())
             self.metrics["system"]["memory_usage_mb"] = process.memory_info().rss / (1024 * 1024)
-            self.metrics["system"]["cpu_usage_percent"] = process.cpu_percent(interval=0.1)
+            # Non-blocking: usage since the previous call, so tracking adds no latency
+            self.metrics["system"]["cpu_usage_percent"] = process.cpu_percent(interval=None)
         except ImportError:
             pass
     
+    def _track_model_call(
+        self,
+        model: str,
+        response_time: float,
+        input_tokens: int,
+        output_tokens: int
+    ) -> None:
+        """Add a successful call to the per-model latency/token histograms (lock must be held)."""
+        if model not in self.metrics["api"]["model_stats"]:
+            self.metrics["api"]["model_stats"][model] = {
+                "requests": 0,
+                "input_tokens": 0,
+                "output_tokens": 0,
+                "total_response_time": 0.0,
+                "tokens_per_second": 0.0,
+                "latency_histogram": self._empty_histogram(self.LATENCY_BUCKETS),
+                "output_tokens_histogram": self._empty_histogram(self.TOKEN_BUCKETS)
+            }
+        
+        model_stats = self.metrics["api"]["model_stats"][model]
+        model_stats["requests"] += 1
+        model_stats["input_tokens"] += input_tokens
+        model_stats["output_tokens"] += output_tokens
+        model_stats["total_response_time"] += response_time
+        
+        # Output tokens generated per second of API time
+        if model_stats["total_response_time"] > 0:
+            model_stats["tokens_per_second"] = model_stats["output_tokens"] / model_stats["total_response_time"]
+        
+        model_stats["latency_histogram"][self._bucket_label(response_time, self.LATENCY_BUCKETS)] += 1
+        model_stats["output_tokens_histogram"][self._bucket_label(output_tokens, self.TOKEN_BUCKETS)] += 1
+    
+    @staticmethod
+    def _empty_histogram(bounds: tuple) -> Dict[str, int]:
+        """Create an empty histogram with one bucket per upper bound plus an overflow bucket."""
+        histogram = {f"<={bound}": 0 for bound in bounds}
+        histogram[f">{bounds[-1]}"] = 0
+        return histogram
+    
+    @staticmethod
+    def _bucket_label(value: float, bounds: tuple) -> str:
+        """Get the histogram bucket label for a value."""
+        for bound in bounds:
+            if value <= bound:
+                return f"<={bound}"
+        return f">{bounds[-1]}"
+    
+    def get_model_throughput(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get per-model throughput and latency metrics.
+        
+        Returns:
+            Dictionary mapping model names to request counts, average latency,
+            output tokens per second and latency/token histograms
+        """
+        with self._lock:
+            model_stats = json.loads(json.dumps(self.metrics["api"]["model_stats"]))
+        
+        for stats in model_stats.values():
+            stats["avg_response_time"] = stats["total_response_time"] / stats["requests"]
+        
+        return model_stats
+    
     def track_agent_invocation(
         self,
         agent_type: str,
@@ -295,7 +381,8 @@ class AgentMonitor:
         self.metrics["system"]["uptime"] = time.time() - self.metrics["system"]["start_time"]
         
         # Create a copy to avoid external modification
-        return json.loads(json.dumps(self.metrics))
+        with self._lock:
+            return json.loads(json.dumps(self.metrics))
     
     def get_daily_cost_projection(self) -> Dict[str, Any]:
         """
@@ -0,0 +1,437 @@
+import itertools
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from ..utils.token_counter import TokenCounter
+
+# OpenTelemetry is optional; without it spans are only recorded in-process
+try:
+    from opentelemetry import trace as otel_trace
+    OTEL_AVAILABLE = True
+except ImportError:
+    OTEL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Span currently open in this thread or asyncio task
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+class Span:
+    """A timed operation within a trace, with attributes such as token usage."""
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        span_id: str,
+        parent_id: Optional[str] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Initialize the span.
+
+        Args:
+            name: Operation name (e.g. "plan", "step", "critique")
+            trace_id: ID of the trace (the orchestration task ID)
+            span_id: ID of this span, unique within the tracer
+            parent_id: ID of the enclosing span, if any
+            attributes: Initial attributes
+        """
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.thread = threading.current_thread().name
+        self.start_time = time.time()
+        self.end_time: Optional[float] = None
+        self.otel_span: Any = None
+        self._lock = threading.Lock()
+
+    @property
+    def duration(self) -> float:
+        """Duration in seconds (up to now while the span is open)."""
+        return (self.end_time or time.time()) - self.start_time
+
+    def set_attributes(self, **attributes: Any) -> None:
+        """
+        Set attributes on the span.
+
+        Args:
+            **attributes: Attribute values
+        """
+        with self._lock:
+            self.attributes.update(attributes)
+        self._export_attributes(attributes)
+
+    def add_to_attributes(self, **increments: float) -> None:
+        """
+        Add to numeric attributes (e.g. token counts over several API calls).
+
+        Args:
+            **increments: Amounts to add per attribute
+        """
+        with self._lock:
+            for key, value in increments.items():
+                self.attributes[key] = self.attributes.get(key, 0) + value
+            totals = {key: self.attributes[key] for key in increments}
+        self._export_attributes(totals)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert the span to a dictionary.
+
+        Returns:
+            Dictionary representation of the span
+        """
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "thread": self.thread,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "duration": self.duration,
+            "attributes": dict(self.attributes),
+        }
+
+    def _export_attributes(self, attributes: Dict[str, Any]) -> None:
+        """Forward attributes to the OpenTelemetry span, if any."""
+        if self.otel_span is None:
+            return
+        for key, value in attributes.items():
+            self.otel_span.set_attribute(key, _otel_value(value))
+
+class Tracer:
+    """
+    Records spans for orchestration phases, grouped by trace (task).
+
+    Spans are kept in memory for the most recent traces so they can be
+    rendered by TimelineExporter, and mirrored to OpenTelemetry when it is
+    installed. The span opened with ``span`` is current for the enclosing
+    thread, so API calls made inside it add their token usage to it; work
+    handed to another thread passes its parent explicitly.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        export_to_otel: bool = True,
+        service_name: str = "claude_agents",
+        max_traces: int = 100,
+    ):
+        """
+        Initialize the tracer.
+
+        Args:
+            enabled: Whether to record spans (a disabled tracer costs next to nothing)
+            export_to_otel: Whether to mirror spans to OpenTelemetry if it is installed
+            service_name: Instrumentation name used for the OpenTelemetry tracer
+            max_traces: Number of most recent traces kept in memory
+        """
+        self.enabled = enabled
+        self.max_traces = max_traces
+        self._traces: "OrderedDict[str, List[Span]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+        self._otel_tracer = None
+        if enabled and export_to_otel and OTEL_AVAILABLE:
+            self._otel_tracer = otel_trace.get_tracer(service_name)
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        parent: Optional[Span] = None,
+        trace_id: Optional[str] = None,
+        **attributes: Any,
+    ) -> Iterator[Span]:
+        """
+        Record a span for the duration of a block.
+
+        Args:
+            name: Operation name
+            parent: Parent span (defaults to the current span of this thread)
+            trace_id: Trace ID for a root span (defaults to the parent's trace)
+            **attributes: Initial attributes
+
+        Yields:
+            The open span
+        """
+        if not self.enabled:
+            yield Span(name, trace_id=trace_id or "", span_id="", attributes=attributes)
+            return
+
+        parent = parent or _current_span.get()
+        trace_id = trace_id or (parent.trace_id if parent else str(uuid.uuid4()))
+        span = Span(
+            name,
+            trace_id=trace_id,
+            span_id=str(next(self._ids)),
+            parent_id=parent.span_id if parent else None,
+            attributes=attributes,
+        )
+
+        if self._otel_tracer is not None:
+            context = None
+            if parent is not None and parent.otel_span is not None:
+                context = otel_trace.set_span_in_context(parent.otel_span)
+            span.otel_span = self._otel_tracer.start_span(
+                name,
+                context=context,
+                attributes={key: _otel_value(value) for key, value in attributes.items()},
+            )
+
+        token = _current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.set_attributes(error=str(e))
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_time = time.time()
+            if span.otel_span is not None:
+                span.otel_span.end()
+            self._record(span)
+
+    def get_spans(self, trace_id: str) -> List[Span]:
+        """
+        Get the finished spans of a trace.
+
+        Args:
+            trace_id: ID of the trace
+
+        Returns:
+            Spans ordered by start time
+        """
+        with self._lock:
+            spans = list(self._traces.get(trace_id, []))
+        return sorted(spans, key=lambda span: span.start_time)
+
+    def trace_ids(self) -> List[str]:
+        """
+        List the traces held in memory.
+
+        Returns:
+            Trace IDs, oldest first
+        """
+        with self._lock:
+            return list(self._traces)
+
+    def _record(self, span: Span) -> None:
+        """Keep a finished span, evicting the oldest traces beyond max_traces."""
+        with self._lock:
+            if span.trace_id not in self._traces:
+                self._traces[span.trace_id] = []
+                while len(self._traces) > self.max_traces:
+                    self._traces.popitem(last=False)
+            self._traces[span.trace_id].append(span)
+
+def current_span() -> Optional[Span]:
+    """
+    Get the span open in the current thread or asyncio task.
+
+    Returns:
+        The current span, or None outside of any span
+    """
+    return _current_span.get()
+
+def record_usage(response: Any) -> None:
+    """
+    Add the model and exact token usage of an API response to the current span.
+
+    Args:
+        response: Claude API response
+    """
+    span = _current_span.get()
+    if span is None:
+        return
+
+    usage = TokenCounter.usage_from_response(response)
+    model = getattr(response, "model", None)
+    if model:
+        span.set_attributes(model=model)
+    span.add_to_attributes(
+        api_calls=1,
+        prompt_tokens=usage["input_tokens"],
+        completion_tokens=usage["output_tokens"],
+        cache_read_tokens=usage["cache_read_input_tokens"],
+        cache_creation_tokens=usage["cache_creation_input_tokens"],
+    )
+
+def record_queue_wait(seconds: float) -> None:
+    """
+    Add time spent waiting for rate limit capacity to the current span.
+
+    Args:
+        seconds: Time waited in seconds
+    """
+    span = _current_span.get()
+    if span is not None and seconds > 0:
+        span.add_to_attributes(rate_limit_wait_seconds=seconds)
+
+class TimelineExporter:
+    """
+    Renders the spans of a task as a timeline or flamegraph JSON.
+
+    The timeline lists every span with its offset from the start of the task
+    and the thread it ran on. For each plan execution it also reports the
+    critical path through the steps (following, from the last step to
+    finish, the dependency that finished last) and how much worker time sat
+    idle while steps were running.
+    """
+
+    def __init__(self, tracer: Tracer):
+        """
+        Initialize the exporter.
+
+        Args:
+            tracer: Tracer holding the recorded spans
+        """
+        self.tracer = tracer
+
+    def timeline(self, trace_id: str) -> Dict[str, Any]:
+        """
+        Render a task's spans as a timeline.
+
+        Args:
+            trace_id: ID of the trace (task)
+
+        Returns:
+            Dictionary with the spans (offsets in seconds from the task start)
+            and per-execution critical paths and idle worker time
+        """
+        spans = self.tracer.get_spans(trace_id)
+        if not spans:
+            return {"trace_id": trace_id, "duration": 0.0, "spans": [], "executions": []}
+
+        start = spans[0].start_time
+        end = max(span.end_time or span.start_time for span in spans)
+
+        return {
+            "trace_id": trace_id,
+            "duration": end - start,
+            "spans": [
+                {
+                    "span_id": span.span_id,
+                    "parent_id": span.parent_id,
+                    "name": span.name,
+                    "thread": span.thread,
+                    "start": span.start_time - start,
+                    "duration": span.duration,
+                    "attributes": dict(span.attributes),
+                }
+                for span in spans
+            ],
+            "executions": [
+                self._execution_profile(span, spans)
+                for span in spans
+                if span.name == "execute"
+            ],
+        }
+
+    def flamegraph(self, trace_id: str) -> Dict[str, Any]:
+        """
+        Render a task's spans as nested flamegraph JSON (d3-flame-graph format).
+
+        Args:
+            trace_id: ID of the trace (task)
+
+        Returns:
+            Root node with name, value (milliseconds) and children
+        """
+        spans = self.tracer.get_spans(trace_id)
+        children: Dict[Optional[str], List[Span]] = {}
+        for span in spans:
+            children.setdefault(span.parent_id, []).append(span)
+
+        def node(span: Span) -> Dict[str, Any]:
+            return {
+                "name": span.name if "step.id" not in span.attributes else f"{span.name} {span.attributes['step.id']}",
+                "value": round(span.duration * 1000, 3),
+                "children": [node(child) for child in children.get(span.span_id, [])],
+            }
+
+        known_ids = {span.span_id for span in spans}
+        roots = [span for span in spans if span.parent_id not in known_ids]
+        if len(roots) == 1:
+            return node(roots[0])
+
+        return {
+            "name": trace_id,
+            "value": round(sum(root.duration for root in roots) * 1000, 3),
+            "children": [node(root) for root in roots],
+        }
+
+    def save(self, trace_id: str, path: str, format: str = "timeline") -> None:
+        """
+        Write a task's timeline or flamegraph to a JSON file.
+
+        Args:
+            trace_id: ID of the trace (task)
+            path: Output file path
+            format: "timeline" or "flamegraph"
+        """
+        if format not in ("timeline", "flamegraph"):
+            raise ValueError(f"Unknown trace format: {format}")
+
+        data = self.timeline(trace_id) if format == "timeline" else self.flamegraph(trace_id)
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2, default=str)
+
+    @staticmethod
+    def _execution_profile(execute_span: Span, spans: List[Span]) -> Dict[str, Any]:
+        """Compute the critical path and idle worker time of one plan execution."""
+        steps = {
+            span.attributes["step.id"]: span
+            for span in spans
+            if span.parent_id == execute_span.span_id and "step.id" in span.attributes
+        }
+        profile = {
+            "span_id": execute_span.span_id,
+            "iteration": execute_span.attributes.get("iteration"),
+            "critical_path": [],
+            "critical_path_seconds": 0.0,
+            "busy_seconds": 0.0,
+            "idle_worker_seconds": 0.0,
+        }
+        if not steps:
+            return profile
+
+        # Walk back from the last step to finish through its latest dependency
+        path = []
+        step = max(steps.values(), key=lambda span: span.end_time)
+        while step is not None:
+            path.append(step.attributes["step.id"])
+            deps = [steps[dep] for dep in step.attributes.get("step.dependencies", []) if dep in steps]
+            step = max(deps, key=lambda span: span.end_time) if deps else None
+        path.reverse()
+
+        window_start = min(span.start_time for span in steps.values())
+        window_end = max(span.end_time for span in steps.values())
+        busy = sum(span.duration for span in steps.values())
+        workers = min(execute_span.attributes.get("max_concurrency", 1), len(steps))
+
+        profile["critical_path"] = path
+        profile["critical_path_seconds"] = steps[path[-1]].end_time - steps[path[0]].start_time
+        profile["busy_seconds"] = busy
+        profile["idle_worker_seconds"] = max(0.0, workers * (window_end - window_start) - busy)
+        return profile
+
+def _otel_value(value: Any) -> Any:
+    """Convert an attribute value to a type OpenTelemetry accepts."""
+    if isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, (list, tuple)) and all(isinstance(item, (str, bool, int, float)) for item in value):
+        return list(value)
+    return str(value)
@@ -0,0 +1,364 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Union
+
+from ..agents.critic import CriticAgent
+from ..agents.executor import ExecutorAgent
+from ..agents.planner import PlannerAgent
+from ..api.async_client import AsyncClaudeAPIClient, current_task_key
+from .pipeline import OrchestrationPipeline
+from .scheduler import DAGScheduler
+
+logger = logging.getLogger(__name__)
+
+class TaskState:
+    """State of one task run by the AsyncOrchestrationPipeline."""
+
+    def __init__(
+        self,
+        description: str,
+        context: Optional[Dict[str, Any]] = None,
+        task_id: Optional[str] = None,
+    ):
+        """
+        Initialize the task state.
+
+        Args:
+            description: Description of the task
+            context: Optional additional context for the task
+            task_id: Optional task ID (a UUID is generated if None)
+        """
+        self.id = task_id or str(uuid.uuid4())
+        self.description = description
+        self.context = context or {}
+        self.status = "initialized"
+        self.plan: Dict[str, Any] = {}
+        self.execution_results: Dict[str, Dict[str, Any]] = {}
+        self.feedback: Dict[str, Dict[str, Any]] = {}
+        self.iterations = 0
+        self.error: Optional[str] = None
+        self.start_time: Optional[float] = None
+        self.end_time: Optional[float] = None
+
+    def result(self) -> Dict[str, Any]:
+        """
+        Get the outcome of the task, in the shape returned by OrchestrationPipeline.execute.
+
+        Returns:
+            Results of the orchestration process
+        """
+        if self.status == "error":
+            return {
+                "task_id": self.id,
+                "status": "error",
+                "error": self.error
+            }
+
+        return {
+            "task_id": self.id,
+            "status": self.status,
+            "iterations": self.iterations,
+            "final_plan": self.plan,
+            "final_results": self.execution_results.get(f"iteration_{self.iterations}", {}),
+            "final_feedback": self.feedback.get(f"iteration_{self.iterations}", {}),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert the state to a dictionary.
+
+        Returns:
+            Dictionary representation of the task state
+        """
+        return {
+            "id": self.id,
+            "description": self.description,
+            "context": self.context,
+            "status": self.status,
+            "plan": self.plan,
+            "execution_results": self.execution_results,
+            "feedback": self.feedback,
+            "iterations": self.iterations,
+            "error": self.error,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+        }
+
+class AsyncOrchestrationPipeline:
+    """
+    Runs the planner-executor-critic workflow for many tasks concurrently in one event loop.
+
+    Each task has its own TaskState; the agents are shared and called without
+    conversation history. All API calls go through one AsyncClaudeAPIClient,
+    whose FairConcurrencyBudget caps the calls in flight across all tasks and
+    shares free slots between tasks in round-robin order.
+    """
+
+    def __init__(
+        self,
+        api_client: AsyncClaudeAPIClient,
+        planner: Optional[PlannerAgent] = None,
+        executor: Optional[ExecutorAgent] = None,
+        critic: Optional[CriticAgent] = None,
+        max_iterations: int = 3,
+        feedback_threshold: float = 7.0,
+        max_concurrent_tasks: Optional[int] = None,
+        max_finished_tasks: int = 100,
+    ):
+        """
+        Initialize the async orchestration pipeline.
+
+        Args:
+            api_client: Async Claude API client instance
+            planner: Optional custom planner agent (if None, a default one is created)
+            executor: Optional custom executor agent (if None, a default one is created)
+            critic: Optional custom critic agent (if None, a default one is created)
+            max_iterations: Maximum number of planning-execution-critique iterations per task
+            feedback_threshold: Quality threshold (0-10) for critic feedback to trigger refinement
+            max_concurrent_tasks: Optional cap on tasks running at once (the
+                in-flight call budget applies either way)
+            max_finished_tasks: Number of finished task states kept in
+                self.tasks (the longest finished are dropped first)
+        """
+        self.api_client = api_client
+        self.planner = planner or PlannerAgent(api_client)
+        self.executor = executor or ExecutorAgent(api_client)
+        self.critic = critic or CriticAgent(api_client)
+
+        self.max_iterations = max_iterations
+        self.feedback_threshold = feedback_threshold
+        self.max_concurrent_tasks = max_concurrent_tasks
+        self._task_slots: Optional[asyncio.Semaphore] = None
+
+        # Task states by task ID: running tasks and the most recently finished ones
+        self.max_finished_tasks = max_finished_tasks
+        self.tasks: "OrderedDict[str, TaskState]" = OrderedDict()
+        self._running: Set[str] = set()
+
+    async def run_tasks(self, tasks: List[Union[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        Run several tasks concurrently.
+
+        Args:
+            tasks: Task descriptions, or dictionaries with "description" and
+                optional "context" and "id"
+
+        Returns:
+            Results of each task, in the order given
+        """
+        runs = []
+        for task in tasks:
+            if isinstance(task, str):
+                task = {"description": task}
+            runs.append(self.run_task(task["description"], task.get("context"), task.get("id")))
+
+        return list(await asyncio.gather(*runs))
+
+    async def run_task(
+        self,
+        task_description: str,
+        task_context: Optional[Dict[str, Any]] = None,
+        task_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run the full orchestration workflow on one task.
+
+        Args:
+            task_description: Description of the task to execute
+            task_context: Optional additional context for the task
+            task_id: Optional task ID (a UUID is generated if None)
+
+        Returns:
+            Results of the orchestration process
+
+        Raises:
+            ValueError: If a task with the same ID is still running
+        """
+        if task_id in self._running:
+            raise ValueError(f"Task {task_id} is already running")
+
+        state = TaskState(task_description, task_context, task_id)
+        self.tasks.pop(state.id, None)
+        self.tasks[state.id] = state
+        self._running.add(state.id)
+
+        if self.max_concurrent_tasks is not None and self._task_slots is None:
+            self._task_slots = asyncio.Semaphore(self.max_concurrent_tasks)
+
+        # Every API call made for this task queues under its ID in the budget
+        token = current_task_key.set(state.id)
+        try:
+            if self._task_slots is None:
+                await self._run(state)
+            else:
+                async with self._task_slots:
+                    await self._run(state)
+        finally:
+            current_task_key.reset(token)
+            self._finish(state.id)
+
+        return state.result()
+
+    def _finish(self, task_id: str) -> None:
+        """
+        Mark a task as finished and drop the oldest finished task states over the limit.
+
+        Args:
+            task_id: ID of the finished task
+        """
+        self._running.discard(task_id)
+        self.tasks.move_to_end(task_id)
+
+        finished = [tid for tid in self.tasks if tid not in self._running]
+        for tid in finished[:max(0, len(finished) - self.max_finished_tasks)]:
+            del self.tasks[tid]
+
+    async def _run(self, state: TaskState) -> None:
+        """
+        Plan, execute and critique a task until it meets the quality threshold.
+
+        Args:
+            state: State of the task, updated in place
+        """
+        state.status = "in_progress"
+        state.start_time = time.time()
+
+        try:
+            # Phase 1: Planning
+            logger.info(f"Task {state.id}: starting planning phase for: {state.description[:50]}...")
+            state.plan = await self.planner.process_async(state.description)
+
+            for iteration in range(self.max_iterations):
+                state.iterations = iteration + 1
+                logger.info(f"Task {state.id}: starting iteration {iteration + 1}/{self.max_iterations}")
+
+                # Phase 2: Execution
+                execution_results = await self._execute_plan(state.plan)
+                state.execution_results[f"iteration_{iteration + 1}"] = execution_results
+
+                # Phase 3: Critique
+                evaluation_data, requirements = OrchestrationPipeline._evaluation_request(execution_results, state.plan)
+                feedback = await self.critic.process_async(evaluation_data, requirements)
+                state.feedback[f"iteration_{iteration + 1}"] = feedback
+
+                quality_score = feedback.get("quality_score") or 0
+                if quality_score >= self.feedback_threshold and feedback.get("meets_requirements", False):
+                    logger.info(f"Task {state.id}: quality threshold met ({quality_score} >= {self.feedback_threshold})")
+                    state.status = "completed"
+                    break
+
+                if iteration == self.max_iterations - 1:
+                    logger.warning(f"Task {state.id}: max iterations reached without meeting quality threshold")
+                    state.status = "max_iterations_reached"
+                    break
+
+                logger.info(f"Task {state.id}: quality threshold not met ({quality_score} < {self.feedback_threshold}). Refining plan.")
+                state.plan = await self.planner.refine_plan_async(state.plan, feedback.get("overall_feedback", ""))
+
+        except Exception as e:
+            logger.error(f"Error in task {state.id}: {str(e)}")
+            state.status = "error"
+            state.error = str(e)
+
+        finally:
+            state.end_time = time.time()
+
+    async def _execute_plan(self, plan: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Execute all steps in a plan and summarize the results.
+
+        Args:
+            plan: Plan with steps to execute
+
+        Returns:
+            Execution results for all steps
+
+        Raises:
+            DependencyCycleError: If step dependencies contain a cycle
+        """
+        steps = plan.get("steps", [])
+        results = {
+            "step_results": {},
+            "summary": {},
+            "start_time": time.time(),
+            "end_time": None
+        }
+
+        results["step_results"] = await self._execute_steps(steps, plan.get("objective", ""))
+
+        results["end_time"] = time.time()
+        results["duration"] = results["end_time"] - results["start_time"]
+        results["total_steps"] = len(steps)
+        results["completed_steps"] = len(results["step_results"])
+
+        summary_task = OrchestrationPipeline._summary_task(plan, results["step_results"])
+        summary_result = await self.executor.process_async(summary_task)
+        results["summary"] = summary_result.get("completion", "")
+
+        return results
+
+    async def _execute_steps(self, steps: List[Dict[str, Any]], objective: str) -> Dict[str, Any]:
+        """
+        Execute steps concurrently, starting each one as soon as its dependencies finish.
+
+        Args:
+            steps: List of steps to execute
+            objective: Overall plan objective
+
+        Returns:
+            Map of step IDs to execution results
+
+        Raises:
+            DependencyCycleError: If step dependencies contain a cycle
+        """
+        steps_by_id = {step.get("id", ""): step for step in steps if step.get("id", "")}
+        dependencies = {
+            step_id: [dep for dep in step.get("dependencies", []) if dep in steps_by_id]
+            for step_id, step in steps_by_id.items()
+        }
+
+        # Reject dependency cycles before executing anything
+        DAGScheduler.topological_order(dependencies)
+
+        dependents: Dict[str, List[str]] = {step_id: [] for step_id in dependencies}
+        remaining = {step_id: len(set(deps)) for step_id, deps in dependencies.items()}
+        for step_id, deps in dependencies.items():
+            for dep in set(deps):
+                dependents[dep].append(step_id)
+
+        results: Dict[str, Any] = {}
+        running: Dict[asyncio.Task, str] = {}
+
+        def start(step_id: str) -> None:
+            plan_context = {"objective": objective, "previous_results": dict(results)}
+            logger.info(f"Executing step: {step_id} - {steps_by_id[step_id].get('description', '')[:50]}...")
+            task = asyncio.create_task(self.executor.process_step_async(steps_by_id[step_id], plan_context))
+            running[task] = step_id
+
+        for step_id, count in remaining.items():
+            if count == 0:
+                start(step_id)
+
+        while running:
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                step_id = running.pop(task)
+                try:
+                    results[step_id] = task.result()
+                except Exception as e:
+                    logger.error(f"Error executing step {step_id}: {str(e)}")
+                    # Dependent steps still run with the failed result in their context
+                    results[step_id] = {
+                        "error": str(e),
+                        "status": "failed"
+                    }
+
+                for dependent in dependents[step_id]:
+                    remaining[dependent] -= 1
+                    if remaining[dependent] == 0:
+                        start(dependent)
+
+        return results
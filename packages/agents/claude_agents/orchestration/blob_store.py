@@ -0,0 +1,140 @@
+import hashlib
+import logging
+import os
+import tempfile
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+# Key marking a dictionary as a reference to a stored blob
+BLOB_REF_KEY = "__blob__"
+
+def is_blob_ref(value: Any) -> bool:
+    """
+    Check whether a value is a reference to a stored blob.
+
+    Args:
+        value: Value to check
+
+    Returns:
+        True if the value is a blob reference
+    """
+    return isinstance(value, dict) and BLOB_REF_KEY in value
+
+class BlobStore:
+    """
+    Local content-addressed store for large pipeline outputs.
+
+    Strings above a size threshold are written to a file named by the
+    SHA-256 of their content and replaced by a small reference dictionary
+    (``{"__blob__": <digest>, "size": <bytes>}``). References are plain JSON,
+    so they can be checkpointed and hashed like the outputs they stand for,
+    and identical outputs are stored once. Blobs are read back only when
+    a reference is resolved.
+    """
+
+    def __init__(self, blob_dir: str = "blobs", min_size: int = 16384):
+        """
+        Initialize the blob store.
+
+        Args:
+            blob_dir: Directory holding the blobs
+            min_size: Size in bytes above which strings are stored as blobs
+        """
+        self.blob_dir = blob_dir
+        self.min_size = min_size
+
+        os.makedirs(blob_dir, exist_ok=True)
+
+    def put(self, content: str) -> Dict[str, Any]:
+        """
+        Store a string.
+
+        Args:
+            content: String to store
+
+        Returns:
+            Reference to the stored blob
+        """
+        data = content.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file first, so readers never see a partial blob
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+                logger.debug(f"Stored blob {digest} ({len(data)} bytes)")
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+        return {BLOB_REF_KEY: digest, "size": len(data)}
+
+    def get(self, ref: Dict[str, Any]) -> str:
+        """
+        Load a stored string.
+
+        Args:
+            ref: Reference returned by put
+
+        Returns:
+            The stored string
+
+        Raises:
+            KeyError: If the blob does not exist
+        """
+        path = self._path(ref[BLOB_REF_KEY])
+        if not os.path.exists(path):
+            raise KeyError(f"Blob {ref[BLOB_REF_KEY]} not found")
+
+        with open(path, "rb") as f:
+            return f.read().decode("utf-8")
+
+    def externalize(self, data: Any) -> Any:
+        """
+        Replace large strings in nested data with blob references.
+
+        Args:
+            data: JSON-like data (dictionaries, lists and scalars)
+
+        Returns:
+            Copy of the data with strings above min_size stored as blobs
+        """
+        if isinstance(data, str):
+            # A character is at most 4 bytes, so short strings need no encoding
+            if len(data) * 4 > self.min_size and len(data.encode("utf-8")) > self.min_size:
+                return self.put(data)
+            return data
+        if isinstance(data, dict) and not is_blob_ref(data):
+            return {key: self.externalize(value) for key, value in data.items()}
+        if isinstance(data, (list, tuple)):
+            return [self.externalize(item) for item in data]
+        return data
+
+    def resolve(self, data: Any) -> Any:
+        """
+        Replace blob references in nested data with their content.
+
+        Args:
+            data: Data that may contain blob references
+
+        Returns:
+            Copy of the data with references loaded (unchanged if it has none)
+        """
+        if is_blob_ref(data):
+            return self.get(data)
+        if isinstance(data, dict):
+            return {key: self.resolve(value) for key, value in data.items()}
+        if isinstance(data, list):
+            return [self.resolve(item) for item in data]
+        return data
+
+    def _path(self, digest: str) -> str:
+        """Get the file path of a blob, fanned out by the first digest byte."""
+        return os.path.join(self.blob_dir, digest[:2], digest[2:])
@@ -0,0 +1,138 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class CheckpointStore:
+    """
+    Local append-only checkpoint log for orchestration tasks.
+
+    Each task has a JSON Lines file of events (task, plan, step, execution,
+    feedback, status). Checkpointing a step appends one line instead of
+    rewriting the task state, and load replays the events to rebuild it. A
+    line cut short by a crash mid-write is skipped on load, and the next
+    event is written on a new line after it.
+    """
+
+    def __init__(self, checkpoint_dir: str = "checkpoints", fsync: bool = False):
+        """
+        Initialize the checkpoint store.
+
+        Args:
+            checkpoint_dir: Directory holding one checkpoint file per task
+            fsync: Whether to fsync after every event (survives power loss,
+                not just process crashes, at the cost of slower writes)
+        """
+        self.checkpoint_dir = checkpoint_dir
+        self.fsync = fsync
+        self._lock = threading.Lock()
+
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+    def append(self, task_id: str, event_type: str, **data: Any) -> None:
+        """
+        Append an event to a task's checkpoint.
+
+        Args:
+            task_id: ID of the task
+            event_type: Event type ("task", "plan", "step", "execution", "feedback" or "status")
+            **data: JSON-serializable event data
+        """
+        event = {"type": event_type, "timestamp": time.time(), **data}
+        line = json.dumps(event, default=str) + "\n"
+
+        with self._lock:
+            with open(self._path(task_id), "a+b") as f:
+                # Start a new line if a crash left the last one unterminated
+                end = f.seek(0, os.SEEK_END)
+                if end:
+                    f.seek(end - 1)
+                    if f.read(1) != b"\n":
+                        line = "\n" + line
+                f.write(line.encode("utf-8"))
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+
+    def load(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Rebuild a task's state from its checkpoint.
+
+        Args:
+            task_id: ID of the task
+
+        Returns:
+            Dictionary with the task, latest plan and the iteration it is for,
+            execution results and feedback by iteration, completed step
+            results by step key, and status (None if there is no checkpoint)
+        """
+        path = self._path(task_id)
+        if not os.path.exists(path):
+            return None
+
+        state = {
+            "task": {},
+            "plan": {},
+            "plan_iteration": 0,
+            "execution_results": {},
+            "feedback": {},
+            "step_results": {},
+            "status": "initialized",
+        }
+
+        with open(path, "r") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping incomplete checkpoint line for task {task_id}")
+                    continue
+
+                event_type = event.get("type")
+                if event_type == "task":
+                    state["task"] = event["task"]
+                elif event_type == "plan":
+                    state["plan"] = event["plan"]
+                    state["plan_iteration"] = event["iteration"]
+                elif event_type == "step":
+                    state["step_results"][event["key"]] = event["result"]
+                elif event_type == "execution":
+                    state["execution_results"][f"iteration_{event['iteration']}"] = event["results"]
+                elif event_type == "feedback":
+                    state["feedback"][f"iteration_{event['iteration']}"] = event["feedback"]
+                elif event_type == "status":
+                    state["status"] = event["status"]
+
+        return state
+
+    def list_tasks(self) -> List[str]:
+        """
+        List the tasks that have a checkpoint.
+
+        Returns:
+            Task IDs
+        """
+        return sorted(
+            name[:-len(".jsonl")]
+            for name in os.listdir(self.checkpoint_dir)
+            if name.endswith(".jsonl")
+        )
+
+    def delete(self, task_id: str) -> None:
+        """
+        Delete a task's checkpoint.
+
+        Args:
+            task_id: ID of the task
+        """
+        path = self._path(task_id)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def _path(self, task_id: str) -> str:
+        """Get the checkpoint file path for a task."""
+        return os.path.join(self.checkpoint_dir, f"{os.path.basename(task_id)}.jsonl")
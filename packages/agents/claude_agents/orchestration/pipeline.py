@@ -1,16 +1,29 @@
+import hashlib
+import json
 import logging
+import threading
 import time
 import uuid
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Any, Callable, Dict, List, Optional, Union
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 
 from ..agents.critic import CriticAgent
 from ..agents.executor import ExecutorAgent
 from ..agents.planner import PlannerAgent
 from ..api.client import ClaudeAPIClient
+from ..api.model_router import TIER_ORDER, ModelRouter
+from ..monitoring.tracing import Tracer, current_span
+from .blob_store import BlobStore
+from .checkpoint import CheckpointStore
+from .scheduler import DAGScheduler
+from .task_decomposition import estimate_complexity
 
 logger = logging.getLogger(__name__)
 
+# Assumed latency of the fast tier relative to the routed tiers, until both have been observed
+FAST_TIER_LATENCY_FACTOR = 0.5
+
 class OrchestrationPipeline:
     """
     Orchestrates the multi-agent workflow by coordinating Planner, Executor, and Critic agents.
@@ -26,6 +39,13 @@ class OrchestrationPipeline:
         max_iterations: int = 3,
         feedback_threshold: float = 7.0,
         parallel_execution: bool = True,
+        max_concurrency: int = 5,
+        cache_step_results: bool = True,
+        incremental_critique: bool = False,
+        checkpoint_store: Optional[CheckpointStore] = None,
+        tracer: Optional[Tracer] = None,
+        model_router: Optional[ModelRouter] = None,
+        blob_store: Optional[BlobStore] = None,
     ):
         """
         Initialize the orchestration pipeline.
@@ -38,6 +58,24 @@ class OrchestrationPipeline:
             max_iterations: Maximum number of planning-execution-critique iterations
             feedback_threshold: Quality threshold (0-10) for critic feedback to trigger refinement
             parallel_execution: Whether to execute independent steps in parallel
+            max_concurrency: Maximum number of steps executed at once in parallel mode
+            cache_step_results: Whether to reuse results of unchanged steps across
+                refinement iterations
+            incremental_critique: Whether to evaluate each step result as soon as it
+                lands, concurrently with the remaining steps, instead of critiquing
+                all results at the end; a failing step stops the iteration early
+            checkpoint_store: Optional store that the plan, each completed step,
+                execution results and feedback are appended to, so an
+                interrupted task can be continued with resume
+            tracer: Optional tracer recording spans for planning, each step,
+                summary, critique and refinement (render them with TimelineExporter)
+            model_router: Optional router selecting a model tier per agent role and
+                step complexity; steps blamed for a failed critique are escalated
+                to a larger tier in the next iteration
+            blob_store: Optional store for large step outputs and summaries;
+                the state, step cache and checkpoints then hold references
+                that are loaded only for prompts and the final result
+                (keep it alongside the checkpoint store to resume tasks)
         """
         self.api_client = api_client
         self.planner = planner or PlannerAgent(api_client)
@@ -47,6 +85,22 @@ class OrchestrationPipeline:
         self.max_iterations = max_iterations
         self.feedback_threshold = feedback_threshold
         self.parallel_execution = parallel_execution
+        self.scheduler = DAGScheduler(max_concurrency=max_concurrency)
+        
+        # Step results by step key, reused across refinement iterations
+        self.cache_step_results = cache_step_results
+        self.step_cache: Dict[str, Dict[str, Any]] = {}
+        self._step_cache_lock = threading.Lock()
+        
+        # Step evaluations by evaluation key, for incremental critique
+        self.incremental_critique = incremental_critique
+        self.evaluation_cache: Dict[str, Dict[str, Any]] = {}
+        self._critique_executor: Optional[ThreadPoolExecutor] = None
+        
+        self.checkpoint_store = checkpoint_store
+        self.tracer = tracer or Tracer(enabled=False)
+        self.model_router = model_router
+        self.blob_store = blob_store
         
         self.id = str(uuid.uuid4())
         self.state = {
@@ -55,16 +109,36 @@ class OrchestrationPipeline:
             "execution_results": {},
             "feedback": {},
             "iterations": 0,
+            "step_cache_hits": {},
+            "escalations": {},
+            "plans": {},
+            "phase_durations": {},
+            "degradations": [],
+            "deadline_at": None,
             "status": "initialized"
         }
     
-    def execute(self, task_description: str, task_context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    def execute(
+        self,
+        task_description: str,
+        task_context: Optional[Dict[str, Any]] = None,
+        deadline: Optional[float] = None
+    ) -> Dict[str, Any]:
         """
         Execute the full orchestration pipeline on a task.
         
+        With a deadline, the remaining work is estimated from the phase
+        latencies observed so far. When it no longer fits, the pipeline
+        degrades instead of overrunning: it switches to the fast model tier
+        (with a model router), skips the re-critique of the refined plan, or
+        stops refining. Steps are not dispatched past the deadline. The best
+        result so far is returned with status "deadline_reached", and every
+        degradation is listed in the result.
+        
         Args:
             task_description: Description of the task to execute
             task_context: Optional additional context for the task
+            deadline: Optional time budget for the task in seconds
             
         Returns:
             Results of the orchestration process
@@ -74,25 +148,151 @@ class OrchestrationPipeline:
             "context": task_context or {},
             "id": str(uuid.uuid4())
         }
+        self.state["plan"] = {}
+        self.state["execution_results"] = {}
+        self.state["feedback"] = {}
+        self.state["step_cache_hits"] = {}
+        self.state["escalations"] = {}
+        self._start_clock(deadline)
         self.state["status"] = "in_progress"
         
+        # Cached step results only apply within one task
+        with self._step_cache_lock:
+            self.step_cache.clear()
+            self.evaluation_cache.clear()
+        
+        self._checkpoint("task", task=self.state["task"])
+        
+        return self._run(start_iteration=0)
+    
+    def resume(self, task_id: str, deadline: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Continue a task from its checkpoint.
+        
+        Completed planning, critique and steps are not repeated: checkpointed
+        step results are reused for steps that are unchanged, so only steps
+        that had not finished (or failed) run again. A task that stopped at
+        its deadline continues with the new deadline.
+        
+        Args:
+            task_id: ID of the task to resume
+            deadline: Optional time budget for the rest of the task in seconds
+            
+        Returns:
+            Results of the orchestration process
+            
+        Raises:
+            ValueError: If no checkpoint store is configured or the task has no checkpoint
+        """
+        if self.checkpoint_store is None:
+            raise ValueError("Resuming a task requires a checkpoint store")
+        
+        checkpoint = self.checkpoint_store.load(task_id)
+        if checkpoint is None or not checkpoint["task"]:
+            raise ValueError(f"No checkpoint found for task {task_id}")
+        
+        self.state["task"] = checkpoint["task"]
+        self.state["plan"] = checkpoint["plan"]
+        self.state["execution_results"] = checkpoint["execution_results"]
+        self.state["feedback"] = checkpoint["feedback"]
+        self.state["step_cache_hits"] = {}
+        self.state["escalations"] = {}
+        self._start_clock(deadline)
+        self.state.pop("error", None)
+        
+        with self._step_cache_lock:
+            self.step_cache.clear()
+            self.step_cache.update(checkpoint["step_results"])
+            self.evaluation_cache.clear()
+        
+        # Finished tasks are returned as they are
+        if checkpoint["status"] in ("completed", "max_iterations_reached"):
+            self.state["status"] = checkpoint["status"]
+            self.state["iterations"] = checkpoint["plan_iteration"]
+            return self._result()
+        
+        logger.info(f"Resuming task {task_id} at iteration {max(checkpoint['plan_iteration'], 1)}")
+        self.state["status"] = "in_progress"
+        
+        return self._run(start_iteration=max(checkpoint["plan_iteration"] - 1, 0))
+    
+    def _run(self, start_iteration: int) -> Dict[str, Any]:
+        """
+        Run the current task in a span covering the whole task.
+        
+        Args:
+            start_iteration: Index of the first iteration to run
+            
+        Returns:
+            Results of the orchestration process
+        """
+        task = self.state["task"]
+        with self.tracer.span("task", trace_id=task["id"], description=task["description"][:100]) as span:
+            result = self._run_phases(start_iteration)
+            span.set_attributes(
+                status=result["status"],
+                iterations=self.state["iterations"],
+                degradations=[degradation["action"] for degradation in self.state["degradations"]]
+            )
+            return result
+    
+    def _start_clock(self, deadline: Optional[float]) -> None:
+        """Reset the deadline, observed phase latencies and degradations for a run."""
+        self.state["deadline_at"] = time.time() + deadline if deadline is not None else None
+        self.state["plans"] = {}
+        self.state["phase_durations"] = {}
+        self.state["degradations"] = []
+    
+    def _run_phases(self, start_iteration: int) -> Dict[str, Any]:
+        """
+        Run the planning-execution-critique loop for the current task.
+        
+        Phases whose results are already in the state (restored from a
+        checkpoint) are not repeated.
+        
+        Args:
+            start_iteration: Index of the first iteration to run
+            
+        Returns:
+            Results of the orchestration process
+        """
         try:
             # Phase 1: Planning
-            logger.info(f"Starting planning phase for task: {task_description[:50]}...")
-            self.state["plan"] = self.planner.process(task_description)
+            if not self.state["plan"]:
+                logger.info(f"Starting planning phase for task: {self.state['task']['description'][:50]}...")
+                with self.tracer.span("plan"), self._timed("plan"), self._route("planner"):
+                    self.state["plan"] = self.planner.process(self.state["task"]["description"])
+                self._checkpoint("plan", iteration=1, plan=self.state["plan"])
             
             # Main orchestration loop
-            for iteration in range(self.max_iterations):
+            for iteration in range(start_iteration, self.max_iterations):
                 self.state["iterations"] = iteration + 1
+                iteration_key = f"iteration_{iteration + 1}"
                 logger.info(f"Starting iteration {iteration + 1}/{self.max_iterations}")
                 
                 # Phase 2: Execution
-                execution_results = self._execute_plan(self.state["plan"])
-                self.state["execution_results"][f"iteration_{iteration + 1}"] = execution_results
+                execution_results = self.state["execution_results"].get(iteration_key)
+                if execution_results is None:
+                    self.state["plans"][iteration_key] = self.state["plan"]
+                    with self.tracer.span("execute", iteration=iteration + 1, max_concurrency=self.scheduler.max_concurrency), self._timed("execute"):
+                        execution_results = self._execute_plan(self.state["plan"])
+                    self.state["execution_results"][iteration_key] = execution_results
+                    self.state["step_cache_hits"][iteration_key] = execution_results["cached_steps"]
+                    # An execution cut short by the deadline runs again on resume,
+                    # reusing the steps checkpointed so far
+                    if not execution_results.get("deadline_reached"):
+                        self._checkpoint("execution", iteration=iteration + 1, results=execution_results)
                 
                 # Phase 3: Critique
-                feedback = self._evaluate_results(execution_results, self.state["plan"])
-                self.state["feedback"][f"iteration_{iteration + 1}"] = feedback
+                feedback = self.state["feedback"].get(iteration_key)
+                if feedback is None:
+                    if self._skip_critique(iteration + 1, execution_results):
+                        self.state["status"] = "deadline_reached"
+                        break
+                    with self.tracer.span("critique", iteration=iteration + 1), self._timed("critique"), self._route("critic"):
+                        feedback = self._evaluate_results(execution_results, self.state["plan"])
+                    self.state["feedback"][iteration_key] = feedback
+                    self._checkpoint("feedback", iteration=iteration + 1, feedback=feedback)
                 
                 # Check if quality is satisfactory
                 quality_score = feedback.get("quality_score", 0)
@@ -109,30 +309,213 @@ class OrchestrationPipeline:
                     self.state["status"] = "max_iterations_reached"
                     break
                 
+                # Keep the best result so far if another iteration can't finish in time
+                if not self._fit_iteration(iteration + 2):
+                    self.state["status"] = "deadline_reached"
+                    break
+                
                 # Otherwise, refine the plan and continue
                 logger.info(f"Quality threshold not met ({quality_score} < {self.feedback_threshold}). Refining plan.")
                 feedback_str = feedback.get("overall_feedback", "")
-                self.state["plan"] = self.planner.refine_plan(self.state["plan"], feedback_str)
+                self._escalate_steps(execution_results)
+                with self.tracer.span("refine", iteration=iteration + 1), self._timed("refine"), self._route("planner"):
+                    self.state["plan"] = self.planner.refine_plan(self.state["plan"], feedback_str)
+                self._checkpoint("plan", iteration=iteration + 2, plan=self.state["plan"])
             
-            return {
-                "task_id": self.state["task"]["id"],
-                "status": self.state["status"],
-                "iterations": self.state["iterations"],
-                "final_plan": self.state["plan"],
-                "final_results": self.state["execution_results"].get(f"iteration_{self.state['iterations']}", {}),
-                "final_feedback": self.state["feedback"].get(f"iteration_{self.state['iterations']}", {}),
-            }
+            self._checkpoint("status", status=self.state["status"])
+            return self._result()
             
         except Exception as e:
             logger.error(f"Error in orchestration pipeline: {str(e)}")
             self.state["status"] = "error"
             self.state["error"] = str(e)
+            self._checkpoint("status", status="error", error=str(e))
             return {
                 "task_id": self.state["task"]["id"],
                 "status": "error",
                 "error": str(e)
             }
     
+    def _result(self) -> Dict[str, Any]:
+        """Build the result of the current task from the state."""
+        iteration = self._best_iteration()
+        iteration_key = f"iteration_{iteration}"
+        return {
+            "task_id": self.state["task"]["id"],
+            "status": self.state["status"],
+            "iterations": self.state["iterations"],
+            "result_iteration": iteration,
+            "final_plan": self.state["plans"].get(iteration_key, self.state["plan"]),
+            "final_results": self._load(self.state["execution_results"].get(iteration_key, {})),
+            "final_feedback": self.state["feedback"].get(iteration_key, {}),
+            "degradations": list(self.state["degradations"]),
+        }
+    
+    def _best_iteration(self) -> int:
+        """
+        Select the iteration whose results are returned.
+        
+        This is the last iteration, unless the deadline cut the task short:
+        then a refined plan that ran to completion without re-critique is
+        still preferred, and otherwise the best-scoring critiqued iteration.
+        
+        Returns:
+            Iteration number
+        """
+        latest = self.state["iterations"]
+        if self.state["status"] != "deadline_reached":
+            return latest
+        
+        latest_key = f"iteration_{latest}"
+        latest_results = self.state["execution_results"].get(latest_key, {})
+        if latest_key not in self.state["feedback"] and not latest_results.get("deadline_reached"):
+            return latest
+        
+        scored = [
+            (feedback.get("quality_score", 0), int(iteration_key.split("_")[1]))
+            for iteration_key, feedback in self.state["feedback"].items()
+        ]
+        return max(scored)[1] if scored else latest
+    
+    @contextmanager
+    def _timed(self, phase: str) -> Iterator[None]:
+        """Record how long a phase takes, for estimating the remaining work."""
+        start_time = time.time()
+        try:
+            yield
+        finally:
+            self.state["phase_durations"].setdefault(phase, []).append(time.time() - start_time)
+    
+    def _estimate_duration(self, phase: str) -> float:
+        """Estimate a phase's duration as its latest observed duration (refinement falls back to planning)."""
+        durations = self.state["phase_durations"]
+        observed = durations.get(phase) or (durations.get("plan") if phase == "refine" else None)
+        return observed[-1] if observed else 0.0
+    
+    def _remaining_time(self) -> Optional[float]:
+        """Get the seconds left until the deadline, or None without a deadline."""
+        if self.state["deadline_at"] is None:
+            return None
+        return self.state["deadline_at"] - time.time()
+    
+    def _deadline_passed(self) -> bool:
+        """Check whether the deadline has passed."""
+        remaining = self._remaining_time()
+        return remaining is not None and remaining <= 0
+    
+    def _degrade(self, action: str, iteration: int, remaining: float, estimated: float) -> None:
+        """
+        Record a degradation applied to meet the deadline.
+        
+        Args:
+            action: "fast_models", "skip_critique", "stop_execution" or "stop_refining"
+            iteration: Iteration the degradation applies from
+            remaining: Seconds left until the deadline
+            estimated: Estimated seconds needed without the degradation
+        """
+        logger.warning(
+            f"Deadline at risk ({remaining:.2f}s left, {estimated:.2f}s needed). "
+            f"Degrading with {action} at iteration {iteration}."
+        )
+        self.state["degradations"].append({
+            "action": action,
+            "iteration": iteration,
+            "remaining_seconds": remaining,
+            "estimated_seconds": estimated
+        })
+    
+    def _degraded(self, action: str, iteration: Optional[int] = None) -> bool:
+        """Check whether a degradation has been applied (for a given iteration)."""
+        return any(
+            degradation["action"] == action and iteration in (None, degradation["iteration"])
+            for degradation in self.state["degradations"]
+        )
+    
+    def _fit_iteration(self, iteration: int) -> bool:
+        """
+        Degrade the next iteration until its estimated duration fits the deadline.
+        
+        The refine, execute and critique phases are estimated from their
+        latest observed durations. Degradations are tried in order: the fast
+        model tier (with a model router), then skipping the re-critique.
+        
+        Args:
+            iteration: Number of the iteration about to start
+            
+        Returns:
+            False if refining should stop because the iteration can't finish in time
+        """
+        remaining = self._remaining_time()
+        if remaining is None:
+            return True
+        
+        estimates = {phase: self._estimate_duration(phase) for phase in ("refine", "execute", "critique")}
+        needed = sum(estimates.values())
+        actions = []
+        
+        if needed > remaining and self.model_router is not None and not self._degraded("fast_models"):
+            factor = self._fast_tier_factor()
+            estimates = {phase: estimate * factor for phase, estimate in estimates.items()}
+            actions.append("fast_models")
+        
+        if sum(estimates.values()) > remaining:
+            estimates["critique"] = 0.0
+            actions.append("skip_critique")
+        
+        if sum(estimates.values()) > remaining:
+            self._degrade("stop_refining", iteration, remaining, needed)
+            return False
+        
+        for action in actions:
+            self._degrade(action, iteration, remaining, needed)
+        return True
+    
+    def _fast_tier_factor(self) -> float:
+        """Estimate the fast tier's latency relative to the other tiers from the router's stats."""
+        stats = self.model_router.get_stats()
+        fast = stats.get(TIER_ORDER[0], {})
+        others = [tier_stats for tier, tier_stats in stats.items() if tier != TIER_ORDER[0] and tier_stats["calls"]]
+        
+        if not fast.get("calls") or not others:
+            return FAST_TIER_LATENCY_FACTOR
+        other_latency = sum(s["total_latency"] for s in others) / sum(s["calls"] for s in others)
+        return min(1.0, fast["avg_latency"] / other_latency) if other_latency else 1.0
+    
+    def _skip_critique(self, iteration: int, execution_results: Dict[str, Any]) -> bool:
+        """
+        Check whether an iteration's critique is skipped for the deadline.
+        
+        Args:
+            iteration: Iteration number
+            execution_results: Results of the iteration's execution
+            
+        Returns:
+            True if the critique is skipped
+        """
+        if self._degraded("skip_critique", iteration):
+            return True
+        
+        remaining = self._remaining_time()
+        if remaining is None:
+            return False
+        
+        estimated = self._estimate_duration("critique")
+        if execution_results.get("deadline_reached") or remaining < estimated:
+            self._degrade("skip_critique", iteration, remaining, estimated)
+            return True
+        return False
+    
+    def _checkpoint(self, event_type: str, **data: Any) -> None:
+        """Append an event for the current task to the checkpoint store, if configured."""
+        if self.checkpoint_store is None:
+            return
+        
+        try:
+            self.checkpoint_store.append(self.state["task"]["id"], event_type, **data)
+        except Exception as e:
+            # A failed checkpoint must not fail the task itself
+            logger.error(f"Failed to write {event_type} checkpoint: {str(e)}")
+    
     def _execute_plan(self, plan: Dict[str, Any]) -> Dict[str, Any]:
         """
         Execute all steps in a plan.
@@ -142,11 +525,15 @@ class OrchestrationPipeline:
             
         Returns:
             Execution results for all steps
+            
+        Raises:
+            DependencyCycleError: If step dependencies contain a cycle
         """
         steps = plan.get("steps", [])
         results = {
             "step_results": {},
             "summary": {},
+            "cached_steps": [],
             "start_time": time.time(),
             "end_time": None
         }
@@ -154,7 +541,13 @@ class OrchestrationPipeline:
         # Track context that gets passed between dependent steps
         execution_context = {
             "objective": plan.get("objective", ""),
-            "previous_results": {}
+            "previous_results": {},
+            "result_hashes": {},
+            "cached_steps": results["cached_steps"],
+            # Evaluations of step results as they land (incremental critique)
+            "critique": {"futures": {}, "failed": threading.Event()} if self.incremental_critique else None,
+            # Parent span and step finish times, for step spans and their queue wait
+            "trace": {"span": current_span(), "started_at": time.time(), "finished_at": {}}
         }
         
         # Build dependency graph
@@ -164,6 +557,9 @@ class OrchestrationPipeline:
             if step_id:
                 dependencies[step_id] = step.get("dependencies", [])
         
+        # Reject dependency cycles before executing anything
+        DAGScheduler.topological_order(dependencies)
+        
         # Track completed steps
         completed_steps = set()
         
@@ -179,20 +575,42 @@ class OrchestrationPipeline:
         results["total_steps"] = len(steps)
         results["completed_steps"] = len(results["step_results"])
         
+        critique = execution_context["critique"]
+        if critique is not None:
+            results["step_evaluations"] = self._collect_step_evaluations(critique)
+            results["stopped_early"] = critique["failed"].is_set()
+            
+            # The plan is refined right away, so a summary would be wasted
+            if results["stopped_early"]:
+                logger.info("Step critique found a failing step. Skipping summary to refine early.")
+                return results
+        
+        # Out of time: return what has been executed so far
+        if self._deadline_passed():
+            results["deadline_reached"] = True
+            if results["completed_steps"] < results["total_steps"]:
+                self._degrade("stop_execution", self.state["iterations"], self._remaining_time(), 0.0)
+            logger.warning("Deadline reached during execution. Skipping summary.")
+            return results
+        
         # Generate summary using executor
-        summary_task = {
+        with self.tracer.span("summary"), self._route("summary"):
+            summary_result = self.executor.process(self._summary_task(plan, self._load(results["step_results"])))
+        results["summary"] = self._spill(summary_result.get("completion", ""))
+        
+        return results
+    
+    @staticmethod
+    def _summary_task(plan: Dict[str, Any], step_results: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the executor task that summarizes a plan's step results."""
+        return {
             "id": "summary",
             "description": f"Summarize the results of executing the following objective: {plan.get('objective', '')}",
             "context": {
                 "plan": plan,
-                "results": results["step_results"]
+                "results": step_results
             }
         }
-        
-        summary_result = self.executor.process(summary_task)
-        results["summary"] = summary_result.get("completion", "")
-        
-        return results
     
     def _execute_steps_sequential(
         self,
@@ -218,6 +636,10 @@ class OrchestrationPipeline:
             for step in steps:
                 step_id = step.get("id", "")
                 
+                # Stop early if a step's critique already failed or the deadline passed
+                if self._should_stop(execution_context):
+                    break
+                
                 # Skip if already completed
                 if step_id in completed_steps:
                     continue
@@ -230,15 +652,19 @@ class OrchestrationPipeline:
                 
                 # Execute step
                 logger.info(f"Executing step: {step_id} - {step.get('description', '')[:50]}...")
-                result = self.executor.process_step(step, execution_context)
+                result = self._process_step(step, execution_context)
                 results[step_id] = result
                 
                 # Update context with this step's results
-                execution_context["previous_results"][step_id] = result
+                self._record_step_result(step_id, result, execution_context)
+                self._critique_step(step, result, execution_context)
                 
                 # Mark as completed
                 completed_steps.add(step_id)
             
+            if self._should_stop(execution_context):
+                break
+            
             # If no steps were executed in this iteration, we might have a dependency cycle
             if len(completed_steps) < len(steps) and len(results) == len(completed_steps):
                 logger.warning("Possible dependency cycle detected or some steps have invalid dependencies")
@@ -255,6 +681,9 @@ class OrchestrationPipeline:
         """
         Execute steps in parallel where possible, respecting dependencies.
         
+        Each step is dispatched to the scheduler's worker pool as soon as its
+        dependencies finish, longest critical path first.
+        
         Args:
             steps: List of steps to execute
             dependencies: Map of step IDs to their dependency step IDs
@@ -263,68 +692,366 @@ class OrchestrationPipeline:
         Returns:
             Map of step IDs to execution results
         """
-        results = {}
-        completed_steps = set()
+        steps_by_id = {step.get("id", ""): step for step in steps}
+        context_lock = threading.Lock()
         
-        while len(completed_steps) < len(steps):
-            # Find steps that can be executed in parallel
-            executable_steps = []
+        # Complexity hints from the planner weight the critical path
+        complexity_costs = {"low": 1.0, "medium": 2.0, "high": 3.0}
+        costs = {
+            step_id: complexity_costs.get(step.get("complexity"), 1.0)
+            for step_id, step in steps_by_id.items()
+        }
+        
+        def run_step(step_id: str) -> Dict[str, Any]:
+            # Snapshot the context so concurrent completions don't change it mid-step
+            with context_lock:
+                step_context = dict(execution_context)
+                step_context["previous_results"] = dict(execution_context["previous_results"])
+                step_context["result_hashes"] = dict(execution_context["result_hashes"])
+            return self._process_step(steps_by_id[step_id], step_context)
+        
+        def complete_step(step_id: str, result: Dict[str, Any]) -> None:
+            # Update context for subsequent steps
+            with context_lock:
+                self._record_step_result(step_id, result, execution_context)
+            self._critique_step(steps_by_id[step_id], result, execution_context)
+            logger.info(f"Completed step: {step_id}")
+        
+        def fail_step(step_id: str, error: Exception) -> Dict[str, Any]:
+            logger.error(f"Error executing step {step_id}: {str(error)}")
+            # Dependent steps still run with the failed result in their context
+            return {
+                "error": str(error),
+                "status": "failed"
+            }
+        
+        step_dependencies = {step_id: dependencies.get(step_id, []) for step_id in steps_by_id}
+        return self.scheduler.run(
+            step_dependencies,
+            run_step,
+            on_complete=complete_step,
+            on_error=fail_step,
+            costs=costs,
+            should_stop=lambda: self._should_stop(execution_context),
+        )
+    
+    def _process_step(self, step: Dict[str, Any], execution_context: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Execute a step in a span recording its queue wait and whether it was cached.
+        
+        Args:
+            step: Step definition from a plan
+            execution_context: Context with previous results and their hashes
             
-            for step in steps:
-                step_id = step.get("id", "")
-                
-                # Skip if already completed
-                if step_id in completed_steps:
-                    continue
-                
-                # Check dependencies
-                deps = dependencies.get(step_id, [])
-                if all(dep in completed_steps for dep in deps):
-                    executable_steps.append(step)
+        Returns:
+            Step execution results
+        """
+        step_id = step.get("id", "")
+        dependencies = step.get("dependencies", [])
+        
+        # A step is ready once its last dependency has finished
+        trace = execution_context["trace"]
+        ready_at = max([trace["finished_at"].get(dep, 0.0) for dep in dependencies] + [trace["started_at"]])
+        
+        with self.tracer.span(
+            "step",
+            parent=trace["span"],
+            queue_wait_seconds=max(0.0, time.time() - ready_at),
+            **{"step.id": step_id, "step.dependencies": list(dependencies)}
+        ) as span, self._route(
+            "executor",
+            step.get("complexity") or estimate_complexity(step),
+            self.state["escalations"].get(step_id, 0)
+        ) as route:
+            if route is not None:
+                span.set_attributes(model_tier=route.tier)
+            result = self._run_step(step, execution_context, route.model if route else None)
+            span.set_attributes(
+                cache_hit=step_id in execution_context["cached_steps"],
+                status=result.get("status", "completed")
+            )
+            return result
+    
+    def _run_step(
+        self,
+        step: Dict[str, Any],
+        execution_context: Dict[str, Any],
+        model: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Execute a step, reusing the result of an identical earlier execution.
+        
+        Args:
+            step: Step definition from a plan
+            execution_context: Context with previous results and their hashes
+            model: Model the step is routed to, if routing is enabled
             
-            # If no steps can be executed, we might have a dependency cycle
-            if not executable_steps:
-                logger.warning("Possible dependency cycle detected or some steps have invalid dependencies")
-                break
+        Returns:
+            Step execution results
+        """
+        step_id = step.get("id", "")
+        step_context = {
+            key: value for key, value in execution_context.items()
+            if key not in ("result_hashes", "cached_steps", "critique", "trace")
+        }
+        # Only the results of the step's dependencies go into its prompt, so only those are loaded
+        step_context["previous_results"] = {
+            dep: self._load(result) if dep in step.get("dependencies", []) else result
+            for dep, result in execution_context["previous_results"].items()
+        }
+        if not self.cache_step_results and self.checkpoint_store is None:
+            return self._spill(self.executor.process_step(step, step_context))
+        
+        # Without caching, the step cache only holds results restored from a checkpoint
+        key = self._step_cache_key(
+            step, execution_context["result_hashes"], model, execution_context.get("objective", "")
+        )
+        with self._step_cache_lock:
+            cached = self.step_cache.get(key)
+        
+        if cached is not None:
+            logger.info(f"Reusing cached result for step: {step_id}")
+            execution_context["cached_steps"].append(step_id)
+            return dict(cached)
+        
+        result = self._spill(self.executor.process_step(step, step_context))
+        if result.get("status") != "failed":
+            if self.cache_step_results:
+                with self._step_cache_lock:
+                    self.step_cache[key] = result
+            self._checkpoint("step", iteration=self.state["iterations"], step_id=step_id, key=key, result=result)
+        return result
+    
+    @staticmethod
+    def _step_cache_key(
+        step: Dict[str, Any],
+        result_hashes: Dict[str, str],
+        model: Optional[str] = None,
+        objective: str = ""
+    ) -> str:
+        """
+        Build the cache key for a step.
+        
+        Args:
+            step: Step definition from a plan
+            result_hashes: Result hashes of completed steps by step ID
+            model: Model the step is routed to, if routing is enabled
+            objective: Objective of the plan, which goes into the step's prompt
             
-            # Execute eligible steps in parallel
-            with ThreadPoolExecutor(max_workers=min(len(executable_steps), 5)) as executor:
-                # Submit all eligible steps
-                future_to_step = {
-                    executor.submit(
-                        self.executor.process_step, 
-                        step,
-                        execution_context.copy()  # Copy to avoid race conditions
-                    ): step
-                    for step in executable_steps
-                }
-                
-                # Process results as they complete
-                for future in as_completed(future_to_step):
-                    step = future_to_step[future]
-                    step_id = step.get("id", "")
-                    
-                    try:
-                        result = future.result()
-                        results[step_id] = result
-                        
-                        # Mark as completed
-                        completed_steps.add(step_id)
-                        
-                        # Update context for subsequent steps
-                        execution_context["previous_results"][step_id] = result
-                        
-                        logger.info(f"Completed step: {step_id}")
-                    except Exception as e:
-                        logger.error(f"Error executing step {step_id}: {str(e)}")
-                        # Add a failed result to prevent infinite loop
-                        results[step_id] = {
-                            "error": str(e),
-                            "status": "failed"
-                        }
-                        completed_steps.add(step_id)
+        Returns:
+            Hash of the objective, step ID, description, expected outcome, dependency results and model
+        """
+        key_data = {
+            "objective": objective,
+            "id": step.get("id", ""),
+            "description": step.get("description", ""),
+            "expected_outcome": step.get("expected_outcome", ""),
+            "dependencies": sorted(result_hashes.get(dep, "") for dep in step.get("dependencies", [])),
+        }
+        # An escalated step must not reuse the result of a smaller model
+        if model:
+            key_data["model"] = model
+        return OrchestrationPipeline._hash_data(key_data)
+    
+    @staticmethod
+    def _hash_data(data: Any) -> str:
+        """Hash JSON-serializable data independently of key order."""
+        data_str = json.dumps(data, sort_keys=True, default=str)
+        return hashlib.blake2b(data_str.encode(), digest_size=16).hexdigest()
+    
+    @staticmethod
+    def _record_step_result(step_id: str, result: Dict[str, Any], execution_context: Dict[str, Any]) -> None:
+        """Add a step's result and its hash to the execution context."""
+        execution_context["previous_results"][step_id] = result
+        execution_context["result_hashes"][step_id] = OrchestrationPipeline._hash_data(result)
+        execution_context["trace"]["finished_at"][step_id] = time.time()
+    
+    def _spill(self, data: Any) -> Any:
+        """Move large strings in data to the blob store, if configured."""
+        return self.blob_store.externalize(data) if self.blob_store is not None else data
+    
+    def _load(self, data: Any) -> Any:
+        """Load blob references in data from the blob store, if configured."""
+        return self.blob_store.resolve(data) if self.blob_store is not None else data
+    
+    def _route(self, role: str, complexity: Optional[str] = None, escalation: int = 0) -> Any:
+        """Route the agent calls of a block through the model router, if configured."""
+        if self.model_router is None:
+            return nullcontext()
+        # Degraded for the deadline: every call goes to the fast tier
+        tier = TIER_ORDER[0] if self._degraded("fast_models") else None
+        return self.model_router.route(role, complexity, escalation, tier=tier)
+    
+    def _escalate_steps(self, execution_results: Dict[str, Any]) -> None:
+        """
+        Move the steps blamed for a failed critique to a larger model tier.
         
-        return results
+        With incremental critique only the failing steps are escalated;
+        otherwise the critique covers the whole plan and every step is.
+        
+        Args:
+            execution_results: Results of the iteration that failed critique
+        """
+        if self.model_router is None:
+            return
+        
+        evaluations = execution_results.get("step_evaluations")
+        if evaluations:
+            step_ids = [step_id for step_id, evaluation in evaluations.items() if self._step_failed(evaluation)]
+        else:
+            step_ids = list(execution_results.get("step_results", {}))
+        
+        escalations = self.state["escalations"]
+        for step_id in step_ids:
+            escalations[step_id] = escalations.get(step_id, 0) + 1
+        logger.info(f"Escalating {len(step_ids)} steps to a larger model tier")
+    
+    def _critique_step(self, step: Dict[str, Any], result: Dict[str, Any], execution_context: Dict[str, Any]) -> None:
+        """
+        Start evaluating a step result in the background (incremental critique only).
+        
+        Args:
+            step: Step definition from a plan
+            result: The step's execution result
+            execution_context: Context with result hashes and critique state
+        """
+        critique = execution_context["critique"]
+        if critique is None:
+            return
+        
+        step_id = step.get("id", "")
+        key = self._hash_data({
+            "id": step_id,
+            "description": step.get("description", ""),
+            "expected_outcome": step.get("expected_outcome", ""),
+            "result": execution_context["result_hashes"].get(step_id, ""),
+        })
+        with self._step_cache_lock:
+            cached = self.evaluation_cache.get(key)
+        
+        if result.get("status") == "failed":
+            # No need to ask the critic about a step that raised
+            future = Future()
+            future.set_result({
+                "quality_score": 0,
+                "meets_requirements": False,
+                "overall_feedback": f"Step failed: {result.get('error', 'unknown error')}"
+            })
+        elif cached is not None:
+            future = Future()
+            future.set_result(cached)
+        else:
+            parent = execution_context["trace"]["span"]
+            
+            def evaluate() -> Dict[str, Any]:
+                with self.tracer.span("step_critique", parent=parent, **{"step.id": step_id}), self._route("critic"):
+                    return self.critic.evaluate_step(step, self._load(result), execution_context["objective"])
+            
+            future = self._get_critique_executor().submit(evaluate)
+        
+        def on_evaluated(done: Future) -> None:
+            try:
+                evaluation = done.result()
+            except Exception as e:
+                logger.error(f"Error evaluating step {step_id}: {str(e)}")
+                return
+            
+            with self._step_cache_lock:
+                self.evaluation_cache[key] = evaluation
+            if self._step_failed(evaluation):
+                logger.info(f"Step {step_id} failed critique")
+                critique["failed"].set()
+        
+        critique["futures"][step_id] = future
+        future.add_done_callback(on_evaluated)
+    
+    def _step_failed(self, evaluation: Dict[str, Any]) -> bool:
+        """Check whether a step evaluation calls for refining the plan."""
+        quality_score = evaluation.get("quality_score")
+        below_threshold = not isinstance(quality_score, (int, float)) or quality_score < self.feedback_threshold
+        return evaluation.get("meets_requirements") is False and below_threshold
+    
+    def _should_stop(self, execution_context: Dict[str, Any]) -> bool:
+        """Check whether to stop dispatching steps: a step failed critique or the deadline passed."""
+        return self._critique_failed(execution_context) or self._deadline_passed()
+    
+    @staticmethod
+    def _critique_failed(execution_context: Dict[str, Any]) -> bool:
+        """Check whether incremental critique has found a failing step."""
+        critique = execution_context.get("critique")
+        return critique is not None and critique["failed"].is_set()
+    
+    @staticmethod
+    def _collect_step_evaluations(critique: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Wait for all step evaluations to finish and gather them by step ID."""
+        evaluations = {}
+        for step_id, future in critique["futures"].items():
+            try:
+                evaluations[step_id] = future.result()
+            except Exception as e:
+                evaluations[step_id] = {"error": str(e)}
+        return evaluations
+    
+    def _aggregate_step_evaluations(self, execution_results: Dict[str, Any], plan: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Combine per-step evaluations into an overall verdict without another critic call.
+        
+        Args:
+            execution_results: Results from executing the plan, with step evaluations
+            plan: The original plan
+            
+        Returns:
+            Evaluation feedback
+        """
+        evaluations = execution_results["step_evaluations"]
+        step_ids = [step.get("id", "") for step in plan.get("steps", [])]
+        missing = [step_id for step_id in step_ids if step_id not in execution_results["step_results"]]
+        
+        scores = [
+            evaluation["quality_score"] for evaluation in evaluations.values()
+            if isinstance(evaluation.get("quality_score"), (int, float))
+        ]
+        failing = [step_id for step_id, evaluation in evaluations.items() if self._step_failed(evaluation)]
+        
+        issues = []
+        suggestions = []
+        feedback_lines = []
+        for step_id, evaluation in evaluations.items():
+            for issue in evaluation.get("issues", []):
+                if isinstance(issue, dict):
+                    issues.append({**issue, "location": f"{step_id}: {issue.get('location', '')}".rstrip(": ")})
+            suggestions.extend(evaluation.get("improvement_suggestions", []))
+            if step_id in failing:
+                feedback_lines.append(f"Step {step_id}: {evaluation.get('overall_feedback', '')}")
+        if missing:
+            feedback_lines.append(f"Steps not executed: {', '.join(missing)}")
+        
+        return {
+            "quality_score": sum(scores) / len(scores) if scores else 0,
+            "meets_requirements": not failing and not missing,
+            "issues": issues,
+            "improvement_suggestions": suggestions,
+            "overall_feedback": "\n".join(feedback_lines) or "All steps met their expected outcomes.",
+            "step_evaluations": evaluations
+        }
+    
+    def _get_critique_executor(self) -> ThreadPoolExecutor:
+        """Get the worker pool for step critique, creating it on first use."""
+        with self._step_cache_lock:
+            if self._critique_executor is None:
+                self._critique_executor = ThreadPoolExecutor(
+                    max_workers=self.scheduler.max_concurrency,
+                    thread_name_prefix="step-critique",
+                )
+            return self._critique_executor
+    
+    def close(self) -> None:
+        """Release the worker pools used for parallel step execution and critique."""
+        self.scheduler.shutdown()
+        with self._step_cache_lock:
+            if self._critique_executor is not None:
+                self._critique_executor.shutdown(wait=True)
+                self._critique_executor = None
     
     def _evaluate_results(self, execution_results: Dict[str, Any], plan: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -337,6 +1064,28 @@ class OrchestrationPipeline:
         Returns:
             Evaluation feedback
         """
+        # Steps were already evaluated as they landed
+        if "step_evaluations" in execution_results:
+            return self._aggregate_step_evaluations(execution_results, plan)
+        
+        # Get evaluation from critic
+        evaluation_data, requirements = self._evaluation_request(self._load(execution_results), plan)
+        feedback = self.critic.process(evaluation_data, requirements)
+        
+        return feedback
+    
+    @staticmethod
+    def _evaluation_request(execution_results: Dict[str, Any], plan: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Build the output and requirements the critic evaluates execution results against.
+        
+        Args:
+            execution_results: Results from executing the plan
+            plan: The original plan
+            
+        Returns:
+            Tuple of evaluation data and requirements
+        """
         # Prepare data for evaluation
         evaluation_data = {
             "plan": plan,
@@ -353,7 +1102,4 @@ class OrchestrationPipeline:
             "quality": "Results must achieve the stated objective effectively"
         }
         
-        # Get evaluation from critic
-        feedback = self.critic.process(evaluation_data, requirements)
-        
-        return feedback
\ No newline at end of file
+        return evaluation_data, requirements
\ No newline at end of file
@@ -0,0 +1,233 @@
+import heapq
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class DependencyCycleError(ValueError):
+    """Raised when task dependencies contain a cycle."""
+
+    def __init__(self, cycle: List[str]):
+        self.cycle = cycle
+        super().__init__(f"Dependency cycle detected: {' -> '.join(cycle)}")
+
+class DAGScheduler:
+    """
+    Ready-queue scheduler for tasks with dependencies.
+
+    A task is dispatched to a persistent worker pool as soon as all of its
+    dependencies have finished, instead of waiting for a whole wave of tasks.
+    When more tasks are ready than there are free workers, the task with the
+    longest remaining critical path (the most expensive chain of work that
+    depends on it) goes first.
+    """
+
+    def __init__(self, max_concurrency: int = 5):
+        """
+        Initialize the scheduler.
+
+        Args:
+            max_concurrency: Maximum number of tasks running at once
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+
+        self.max_concurrency = max_concurrency
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def run(
+        self,
+        dependencies: Dict[str, List[str]],
+        run_task: Callable[[str], Any],
+        on_complete: Optional[Callable[[str, Any], None]] = None,
+        on_error: Optional[Callable[[str, Exception], Any]] = None,
+        costs: Optional[Dict[str, float]] = None,
+        should_stop: Optional[Callable[[], bool]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run all tasks, respecting dependencies.
+
+        Args:
+            dependencies: Map of task IDs to the task IDs they depend on
+                (dependencies on unknown tasks are ignored)
+            run_task: Function run in a worker thread with a task ID
+            on_complete: Optional callback run in the calling thread with each
+                task ID and result, before dependent tasks are dispatched
+            on_error: Optional function turning a task's exception into its
+                result (if None, the exception is raised once running tasks finish)
+            costs: Optional estimated cost per task for critical-path
+                prioritization (defaults to 1 per task)
+            should_stop: Optional function checked before each dispatch; once
+                it returns True no new tasks start and running tasks finish
+
+        Returns:
+            Map of task IDs to results (only finished tasks if stopped early)
+
+        Raises:
+            DependencyCycleError: If the dependencies contain a cycle
+        """
+        dependencies = self._known_dependencies(dependencies)
+        order = self.topological_order(dependencies)
+        priorities = self.critical_path_lengths(dependencies, costs)
+        position = {task_id: index for index, task_id in enumerate(dependencies)}
+
+        dependents: Dict[str, List[str]] = {task_id: [] for task_id in dependencies}
+        remaining = {task_id: len(deps) for task_id, deps in dependencies.items()}
+        for task_id, deps in dependencies.items():
+            for dep in deps:
+                dependents[dep].append(task_id)
+
+        ready = [
+            (-priorities[task_id], position[task_id], task_id)
+            for task_id in order
+            if remaining[task_id] == 0
+        ]
+        heapq.heapify(ready)
+
+        executor = self._get_executor()
+        running: Dict[Future, str] = {}
+        results: Dict[str, Any] = {}
+        first_error: Optional[Exception] = None
+
+        while ready or running:
+            # Dispatch the most critical ready tasks up to the concurrency cap
+            while ready and len(running) < self.max_concurrency and first_error is None:
+                if should_stop is not None and should_stop():
+                    logger.info(f"Stopping early with {len(ready)} ready tasks not started")
+                    ready = []
+                    break
+                _, _, task_id = heapq.heappop(ready)
+                running[executor.submit(run_task, task_id)] = task_id
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                task_id = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    if on_error is None:
+                        first_error = first_error or e
+                        continue
+                    result = on_error(task_id, e)
+
+                results[task_id] = result
+                if on_complete:
+                    on_complete(task_id, result)
+
+                for dependent in dependents[task_id]:
+                    remaining[dependent] -= 1
+                    if remaining[dependent] == 0:
+                        heapq.heappush(ready, (-priorities[dependent], position[dependent], dependent))
+
+        if first_error is not None:
+            raise first_error
+
+        return results
+
+    def shutdown(self) -> None:
+        """Shut down the worker pool (it is recreated on the next run)."""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Get the persistent worker pool, creating it on first use."""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrency,
+                    thread_name_prefix="dag-scheduler",
+                )
+            return self._executor
+
+    @staticmethod
+    def _known_dependencies(dependencies: Dict[str, List[str]]) -> Dict[str, List[str]]:
+        """Drop dependencies on tasks that do not exist."""
+        known = {}
+        for task_id, deps in dependencies.items():
+            unknown = [dep for dep in deps if dep not in dependencies]
+            if unknown:
+                logger.warning(f"Ignoring unknown dependencies of {task_id}: {', '.join(unknown)}")
+            known[task_id] = list(dict.fromkeys(dep for dep in deps if dep in dependencies))
+        return known
+
+    @staticmethod
+    def topological_order(dependencies: Dict[str, List[str]]) -> List[str]:
+        """
+        Order tasks so that every task comes after its dependencies.
+
+        Args:
+            dependencies: Map of task IDs to the task IDs they depend on
+
+        Returns:
+            Task IDs in dependency order
+
+        Raises:
+            DependencyCycleError: If the dependencies contain a cycle
+        """
+        # Iterative depth-first search, tracking the current path to report cycles
+        visited = set()
+        order = []
+
+        for root in dependencies:
+            if root in visited:
+                continue
+
+            path = [root]
+            on_path = {root}
+            stack = [iter(dependencies.get(root, []))]
+
+            while stack:
+                dep = next(stack[-1], None)
+                if dep is None:
+                    stack.pop()
+                    task_id = path.pop()
+                    on_path.discard(task_id)
+                    visited.add(task_id)
+                    order.append(task_id)
+                elif dep in on_path:
+                    raise DependencyCycleError(path[path.index(dep):] + [dep])
+                elif dep not in visited:
+                    path.append(dep)
+                    on_path.add(dep)
+                    stack.append(iter(dependencies.get(dep, [])))
+
+        return order
+
+    @staticmethod
+    def critical_path_lengths(
+        dependencies: Dict[str, List[str]],
+        costs: Optional[Dict[str, float]] = None,
+    ) -> Dict[str, float]:
+        """
+        Compute the cost of the longest chain of tasks starting at each task.
+
+        Args:
+            dependencies: Map of task IDs to the task IDs they depend on
+            costs: Optional estimated cost per task (defaults to 1 per task)
+
+        Returns:
+            Map of task IDs to critical path length
+
+        Raises:
+            DependencyCycleError: If the dependencies contain a cycle
+        """
+        costs = costs or {}
+        dependents: Dict[str, List[str]] = {task_id: [] for task_id in dependencies}
+        for task_id, deps in dependencies.items():
+            for dep in deps:
+                dependents.setdefault(dep, []).append(task_id)
+
+        lengths: Dict[str, float] = {}
+        for task_id in reversed(DAGScheduler.topological_order(dependencies)):
+            longest_tail = max((lengths[dependent] for dependent in dependents[task_id]), default=0.0)
+            lengths[task_id] = costs.get(task_id, 1.0) + longest_tail
+
+        return lengths
@@ -1,11 +1,40 @@
+import copy
+import hashlib
 import logging
-from typing import Any, Dict, List, Optional, Union
+import re
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 from ..agents.planner import PlannerAgent
 from ..api.client import ClaudeAPIClient
+from ..utils.context_packer import ContextPacker, to_compact_json
 
 logger = logging.getLogger(__name__)
 
+# Relative cost of subtasks by complexity, used when merging subtasks locally
+COMPLEXITY_COSTS = {"low": 1, "medium": 2, "high": 3}
+
+def estimate_complexity(step: Dict[str, Any]) -> str:
+    """
+    Estimate the complexity of a step based on its description.
+    
+    Args:
+        step: Step definition from plan
+        
+    Returns:
+        Complexity level (low, medium, high)
+    """
+    # Use hints from the planner if available
+    description = step.get("description", "").lower()
+    
+    # Look for complexity hints in the description
+    if any(word in description for word in ["simple", "straightforward", "basic", "easy"]):
+        return "low"
+    elif any(word in description for word in ["complex", "difficult", "challenging", "advanced"]):
+        return "high"
+    else:
+        return "medium"
+
 class TaskDecomposer:
     """
     Specialized component for decomposing complex tasks into simpler subtasks.
@@ -18,6 +47,9 @@ class TaskDecomposer:
         planner: Optional[PlannerAgent] = None,
         max_subtasks: int = 10,
         min_subtasks: int = 2,
+        context_token_budget: int = 4000,
+        cache_size: int = 128,
+        max_merged_complexity: str = "medium",
     ):
         """
         Initialize the task decomposer.
@@ -27,6 +59,10 @@ class TaskDecomposer:
             planner: Optional custom planner agent (if None, a default one is created)
             max_subtasks: Maximum number of subtasks to create
             min_subtasks: Minimum number of subtasks for complex tasks
+            context_token_budget: Token budget for additional context in decomposition prompts
+            cache_size: Number of decompositions cached by task fingerprint (0 disables the cache)
+            max_merged_complexity: Highest complexity a subtask may reach by being merged
+                with its neighbours when rebalancing locally
         """
         self.api_client = api_client
         self.planner = planner or PlannerAgent(
@@ -42,6 +78,15 @@ class TaskDecomposer:
         
         self.max_subtasks = max_subtasks
         self.min_subtasks = min_subtasks
+        self.context_packer = ContextPacker(
+            token_counter=getattr(api_client, "token_counter", None),
+            budget=context_token_budget,
+        )
+        
+        # Decompositions by task fingerprint, least recently used first
+        self.cache_size = cache_size
+        self.decomposition_cache: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self.max_merged_cost = COMPLEXITY_COSTS.get(max_merged_complexity, 2)
     
     def decompose(self, task: str, context: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
@@ -54,6 +99,14 @@ class TaskDecomposer:
         Returns:
             List of subtask definitions
         """
+        # Recurring tasks reuse their earlier decomposition
+        fingerprint = self._fingerprint(task, context)
+        cached = self.decomposition_cache.get(fingerprint)
+        if cached is not None:
+            self.decomposition_cache.move_to_end(fingerprint)
+            logger.info(f"Reusing cached decomposition with {len(cached)} subtasks")
+            return copy.deepcopy(cached)
+        
         # Create a prompt that encourages good decomposition
         task_prompt = (
             f"Please decompose the following task into {self.min_subtasks}-{self.max_subtasks} "
@@ -63,7 +116,11 @@ class TaskDecomposer:
         
         if context:
             # Add context if provided
-            context_str = "\n".join([f"{key}: {value}" for key, value in context.items()])
+            packed = self.context_packer.pack(ContextPacker.items_from_dict(context))
+            context_str = "\n".join([
+                f"{key}: {value if isinstance(value, str) else to_compact_json(value)}"
+                for key, value in packed.items()
+            ])
             task_prompt += f"CONTEXT:\n{context_str}\n\n"
         
         task_prompt += (
@@ -93,8 +150,37 @@ class TaskDecomposer:
             subtasks.append(subtask)
         
         logger.info(f"Decomposed task into {len(subtasks)} subtasks")
+        
+        if self.cache_size > 0 and subtasks:
+            self.decomposition_cache[fingerprint] = copy.deepcopy(subtasks)
+            while len(self.decomposition_cache) > self.cache_size:
+                self.decomposition_cache.popitem(last=False)
+        
         return subtasks
     
+    def _fingerprint(self, task: str, context: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Fingerprint a task for the decomposition cache.
+        
+        The task text is normalized for case, whitespace and trailing
+        punctuation, so trivially different phrasings of a recurring task
+        share one decomposition.
+        
+        Args:
+            task: Task description
+            context: Optional additional context
+            
+        Returns:
+            Hash of the normalized task, context and subtask limits
+        """
+        normalized = re.sub(r"\s+", " ", task.lower()).strip().rstrip(".!?;:")
+        key = to_compact_json({
+            "task": normalized,
+            "context": context or {},
+            "subtasks": [self.min_subtasks, self.max_subtasks],
+        })
+        return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+    
     def _estimate_complexity(self, step: Dict[str, Any]) -> str:
         """
         Estimate the complexity of a step based on its description.
@@ -105,16 +191,7 @@ class TaskDecomposer:
         Returns:
             Complexity level (low, medium, high)
         """
-        # Use hints from the planner if available
-        description = step.get("description", "").lower()
-        
-        # Look for complexity hints in the description
-        if any(word in description for word in ["simple", "straightforward", "basic", "easy"]):
-            return "low"
-        elif any(word in description for word in ["complex", "difficult", "challenging", "advanced"]):
-            return "high"
-        else:
-            return "medium"
+        return estimate_complexity(step)
     
     def rebalance_subtasks(self, subtasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
@@ -126,9 +203,15 @@ class TaskDecomposer:
         Returns:
             Rebalanced list of subtasks
         """
-        # If we have too many subtasks, try to combine some
+        # If we have too many subtasks, merge along dependency chains locally first
         if len(subtasks) > self.max_subtasks:
-            logger.info(f"Too many subtasks ({len(subtasks)}). Attempting to combine some.")
+            merged = self._merge_chains(subtasks)
+            if len(merged) <= self.max_subtasks:
+                logger.info(f"Merged {len(subtasks)} subtasks into {len(merged)} along dependency chains")
+                return merged
+            
+            logger.info(f"Too many subtasks ({len(merged)}) after local merging. Attempting to combine some.")
+            subtasks = merged
             
             # Combine subtasks prompt
             combine_prompt = (
@@ -218,4 +301,115 @@ class TaskDecomposer:
                 return rebalanced
         
         # If the number of subtasks is within range, return as is
-        return subtasks
\ No newline at end of file
+        return subtasks
+    
+    def _merge_chains(self, subtasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Merge low-complexity subtasks along dependency chains without an LLM call.
+        
+        Contracts dependency edges of the subtask graph, cheapest merged
+        complexity first, until there are at most max_subtasks subtasks.
+        Edges where the dependency has no other dependents and the dependent
+        has no other dependencies are contracted first, since merging them
+        does not reduce parallelism. Merges that would exceed
+        max_merged_complexity are skipped.
+        
+        Args:
+            subtasks: List of subtask definitions
+            
+        Returns:
+            List of subtasks after merging (the input is not modified)
+        """
+        merged = [dict(subtask, dependencies=list(subtask.get("dependencies", []))) for subtask in subtasks]
+        
+        while len(merged) > self.max_subtasks:
+            edge = self._cheapest_chain_edge(merged)
+            if edge is None:
+                break
+            
+            first, second = edge
+            combined = {
+                "id": first["id"],
+                "description": f"{first['description']}\nThen: {second['description']}",
+                "expected_outcome": "; ".join(
+                    outcome for outcome in (first.get("expected_outcome", ""), second.get("expected_outcome", "")) if outcome
+                ),
+                "dependencies": first["dependencies"] + [
+                    dep for dep in second["dependencies"] if dep != first["id"] and dep not in first["dependencies"]
+                ],
+                "complexity": self._complexity_for_cost(self._merged_cost(first, second)),
+                "status": "pending",
+                "merged_from": first.get("merged_from", [first["id"]]) + second.get("merged_from", [second["id"]]),
+            }
+            
+            # Subtasks depending on the second one now depend on the combined one
+            rebalanced = []
+            for subtask in merged:
+                if subtask is second:
+                    continue
+                if subtask is first:
+                    rebalanced.append(combined)
+                    continue
+                if second["id"] in subtask["dependencies"]:
+                    dependencies = [dep for dep in subtask["dependencies"] if dep != second["id"]]
+                    if first["id"] not in dependencies:
+                        dependencies.append(first["id"])
+                    subtask["dependencies"] = dependencies
+                rebalanced.append(subtask)
+            merged = rebalanced
+        
+        return merged
+    
+    def _cheapest_chain_edge(self, subtasks: List[Dict[str, Any]]) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        Find the dependency edge whose contraction is cheapest and safe.
+        
+        Args:
+            subtasks: List of subtask definitions
+            
+        Returns:
+            Tuple of (dependency, dependent) subtasks, or None if no edge can be merged
+        """
+        by_id = {subtask["id"]: subtask for subtask in subtasks}
+        dependents: Dict[str, List[str]] = {subtask["id"]: [] for subtask in subtasks}
+        for subtask in subtasks:
+            for dep in subtask["dependencies"]:
+                if dep in dependents:
+                    dependents[dep].append(subtask["id"])
+        
+        best = None
+        best_rank = None
+        for position, subtask in enumerate(subtasks):
+            known_deps = [dep for dep in subtask["dependencies"] if dep in by_id]
+            # Only a subtask's sole dependency can be merged into it without creating a cycle
+            if len(known_deps) != 1:
+                continue
+            
+            first = by_id[known_deps[0]]
+            cost = self._merged_cost(first, subtask)
+            if cost > self.max_merged_cost:
+                continue
+            
+            # Prefer pure chain links, then cheaper merges, then earlier subtasks
+            rank = (len(dependents[first["id"]]) > 1, cost, position)
+            if best_rank is None or rank < best_rank:
+                best, best_rank = (first, subtask), rank
+        
+        return best
+    
+    @staticmethod
+    def _merged_cost(first: Dict[str, Any], second: Dict[str, Any]) -> int:
+        """Cost of the subtask created by merging two subtasks."""
+        return (
+            COMPLEXITY_COSTS.get(first.get("complexity", "medium"), 2)
+            + COMPLEXITY_COSTS.get(second.get("complexity", "medium"), 2)
+        )
+    
+    @staticmethod
+    def _complexity_for_cost(cost: int) -> str:
+        """Map a merged cost back to a complexity level."""
+        if cost <= COMPLEXITY_COSTS["low"]:
+            return "low"
+        if cost <= COMPLEXITY_COSTS["medium"]:
+            return "medium"
+        return "high"
\ No newline at end of file
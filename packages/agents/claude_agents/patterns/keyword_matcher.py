@@ -0,0 +1,38 @@
+from typing import Dict, List, Sequence
+
+class KeywordMatcher:
+    """
+    Scores keyword tables against text in one pass over the keywords.
+
+    The tables are lowercased and frozen into tuples once, when the matcher
+    is created. Matching lowercases the text once and checks each keyword
+    with a substring search, so the result is the same as checking
+    ``keyword in text``.
+
+    Substring searches run in C, which for tables of this size (tens of
+    keywords, task-length text) is faster than a combined regular
+    expression or an automaton stepped through in Python.
+    """
+
+    def __init__(self, groups: Dict[str, Sequence[str]]):
+        """
+        Compile keyword groups.
+
+        Args:
+            groups: Keywords by group name (e.g. by pattern name); matching is
+                case-insensitive
+        """
+        self.groups = {name: tuple(keyword.lower() for keyword in keywords) for name, keywords in groups.items()}
+
+    def match(self, text: str) -> Dict[str, List[str]]:
+        """
+        Find the keywords of each group occurring in a text.
+
+        Args:
+            text: Text to scan
+
+        Returns:
+            Matched keywords by group name, in the order of the group's keywords
+        """
+        text = text.lower()
+        return {name: [keyword for keyword in keywords if keyword in text] for name, keywords in self.groups.items()}
@@ -0,0 +1,120 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+# Prompt caching breakpoint for the Claude API
+EPHEMERAL_CACHE_CONTROL = {"type": "ephemeral"}
+
+def freeze(value: Any) -> Hashable:
+    """
+    Convert prompt parameters into a hashable cache key.
+
+    Args:
+        value: Parameter value (lists, tuples, sets and dictionaries are converted recursively)
+
+    Returns:
+        Hashable equivalent of the value
+    """
+    if isinstance(value, (str, int, float, type(None))):
+        return value
+    if isinstance(value, dict):
+        return tuple(sorted((key, freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(freeze(item) for item in value)
+    return value
+
+def system_blocks(stable_prefix: str, suffix: str = "") -> List[Dict[str, Any]]:
+    """
+    Build system prompt content blocks with a cache breakpoint after the stable prefix.
+
+    The API client keeps breakpoints placed by the caller, so the prefix is
+    cached on its own and shared by every call that starts with it.
+
+    Args:
+        stable_prefix: Part of the system prompt shared across calls
+        suffix: Part of the system prompt that varies between calls
+
+    Returns:
+        System prompt content blocks
+    """
+    blocks = [{"type": "text", "text": stable_prefix, "cache_control": EPHEMERAL_CACHE_CONTROL}]
+    if suffix:
+        blocks.append({"type": "text", "text": suffix})
+    return blocks
+
+class PromptCache:
+    """
+    Bounded LRU cache of generated prompts keyed by their parameters.
+
+    Patterns build their prompts from the same static text for every call
+    with the same parameters, so each variant is generated once and then
+    served from the cache.
+    """
+
+    def __init__(self, max_size: int = 256):
+        """
+        Initialize the prompt cache.
+
+        Args:
+            max_size: Maximum number of prompt variants kept
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+        self._prompts: "OrderedDict[Hashable, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key: Any, build: Callable[[], str]) -> str:
+        """
+        Get a cached prompt, building and caching it on a miss.
+
+        Args:
+            key: Prompt parameters (converted with freeze)
+            build: Function generating the prompt
+
+        Returns:
+            The prompt
+        """
+        try:
+            frozen_key: Optional[Hashable] = freeze(key)
+            hash(frozen_key)
+        except TypeError:
+            # Parameters that can't be hashed are generated every time
+            frozen_key = None
+
+        if frozen_key is not None:
+            with self._lock:
+                prompt = self._prompts.get(frozen_key)
+                if prompt is not None:
+                    self._prompts.move_to_end(frozen_key)
+                    self.hits += 1
+                    return prompt
+                self.misses += 1
+
+        prompt = build()
+
+        if frozen_key is not None:
+            with self._lock:
+                self._prompts[frozen_key] = prompt
+                self._prompts.move_to_end(frozen_key)
+                while len(self._prompts) > self.max_size:
+                    self._prompts.popitem(last=False)
+        return prompt
+
+    def clear(self) -> None:
+        """Remove all cached prompts."""
+        with self._lock:
+            self._prompts.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with the number of cached prompts, hits and misses
+        """
+        with self._lock:
+            return {"size": len(self._prompts), "hits": self.hits, "misses": self.misses}
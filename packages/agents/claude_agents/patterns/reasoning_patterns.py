@@ -1,12 +1,69 @@
 import json
 import logging
+import re
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Any, Dict, List, Optional, Union
 
+from .keyword_matcher import KeywordMatcher
+from .prompt_cache import PromptCache, system_blocks
+
 logger = logging.getLogger(__name__)
 
+# System prompt additions per agent type, appended after the pattern's prompt
+AGENT_RESPONSIBILITIES = {
+    "planner": "\nYour primary responsibility is to create effective plans and strategies.",
+    "executor": "\nYour primary responsibility is to implement solutions effectively.",
+    "critic": "\nYour primary responsibility is to evaluate outputs critically and provide constructive feedback."
+}
+
+# Task keywords indicating each reasoning pattern
+REASONING_KEYWORDS = {
+    "chain_of_thought": ["step by step", "sequential", "process", "logical", "procedure", "algorithm"],
+    "tree_of_thoughts": ["alternatives", "options", "paths", "approaches", "compare", "multiple"],
+    "self_reflection": ["improve", "refine", "critique", "evaluate", "review", "assess"],
+    "scientific_method": ["hypothesis", "experiment", "test", "evidence", "data", "observation"],
+    "debate": ["perspectives", "viewpoints", "arguments", "controversial", "opinion", "debate"],
+    "first_principles": ["fundamental", "assumption", "basic", "simplify", "essential", "core"]
+}
+
+# Reasoning patterns suited to each domain
+DOMAIN_AFFINITIES = {
+    "math": ["chain_of_thought", "scientific_method", "first_principles"],
+    "writing": ["self_reflection", "tree_of_thoughts"],
+    "ethics": ["debate", "self_reflection"],
+    "engineering": ["first_principles", "scientific_method"],
+    "business": ["tree_of_thoughts", "debate"],
+    "research": ["scientific_method", "debate"]
+}
+
+# Compiled once and shared by every library
+_KEYWORD_MATCHER = KeywordMatcher(REASONING_KEYWORDS)
+
+# Appended to the task prompt of self-consistency samples so their answers can be compared
+ANSWER_FORMAT_INSTRUCTION = (
+    "\n\nEnd your response with a line of the form 'Final Answer: <answer>', "
+    "giving only the short final answer."
+)
+
+# Line holding a sample's answer (the last one is used)
+_ANSWER_LINE = re.compile(r"^[ \t*_#>-]*(?:final answer|answer|conclusion)[*_]*\s*:[*_]*\s*(.+?)\s*$", re.IGNORECASE | re.MULTILINE)
+
+# Phrasing around an answer that does not change it
+_ANSWER_LEAD_IN = re.compile(
+    r"^(?:(?:so|thus|therefore|hence|in conclusion|overall)\s*,?\s*)?"
+    r"(?:(?:the|my)\s+)?(?:(?:final|correct)\s+)?(?:answer|result)\s*(?:is\s*:?|=|:)\s*",
+    re.IGNORECASE
+)
+
 class ReasoningPattern:
     """Base class for reasoning patterns."""
     
+    # Key of the parsed response holding the answer voted on by self_consistency
+    # when a sample has no "Final Answer:" line (None if voting is unsupported)
+    answer_key: Optional[str] = None
+    
     def __init__(self, name: str, description: str):
         """
         Initialize the reasoning pattern.
@@ -17,6 +74,32 @@ class ReasoningPattern:
         """
         self.name = name
         self.description = description
+        self.prompt_cache = PromptCache()
+    
+    def system_prompt(self, **kwargs) -> str:
+        """
+        Get the system prompt for these parameters, generating each variant once.
+        
+        Args:
+            **kwargs: Additional parameters for prompt generation
+            
+        Returns:
+            System prompt
+        """
+        return self.prompt_cache.get_or_build(("system", kwargs), lambda: self.generate_system_prompt(**kwargs))
+    
+    def task_prompt(self, task: str, **kwargs) -> str:
+        """
+        Get the task prompt for a task and parameters, generating each variant once.
+        
+        Args:
+            task: Task description
+            **kwargs: Additional parameters for prompt generation
+            
+        Returns:
+            Task prompt
+        """
+        return self.prompt_cache.get_or_build(("task", task, kwargs), lambda: self.generate_task_prompt(task, **kwargs))
     
     def generate_system_prompt(self, **kwargs) -> str:
         """
@@ -54,6 +137,150 @@ class ReasoningPattern:
             Parsed response
         """
         raise NotImplementedError("Subclasses must implement parse_response")
+    
+    def self_consistency(
+        self,
+        api_client: Any,
+        system_prompt: str,
+        task_prompt: str,
+        samples: int = 5,
+        max_concurrency: Optional[int] = None,
+        temperature: float = 0.7
+    ) -> Dict[str, Any]:
+        """
+        Sample several responses concurrently and take a majority vote over their answers.
+        
+        Each sample is asked to end with a "Final Answer:" line, and the
+        answers are normalized (see normalize_answer) before they are
+        compared. Samples are parsed with parse_response as they arrive. Once
+        the leading answer can no longer be overtaken by the samples still
+        outstanding, queued samples are cancelled and running ones are
+        abandoned: they are no longer waited for, but are still billed.
+        
+        Args:
+            api_client: Claude API client (anything with send_message)
+            system_prompt: System prompt for every sample
+            task_prompt: Task prompt for every sample
+            samples: Number of samples
+            max_concurrency: Maximum number of samples in flight at once (default: all)
+            temperature: Sampling temperature
+            
+        Returns:
+            Majority answer, votes per normalized answer, agreement among the
+            answered samples, parsed responses, and the number of samples
+            completed, abandoned while running and cancelled before they started
+            
+        Raises:
+            ValueError: If the pattern has no answer to vote on, or samples is
+                less than 1
+        """
+        if self.answer_key is None:
+            raise ValueError(f"Pattern '{self.name}' does not support self-consistency sampling")
+        if samples < 1:
+            raise ValueError(f"samples must be at least 1, got {samples}")
+        
+        votes = Counter()
+        answers = {}
+        responses = []
+        remaining = samples
+        
+        cancelled = 0
+        
+        pool = ThreadPoolExecutor(max_workers=max_concurrency or samples)
+        try:
+            futures = [
+                pool.submit(self._call, api_client, task_prompt + ANSWER_FORMAT_INSTRUCTION, temperature, None, system_prompt)
+                for _ in range(samples)
+            ]
+            for future in as_completed(futures):
+                remaining -= 1
+                text = future.result()
+                
+                # Failed samples cast no vote but still count as completed
+                if text:
+                    parsed = self.parse_response(text)
+                    responses.append(parsed)
+                    answer = self.extract_answer(text, parsed)
+                    normalized = self.normalize_answer(answer)
+                    if normalized:
+                        votes[normalized] += 1
+                        answers.setdefault(normalized, answer)
+                
+                # Stop once the outstanding samples can't change the winner
+                ranked = votes.most_common(2)
+                runner_up = ranked[1][1] if len(ranked) > 1 else 0
+                if ranked and remaining and ranked[0][1] > runner_up + remaining:
+                    logger.info(f"Majority reached after {samples - remaining} of {samples} samples")
+                    cancelled = sum(1 for other in futures if other.cancel())
+                    break
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        
+        winner = votes.most_common(1)[0][0] if votes else None
+        return {
+            "answer": answers.get(winner, ""),
+            "votes": dict(votes),
+            "agreement": votes[winner] / sum(votes.values()) if votes else 0.0,
+            "responses": responses,
+            "completed": samples - remaining,
+            "abandoned": remaining - cancelled,
+            "cancelled": cancelled
+        }
+    
+    def extract_answer(self, response: str, parsed: Dict[str, Any]) -> str:
+        """
+        Get the answer of a sampled response.
+        
+        Args:
+            response: Response text
+            parsed: The response parsed with parse_response
+            
+        Returns:
+            Text of the last "Final Answer:" (or "Answer:", "Conclusion:")
+            line, or else the parsed answer_key field
+        """
+        lines = _ANSWER_LINE.findall(response)
+        if lines:
+            return lines[-1]
+        return parsed.get(self.answer_key) or ""
+    
+    @staticmethod
+    def normalize_answer(answer: str) -> str:
+        """
+        Normalize an answer so differently phrased samples vote together.
+        
+        Args:
+            answer: Answer text
+            
+        Returns:
+            Lowercased answer without markup, lead-ins such as "the answer
+            is", surrounding quotes or trailing punctuation
+        """
+        answer = re.sub(r"\s+", " ", answer).strip(" *_`")
+        answer = _ANSWER_LEAD_IN.sub("", answer)
+        return answer.strip(" *_`\"'").rstrip(".!").strip(" *_`\"'").lower()
+    
+    @staticmethod
+    def _call(
+        api_client: Any,
+        prompt: str,
+        temperature: float,
+        max_tokens: Optional[int],
+        system: Optional[str] = None
+    ) -> str:
+        """Send a single-turn prompt and return the completion text ("" if the call fails)."""
+        try:
+            response = api_client.send_message(
+                messages=[{"role": "user", "content": prompt}],
+                system=system,
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+        except Exception as e:
+            logger.error(f"Reasoning pattern call failed: {str(e)}")
+            return ""
+        
+        return response.content[0].text.strip() if response.content else ""
 
 
 class ChainOfThoughtPattern(ReasoningPattern):
@@ -62,6 +289,8 @@ class ChainOfThoughtPattern(ReasoningPattern):
     Promotes step-by-step reasoning for complex problem-solving.
     """
     
+    answer_key = "final_answer"
+    
     def __init__(self):
         """Initialize the Chain-of-Thought pattern."""
         super().__init__(
@@ -218,6 +447,141 @@ class TreeOfThoughtsPattern(ReasoningPattern):
             f"4. Develop the best approach into a complete solution."
         )
     
+    def explore(
+        self,
+        api_client: Any,
+        task: str,
+        breadth: int = 3,
+        depth: int = 2,
+        beam_width: int = 2,
+        max_concurrency: int = 6,
+        complete: bool = True,
+        temperature: float = 0.9,
+        max_tokens: int = 512
+    ) -> Dict[str, Any]:
+        """
+        Run a tree-of-thoughts beam search with one API call per branch.
+        
+        Instead of enumerating and evaluating all branches in one long
+        completion, each level expands every path in the beam into `breadth`
+        candidate next thoughts with concurrent calls, scores the candidates
+        with concurrent calls, and keeps the top `beam_width` paths. With
+        `max_concurrency` of at least `beam_width * breadth`, wall time grows
+        with depth but not with breadth.
+        
+        Args:
+            api_client: Claude API client (anything with send_message)
+            task: Task description
+            breadth: Candidate thoughts generated per path at each level
+            depth: Number of levels to explore
+            beam_width: Paths kept after each level
+            max_concurrency: Maximum number of calls in flight at once
+            complete: Whether to develop the best path into a complete solution
+            temperature: Sampling temperature for candidate thoughts
+            max_tokens: Maximum tokens per candidate thought or evaluation
+            
+        Returns:
+            Best path and its score, the solution (if requested), the scored
+            candidates of every level, and the number of API calls and duration
+        """
+        start_time = time.time()
+        calls = 0
+        beam: List[Dict[str, Any]] = [{"path": [], "score": 0.0}]
+        levels = []
+        
+        with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+            for level in range(depth):
+                # Expand every path in the beam at once
+                expansions = [(node["path"], index) for node in beam for index in range(breadth)]
+                thoughts = list(pool.map(
+                    lambda expansion: self._call(
+                        api_client,
+                        self.generate_branch_prompt(task, expansion[0], expansion[1], breadth),
+                        temperature,
+                        max_tokens
+                    ),
+                    expansions
+                ))
+                calls += len(expansions)
+                
+                candidates = [
+                    path + [thought] for (path, _), thought in zip(expansions, thoughts) if thought
+                ]
+                if not candidates:
+                    logger.warning(f"No candidate thoughts generated at level {level + 1}. Stopping search.")
+                    break
+                
+                # Score all candidates at once
+                scores = list(pool.map(
+                    lambda path: self._parse_score(self._call(api_client, self.generate_evaluation_prompt(task, path), 0.0, max_tokens)),
+                    candidates
+                ))
+                calls += len(candidates)
+                
+                scored = sorted(
+                    ({"path": path, "score": score} for path, score in zip(candidates, scores)),
+                    key=lambda node: node["score"],
+                    reverse=True
+                )
+                levels.append(scored)
+                beam = scored[:beam_width]
+        
+        best = beam[0]
+        solution = ""
+        if complete and best["path"]:
+            solution = self._call(api_client, self.generate_solution_prompt(task, best["path"]), 0.7, None)
+            calls += 1
+        
+        return {
+            "pattern": "tree_of_thoughts",
+            "best_path": best["path"],
+            "score": best["score"],
+            "solution": solution,
+            "levels": levels,
+            "api_calls": calls,
+            "duration": time.time() - start_time
+        }
+    
+    def generate_branch_prompt(self, task: str, path: List[str], index: int, breadth: int) -> str:
+        """Generate the prompt for one candidate next thought of a path."""
+        prompt = f"{task}\n\n"
+        if path:
+            prompt += f"Reasoning so far:\n{self._format_path(path)}\n\n"
+        
+        return prompt + (
+            f"Propose the next step of reasoning toward a solution. "
+            f"This is candidate {index + 1} of {breadth} explored in parallel, so take an approach "
+            f"that differs from the most obvious one. Reply with this single step only, in a few sentences."
+        )
+    
+    def generate_evaluation_prompt(self, task: str, path: List[str]) -> str:
+        """Generate the prompt scoring how promising a path is."""
+        return (
+            f"{task}\n\n"
+            f"Partial reasoning:\n{self._format_path(path)}\n\n"
+            f"Rate how likely this line of reasoning is to lead to a correct, complete solution "
+            f"on a scale from 0 to 10. Reply with the number only."
+        )
+    
+    def generate_solution_prompt(self, task: str, path: List[str]) -> str:
+        """Generate the prompt developing the best path into a solution."""
+        return (
+            f"{task}\n\n"
+            f"Follow this line of reasoning:\n{self._format_path(path)}\n\n"
+            f"Develop it into a complete solution."
+        )
+    
+    @staticmethod
+    def _format_path(path: List[str]) -> str:
+        """Number the thoughts of a path."""
+        return "\n".join(f"{i}. {thought}" for i, thought in enumerate(path, 1))
+    
+    @staticmethod
+    def _parse_score(text: str) -> float:
+        """Parse a 0-10 score from an evaluation (0 if there is none)."""
+        match = re.search(r"\d+(?:\.\d+)?", text)
+        return min(max(float(match.group()), 0.0), 10.0) if match else 0.0
+    
     def parse_response(self, response: str) -> Dict[str, Any]:
         """Parse a Tree of Thoughts response."""
         import re
@@ -258,6 +622,8 @@ class SelfReflectionPattern(ReasoningPattern):
     Generates a solution, then critically evaluates and refines it.
     """
     
+    answer_key = "final_answer"
+    
     def __init__(self):
         """Initialize the Self-Reflection pattern."""
         super().__init__(
@@ -332,11 +698,15 @@ class SelfReflectionPattern(ReasoningPattern):
         if refine_match:
             refined_solution = refine_match.group(1).strip()
         
+        # Short answer line, if the response ends with one
+        answer_lines = _ANSWER_LINE.findall(response)
+        
         return {
             "reasoning_pattern": "self_reflection",
             "initial_solution": initial_solution,
             "reflection": reflection,
             "refined_solution": refined_solution,
+            "final_answer": answer_lines[-1] if answer_lines else "",
             "full_response": response
         }
 
@@ -700,42 +1070,16 @@ class ReasoningPatternLibrary:
         Returns:
             Recommendation with pattern and reasoning
         """
-        # Simple keyword-based recommendation
-        keywords = {
-            "chain_of_thought": ["step by step", "sequential", "process", "logical", "procedure", "algorithm"],
-            "tree_of_thoughts": ["alternatives", "options", "paths", "approaches", "compare", "multiple"],
-            "self_reflection": ["improve", "refine", "critique", "evaluate", "review", "assess"],
-            "scientific_method": ["hypothesis", "experiment", "test", "evidence", "data", "observation"],
-            "debate": ["perspectives", "viewpoints", "arguments", "controversial", "opinion", "debate"],
-            "first_principles": ["fundamental", "assumption", "basic", "simplify", "essential", "core"]
-        }
-        
-        # Domain affinities
-        domain_affinities = {
-            "math": ["chain_of_thought", "scientific_method", "first_principles"],
-            "writing": ["self_reflection", "tree_of_thoughts"],
-            "ethics": ["debate", "self_reflection"],
-            "engineering": ["first_principles", "scientific_method"],
-            "business": ["tree_of_thoughts", "debate"],
-            "research": ["scientific_method", "debate"]
-        }
-        
-        # Count keyword matches
-        scores = {pattern_name: 0 for pattern_name in self.patterns.keys()}
-        
-        # Keyword matching
-        task_lower = task.lower()
-        for pattern_name, pattern_keywords in keywords.items():
-            for keyword in pattern_keywords:
-                if keyword in task_lower:
-                    scores[pattern_name] += 1
+        # Keyword-based recommendation against the precompiled keyword table
+        matched_keywords = _KEYWORD_MATCHER.match(task)
+        scores = {pattern_name: len(matched_keywords.get(pattern_name, ())) for pattern_name in self.patterns.keys()}
         
         # Domain affinity
         domain_lower = domain.lower()
-        for d, patterns in domain_affinities.items():
-            if d in domain_lower:
-                for pattern in patterns:
-                    scores[pattern] += 2
+        matched_domains = [d for d in DOMAIN_AFFINITIES if d in domain_lower]
+        for d in matched_domains:
+            for pattern in DOMAIN_AFFINITIES[d]:
+                scores[pattern] += 2
         
         # Get top recommendation
         if not any(scores.values()):
@@ -746,8 +1090,8 @@ class ReasoningPatternLibrary:
             top_pattern = max(scores.items(), key=lambda x: x[1])[0]
             
             # Generate reasoning
-            matching_keywords = [k for k in keywords[top_pattern] if k in task_lower]
-            matching_domains = [d for d, patterns in domain_affinities.items() if d in domain_lower and top_pattern in patterns]
+            matching_keywords = matched_keywords.get(top_pattern, [])
+            matching_domains = [d for d in matched_domains if top_pattern in DOMAIN_AFFINITIES[d]]
             
             reasoning_parts = []
             if matching_keywords:
@@ -769,41 +1113,68 @@ class ReasoningPatternLibrary:
         pattern_name: str,
         task: str,
         agent_type: str = "planner",
+        api_client: Optional[Any] = None,
+        samples: int = 1,
+        max_concurrency: Optional[int] = None,
         **kwargs
-    ) -> Dict[str, str]:
+    ) -> Dict[str, Any]:
         """
         Apply a reasoning pattern to a task for a specific agent type.
         
+        With an API client and more than one sample, the prompts are also
+        run with self-consistency: the samples are issued concurrently and
+        their answers decided by majority vote (see
+        ReasoningPattern.self_consistency).
+        
         Args:
             pattern_name: Name of the reasoning pattern
             task: Task description
             agent_type: Type of agent (planner, executor, critic)
+            api_client: Optional API client for self-consistency sampling
+            samples: Number of samples to vote over (with api_client)
+            max_concurrency: Maximum number of samples in flight at once (default: all)
             **kwargs: Additional parameters for the pattern
             
         Returns:
-            Dictionary with system prompt and task prompt
+            Dictionary with system prompt and task prompt, the stable system
+            prompt prefix shared by all agent types, and system prompt content
+            blocks marking that prefix as cacheable (pass them as the system
+            prompt to send_message); with sampling, also the self-consistency
+            result
+            
+        Raises:
+            ValueError: If the pattern is not found, or sampling is requested
+                for a pattern without an answer to vote on
         """
         pattern = self.get_pattern(pattern_name)
         if not pattern:
             raise ValueError(f"Pattern '{pattern_name}' not found")
         
-        # Generate prompts
-        system_prompt = pattern.generate_system_prompt(**kwargs)
-        task_prompt = pattern.generate_task_prompt(task, **kwargs)
+        # Generate prompts (each variant is generated once per pattern)
+        stable_prefix = pattern.system_prompt(**kwargs)
+        task_prompt = pattern.task_prompt(task, **kwargs)
         
-        # Adjust for agent type
-        if agent_type == "planner":
-            system_prompt += "\nYour primary responsibility is to create effective plans and strategies."
-        elif agent_type == "executor":
-            system_prompt += "\nYour primary responsibility is to implement solutions effectively."
-        elif agent_type == "critic":
-            system_prompt += "\nYour primary responsibility is to evaluate outputs critically and provide constructive feedback."
+        # Adjust for agent type after the prefix shared by all agent types
+        agent_prompt = AGENT_RESPONSIBILITIES.get(agent_type, "")
         
-        return {
-            "system_prompt": system_prompt,
+        result = {
+            "system_prompt": stable_prefix + agent_prompt,
+            "stable_prefix": stable_prefix,
+            "system_blocks": system_blocks(stable_prefix, agent_prompt),
             "task_prompt": task_prompt,
             "pattern": pattern_name
         }
+        
+        if api_client is not None and samples > 1:
+            result["self_consistency"] = pattern.self_consistency(
+                api_client,
+                result["system_prompt"],
+                task_prompt,
+                samples=samples,
+                max_concurrency=max_concurrency
+            )
+        
+        return result
 
 
 # Domain-specific preset configurations
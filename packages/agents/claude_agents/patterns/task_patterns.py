@@ -3,10 +3,23 @@ import logging
 import re
 from typing import Any, Dict, List, Optional, Union
 
-from .reasoning_patterns import ReasoningPatternLibrary
+from .keyword_matcher import KeywordMatcher
+from .prompt_cache import PromptCache, system_blocks
+from .reasoning_patterns import AGENT_RESPONSIBILITIES, ReasoningPatternLibrary
 
 logger = logging.getLogger(__name__)
 
+# Task keywords indicating each task pattern
+TASK_KEYWORDS = {
+    "code_generation": ["code", "program", "implement", "function", "class", "algorithm", "develop"],
+    "data_analysis": ["analyze", "data", "dataset", "trend", "pattern", "visualization", "statistical"],
+    "content_creation": ["write", "content", "article", "blog", "post", "summary", "creative"],
+    "decision_support": ["decide", "decision", "option", "alternative", "recommend", "choice", "select"]
+}
+
+# Compiled once and shared by every library
+_KEYWORD_MATCHER = KeywordMatcher(TASK_KEYWORDS)
+
 class TaskPattern:
     """Base class for task-specific patterns."""
     
@@ -21,6 +34,38 @@ class TaskPattern:
         self.name = name
         self.description = description
         self.reasoning_library = ReasoningPatternLibrary()
+        self.prompt_cache = PromptCache()
+    
+    def system_prompt(self, **kwargs) -> str:
+        """
+        Get the system prompt for these parameters.
+        
+        The prompt is generated on first use and served from the pattern's
+        prompt cache afterwards.
+        
+        Args:
+            **kwargs: Additional parameters for prompt generation
+            
+        Returns:
+            System prompt
+        """
+        return self.prompt_cache.get_or_build(("system", kwargs), lambda: self.generate_system_prompt(**kwargs))
+    
+    def task_prompt(self, task: str, **kwargs) -> str:
+        """
+        Get the task prompt for a task and parameters.
+        
+        Repeated calls for the same task (e.g. one per agent type) are served
+        from the pattern's prompt cache.
+        
+        Args:
+            task: Original task description
+            **kwargs: Additional parameters for prompt generation
+            
+        Returns:
+            Task prompt
+        """
+        return self.prompt_cache.get_or_build(("task", task, kwargs), lambda: self.generate_task_prompt(task, **kwargs))
     
     def generate_system_prompt(self, **kwargs) -> str:
         """
@@ -138,7 +183,7 @@ class CodeGenerationPattern(TaskPattern):
         if reasoning_pattern:
             pattern = self.reasoning_library.get_pattern(reasoning_pattern)
             if pattern:
-                reasoning_prompt = pattern.generate_system_prompt(domain="code")
+                reasoning_prompt = pattern.system_prompt(domain="code")
                 prompt += f"\n\n{reasoning_prompt}"
         
         return prompt
@@ -163,7 +208,7 @@ class CodeGenerationPattern(TaskPattern):
         if reasoning_pattern:
             pattern = self.reasoning_library.get_pattern(reasoning_pattern)
             if pattern:
-                reasoning_prompt = pattern.generate_task_prompt(
+                reasoning_prompt = pattern.task_prompt(
                     "Think about the design and implementation of this code",
                     domain="code"
                 )
@@ -300,7 +345,7 @@ class DataAnalysisPattern(TaskPattern):
         if reasoning_pattern:
             pattern = self.reasoning_library.get_pattern(reasoning_pattern)
             if pattern:
-                reasoning_prompt = pattern.generate_system_prompt(domain="data_analysis")
+                reasoning_prompt = pattern.system_prompt(domain="data_analysis")
                 prompt += f"\n\n{reasoning_prompt}"
         
         return prompt
@@ -328,7 +373,7 @@ class DataAnalysisPattern(TaskPattern):
         if reasoning_pattern:
             pattern = self.reasoning_library.get_pattern(reasoning_pattern)
             if pattern:
-                reasoning_prompt = pattern.generate_task_prompt(
+                reasoning_prompt = pattern.task_prompt(
                     "Approach this data analysis systematically",
                     domain="data_analysis"
                 )
@@ -496,7 +541,7 @@ class ContentCreationPattern(TaskPattern):
         if reasoning_pattern:
             pattern = self.reasoning_library.get_pattern(reasoning_pattern)
             if pattern:
-                reasoning_prompt = pattern.generate_system_prompt(domain="writing")
+                reasoning_prompt = pattern.system_prompt(domain="writing")
                 prompt += f"\n\n{reasoning_prompt}"
         
         return prompt
@@ -523,7 +568,7 @@ class ContentCreationPattern(TaskPattern):
         if reasoning_pattern:
             pattern = self.reasoning_library.get_pattern(reasoning_pattern)
             if pattern:
-                reasoning_prompt = pattern.generate_task_prompt(
+                reasoning_prompt = pattern.task_prompt(
                     f"Create {content_type} content for this topic",
                     domain="writing"
                 )
@@ -709,7 +754,7 @@ class DecisionSupportPattern(TaskPattern):
         if reasoning_pattern:
             pattern = self.reasoning_library.get_pattern(reasoning_pattern)
             if pattern:
-                reasoning_prompt = pattern.generate_system_prompt(domain="decision_making")
+                reasoning_prompt = pattern.system_prompt(domain="decision_making")
                 prompt += f"\n\n{reasoning_prompt}"
         
         return prompt
@@ -746,7 +791,7 @@ class DecisionSupportPattern(TaskPattern):
         if reasoning_pattern:
             pattern = self.reasoning_library.get_pattern(reasoning_pattern)
             if pattern:
-                reasoning_prompt = pattern.generate_task_prompt(
+                reasoning_prompt = pattern.task_prompt(
                     "Analyze these options to support a decision",
                     domain="decision_making"
                 )
@@ -860,23 +905,9 @@ class TaskPatternLibrary:
         Returns:
             Recommendation with pattern and reasoning
         """
-        # Simple keyword-based recommendation
-        keywords = {
-            "code_generation": ["code", "program", "implement", "function", "class", "algorithm", "develop"],
-            "data_analysis": ["analyze", "data", "dataset", "trend", "pattern", "visualization", "statistical"],
-            "content_creation": ["write", "content", "article", "blog", "post", "summary", "creative"],
-            "decision_support": ["decide", "decision", "option", "alternative", "recommend", "choice", "select"]
-        }
-        
-        # Count keyword matches
-        scores = {pattern_name: 0 for pattern_name in self.patterns.keys()}
-        
-        # Keyword matching
-        task_lower = task.lower()
-        for pattern_name, pattern_keywords in keywords.items():
-            for keyword in pattern_keywords:
-                if keyword in task_lower:
-                    scores[pattern_name] += 1
+        # Keyword-based recommendation against the precompiled keyword table
+        matched_keywords = _KEYWORD_MATCHER.match(task)
+        scores = {pattern_name: len(matched_keywords.get(pattern_name, ())) for pattern_name in self.patterns.keys()}
         
         # Get top recommendation
         if not any(scores.values()):
@@ -887,7 +918,7 @@ class TaskPatternLibrary:
             top_pattern = max(scores.items(), key=lambda x: x[1])[0]
             
             # Generate reasoning
-            matching_keywords = [k for k in keywords[top_pattern] if k in task_lower]
+            matching_keywords = matched_keywords.get(top_pattern, [])
             reasoning = f"Task contains relevant keywords: {', '.join(matching_keywords)}." if matching_keywords else "Best overall match for the given task."
         
         # Also recommend a reasoning pattern to pair with the task pattern
@@ -922,7 +953,10 @@ class TaskPatternLibrary:
             **kwargs: Additional parameters for the pattern
             
         Returns:
-            Dictionary with system prompt and task prompt
+            Dictionary with system prompt and task prompt, the stable system
+            prompt prefix shared by all agent types, and system prompt content
+            blocks marking that prefix as cacheable (pass them as the system
+            prompt to send_message)
         """
         pattern = self.get_pattern(pattern_name)
         if not pattern:
@@ -936,20 +970,17 @@ class TaskPatternLibrary:
         # Pass the reasoning pattern to the prompts
         kwargs["reasoning_pattern"] = reasoning_pattern
         
-        # Generate prompts
-        system_prompt = pattern.generate_system_prompt(**kwargs)
-        task_prompt = pattern.generate_task_prompt(task, **kwargs)
+        # Generate prompts (each variant is generated once per pattern)
+        stable_prefix = pattern.system_prompt(**kwargs)
+        task_prompt = pattern.task_prompt(task, **kwargs)
         
-        # Adjust for agent type
-        if agent_type == "planner":
-            system_prompt += "\nYour primary responsibility is to create effective plans and strategies."
-        elif agent_type == "executor":
-            system_prompt += "\nYour primary responsibility is to implement solutions effectively."
-        elif agent_type == "critic":
-            system_prompt += "\nYour primary responsibility is to evaluate outputs critically and provide constructive feedback."
+        # Adjust for agent type after the prefix shared by all agent types
+        agent_prompt = AGENT_RESPONSIBILITIES.get(agent_type, "")
         
         return {
-            "system_prompt": system_prompt,
+            "system_prompt": stable_prefix + agent_prompt,
+            "stable_prefix": stable_prefix,
+            "system_blocks": system_blocks(stable_prefix, agent_prompt),
             "task_prompt": task_prompt,
             "task_pattern": pattern_name,
             "reasoning_pattern": reasoning_pattern
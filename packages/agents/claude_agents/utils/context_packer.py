@@ -0,0 +1,183 @@
+import json
+import logging
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from .token_counter import EstimatedTokenCounter
+
+logger = logging.getLogger(__name__)
+
+# Appended to content that was cut to fit the budget
+TRUNCATION_MARKER = "...[truncated]"
+
+class ContextItem(NamedTuple):
+    """
+    A piece of context competing for space in a prompt.
+
+    Attributes:
+        key: Name the item is rendered under
+        content: Text or JSON-serializable data
+        score: Relevance of the item (higher is kept first)
+        truncatable: Whether the item may be cut to fit instead of dropped
+    """
+    key: str
+    content: Any
+    score: float = 1.0
+    truncatable: bool = True
+
+def to_compact_json(data: Any) -> str:
+    """
+    Serialize data as JSON without insignificant whitespace.
+
+    Args:
+        data: Data to serialize
+
+    Returns:
+        Compact JSON string
+    """
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=str)
+
+class ContextPacker:
+    """
+    Packs scored context items into a prompt under a token budget.
+
+    Items are selected with a greedy knapsack heuristic: whole items are taken
+    in order of score per token, the best single item is preferred if it beats
+    that selection, and the remaining budget is filled by truncating the
+    highest-scoring item that did not fit. Packed items keep their original
+    order so prompts stay stable across calls.
+    """
+
+    def __init__(
+        self,
+        token_counter: Optional[Any] = None,
+        budget: int = 8000,
+        min_item_tokens: int = 32,
+    ):
+        """
+        Initialize the context packer.
+
+        Args:
+            token_counter: Object with a count_tokens(text) method (if None,
+                tokens are estimated from the text length)
+            budget: Default token budget for packed context
+            min_item_tokens: Smallest budget worth truncating an item into
+        """
+        self.token_counter = token_counter or EstimatedTokenCounter()
+        self.budget = budget
+        self.min_item_tokens = min_item_tokens
+
+    @staticmethod
+    def items_from_dict(
+        context: Dict[str, Any],
+        scores: Optional[Dict[str, float]] = None,
+        default_score: float = 1.0,
+    ) -> List[ContextItem]:
+        """
+        Create context items from the entries of a dictionary.
+
+        Args:
+            context: Context dictionary
+            scores: Optional scores by key
+            default_score: Score for keys without an explicit score
+
+        Returns:
+            List of context items
+        """
+        scores = scores or {}
+        return [ContextItem(key, value, scores.get(key, default_score)) for key, value in context.items()]
+
+    def pack(self, items: Sequence[ContextItem], budget: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Select and truncate context items to fit a token budget.
+
+        Args:
+            items: Candidate context items
+            budget: Token budget (defaults to the packer's budget)
+
+        Returns:
+            Dictionary of packed items by key, in their original order;
+            truncated items are returned as strings
+        """
+        budget = self.budget if budget is None else budget
+        costs = [self._item_tokens(item.key, item.content) for item in items]
+
+        if sum(costs) <= budget:
+            return {item.key: item.content for item in items}
+
+        # Take whole items in order of score density
+        order = sorted(
+            range(len(items)),
+            key=lambda i: (items[i].score / max(costs[i], 1), items[i].score),
+            reverse=True,
+        )
+        selected = set()
+        remaining = budget
+        for i in order:
+            if costs[i] <= remaining:
+                selected.add(i)
+                remaining -= costs[i]
+
+        # A single valuable item can beat many cheap ones
+        fitting = [i for i in range(len(items)) if costs[i] <= budget]
+        if fitting:
+            best = max(fitting, key=lambda i: items[i].score)
+            if items[best].score > sum(items[i].score for i in selected):
+                selected, remaining = {best}, budget - costs[best]
+
+        packed_content = {i: items[i].content for i in selected}
+
+        # Fill what is left with the best item that did not fit
+        skipped = [i for i in range(len(items)) if i not in selected and items[i].truncatable]
+        if skipped and remaining >= self.min_item_tokens:
+            i = max(skipped, key=lambda i: items[i].score)
+            truncated = self._truncate(items[i].key, items[i].content, remaining)
+            if truncated is not None:
+                packed_content[i] = truncated
+
+        dropped = [items[i].key for i in range(len(items)) if i not in packed_content]
+        if dropped:
+            logger.debug(f"Dropped context items to fit {budget} tokens: {', '.join(dropped)}")
+
+        return {items[i].key: packed_content[i] for i in sorted(packed_content)}
+
+    def render(self, items: Sequence[ContextItem], budget: Optional[int] = None) -> str:
+        """
+        Pack context items and render them as compact JSON.
+
+        Args:
+            items: Candidate context items
+            budget: Token budget (defaults to the packer's budget)
+
+        Returns:
+            Compact JSON object of the packed items
+        """
+        return to_compact_json(self.pack(items, budget))
+
+    def _item_tokens(self, key: str, content: Any) -> int:
+        """Count the tokens an item takes up when rendered."""
+        return self.token_counter.count_tokens(to_compact_json({key: content}))
+
+    def _truncate(self, key: str, content: Any, budget: int) -> Optional[str]:
+        """
+        Cut an item's text down to fit a token budget.
+
+        Args:
+            key: Item key
+            content: Item content
+            budget: Tokens available for the item
+
+        Returns:
+            Truncated text, or None if nothing meaningful fits
+        """
+        text = content if isinstance(content, str) else to_compact_json(content)
+        tokens = self._item_tokens(key, text)
+
+        # Start from a proportional estimate and shrink until it fits
+        length = int(len(text) * budget / max(tokens, 1))
+        while length > 0:
+            truncated = text[:length] + TRUNCATION_MARKER
+            if self._item_tokens(key, truncated) <= budget:
+                return truncated
+            length = int(length * 0.9)
+
+        return None
@@ -0,0 +1,133 @@
+import re
+from typing import Callable, Dict, NamedTuple, Optional, Set, Sequence, Union
+
+def _first_char(pattern: str) -> Optional[str]:
+    """
+    Get the literal character every match of a pattern starts with.
+
+    Args:
+        pattern: Regex pattern
+
+    Returns:
+        The first character, or None if the pattern does not start with a
+        (possibly escaped) literal character
+    """
+    if pattern.startswith(r"\b"):
+        pattern = pattern[2:]
+
+    if pattern[:1] == "\\" and len(pattern) > 1 and not pattern[1].isalnum():
+        char, rest = pattern[1], pattern[2:]
+    elif pattern[:1].isalnum() or pattern[:1] in (" ", "-"):
+        char, rest = pattern[0], pattern[1:]
+    else:
+        return None
+
+    # The character may be optional, or another branch may start differently
+    if rest[:1] in ("?", "*", "{") or _has_top_level_branch(pattern):
+        return None
+    return char
+
+def _has_top_level_branch(pattern: str) -> bool:
+    """Check whether a pattern has an alternation outside of any group."""
+    depth = 0
+    escaped = in_class = False
+    for char in pattern:
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            return True
+    return False
+
+class RewriteRule(NamedTuple):
+    """
+    A single rewrite rule for PromptRewriter.
+
+    Attributes:
+        pattern: Regex pattern (must not define named groups)
+        replacement: Replacement text, or a function of the matched text. For
+            line-scoped rules the function also receives a set of keys shared
+            by all line-scoped rewrites on the same line, which lets a rule
+            fire once per line like a substitution that consumes the line.
+        line_scoped: Whether the replacement function takes the per-line key set
+    """
+    pattern: str
+    replacement: Union[str, Callable[..., str]]
+    line_scoped: bool = False
+
+class PromptRewriter:
+    """
+    Precompiled single-pass text rewriter.
+
+    All rules are compiled into one alternation regex with a named group per
+    rule, so a prompt is scanned once no matter how many rules there are. The
+    matched group selects the replacement from a lookup table. Rules earlier
+    in the list take priority when several match at the same position.
+
+    When every rule starts with a literal character, the alternation is
+    prefixed with a lookahead on those characters so the regex engine can skip
+    positions where no rule can match without trying each alternative.
+    """
+
+    def __init__(self, rules: Sequence[RewriteRule], flags: int = re.IGNORECASE):
+        """
+        Compile the rewriter.
+
+        Args:
+            rules: Rewrite rules in priority order
+            flags: Regex flags applied to all rules
+        """
+        self.rules = list(rules)
+        self._rules_by_group: Dict[str, RewriteRule] = {}
+        alternatives = []
+
+        for index, rule in enumerate(self.rules):
+            name = f"rule{index}"
+            alternatives.append(f"(?P<{name}>{rule.pattern})")
+            self._rules_by_group[name] = rule
+
+        pattern = "|".join(alternatives)
+        first_chars = {_first_char(rule.pattern) for rule in self.rules}
+        if self.rules and None not in first_chars:
+            pattern = "(?=[" + "".join(sorted(re.escape(char) for char in first_chars)) + "])(?:" + pattern + ")"
+
+        self._pattern = re.compile(pattern, flags)
+
+    def rewrite(self, text: str) -> str:
+        """
+        Apply all rules to a text in a single pass.
+
+        Args:
+            text: Text to rewrite
+
+        Returns:
+            Rewritten text
+        """
+        # Keys fired by line-scoped rules on the current line
+        line_start = -1
+        line_keys: Set[str] = set()
+
+        def replace(match: re.Match) -> str:
+            nonlocal line_start, line_keys
+            rule = self._rules_by_group[match.lastgroup]
+
+            if isinstance(rule.replacement, str):
+                return rule.replacement
+            if not rule.line_scoped:
+                return rule.replacement(match.group())
+
+            start = text.rfind("\n", 0, match.start()) + 1
+            if start != line_start:
+                line_start, line_keys = start, set()
+            return rule.replacement(match.group(), line_keys)
+
+        return self._pattern.sub(replace, text)
@@ -0,0 +1,162 @@
+import re
+from typing import List, Optional, Tuple
+
+# Sections removed from responses when no filters are given
+DEFAULT_RESPONSE_FILTERS = ["thinking", "explanation", "reasoning"]
+
+# Runs of three or more newlines
+_EXTRA_NEWLINES_PATTERN = re.compile(r"\n{3,}")
+
+class StreamingResponseFilter:
+    """
+    Incremental version of TokenOptimizer.filter_response for streamed text.
+
+    A small state machine removes filtered sections as chunks arrive:
+
+    - ``<term>...</term>`` sections are dropped
+    - ``*term*``/``*term:*`` and ``term:`` sections are replaced with a
+      paragraph break up to the next blank line
+
+    Clean text is emitted as soon as it cannot be the start of a section
+    marker, so at most one marker's worth of text (plus trailing whitespace)
+    is held back. Discarded sections are never buffered.
+
+    The output matches filter_response for well-formed responses. A tag
+    section that is never closed is dropped through the end of the stream,
+    since whether it closes is only known once the stream ends.
+    """
+
+    TEXT = "text"
+    SECTION = "section"
+
+    def __init__(self, filters: Optional[List[str]] = None):
+        """
+        Initialize the filter.
+
+        Args:
+            filters: Sections to filter (e.g., ["explanation", "thinking"])
+        """
+        # Start marker -> (end marker, replacement)
+        self._sections = {}
+        for term in filters or DEFAULT_RESPONSE_FILTERS:
+            term = term.lower()
+            self._sections[f"<{term}>"] = (f"</{term}>", "")
+            self._sections[f"*{term}*"] = ("\n\n", "\n\n")
+            self._sections[f"*{term}:*"] = ("\n\n", "\n\n")
+            self._sections[f"{term}:"] = ("\n\n", "\n\n")
+
+        self._start_pattern = re.compile(
+            "|".join(re.escape(marker) for marker in sorted(self._sections, key=len, reverse=True)),
+            re.IGNORECASE,
+        )
+        self._marker_prefixes = {marker[:i] for marker in self._sections for i in range(1, len(marker))}
+        self._max_marker_length = max(len(marker) for marker in self._sections)
+
+        self._state = self.TEXT
+        self._section: Tuple[str, str] = ("", "")
+        self._buffer = ""
+        self._pending_whitespace = ""
+        self._started = False
+
+    def feed(self, chunk: str) -> str:
+        """
+        Consume a chunk of the response.
+
+        Args:
+            chunk: Next piece of response text
+
+        Returns:
+            Filtered text that is safe to emit
+        """
+        self._buffer += chunk
+        return self._process(final=False)
+
+    def flush(self) -> str:
+        """
+        Finish the stream.
+
+        Returns:
+            Any remaining filtered text
+        """
+        output = self._process(final=True)
+        if self._state == self.SECTION and self._section[0] == "\n\n":
+            # Sections ending at a blank line may also end with the response
+            output += self._emit(self._section[1])
+
+        self._state = self.TEXT
+        self._buffer = ""
+        self._pending_whitespace = ""
+        return output
+
+    def _process(self, final: bool) -> str:
+        """
+        Run the state machine over the buffered text.
+
+        Args:
+            final: Whether the stream has ended, so no text needs holding back
+
+        Returns:
+            Filtered text that is safe to emit
+        """
+        output = []
+
+        while self._buffer:
+            if self._state == self.TEXT:
+                # Hold back a tail that may be the start of a marker, unless a
+                # complete marker starts before it
+                held = 0 if final else self._partial_marker_length(self._buffer)
+                safe_length = len(self._buffer) - held
+
+                match = self._start_pattern.search(self._buffer)
+                if match and match.start() < safe_length:
+                    output.append(self._emit(self._buffer[:match.start()]))
+                    self._state = self.SECTION
+                    self._section = self._sections[match.group().lower()]
+                    self._buffer = self._buffer[match.end():]
+                    continue
+
+                output.append(self._emit(self._buffer[:safe_length]))
+                self._buffer = self._buffer[safe_length:]
+                break
+
+            end_marker, replacement = self._section
+            end = self._buffer.lower().find(end_marker)
+            if end != -1:
+                output.append(self._emit(replacement))
+                self._state = self.TEXT
+                self._buffer = self._buffer[end + len(end_marker):]
+                continue
+
+            # Discard the section, keeping only what may be a partial end marker
+            self._buffer = self._buffer[max(len(self._buffer) - len(end_marker) + 1, 0):]
+            break
+
+        return "".join(output)
+
+    def _partial_marker_length(self, text: str) -> int:
+        """Length of the longest suffix of text that is a proper prefix of a marker."""
+        lowered = text[-self._max_marker_length:].lower()
+        for length in range(min(len(lowered), self._max_marker_length - 1), 0, -1):
+            if lowered[-length:] in self._marker_prefixes:
+                return length
+        return 0
+
+    def _emit(self, text: str) -> str:
+        """
+        Normalize whitespace in text that is ready to be emitted.
+
+        Leading whitespace of the response is dropped and trailing whitespace
+        is held back until more text follows, so the output is stripped and
+        newline runs can be collapsed across chunks.
+        """
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return ""
+            self._started = True
+
+        text = self._pending_whitespace + text
+        body = text.rstrip()
+        self._pending_whitespace = text[len(body):]
+
+        return _EXTRA_NEWLINES_PATTERN.sub("\n\n", body)
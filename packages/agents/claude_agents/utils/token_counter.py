@@ -1,21 +1,56 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
 from typing import Any, Dict, List, Optional, Union
 
 import tiktoken
 
+logger = logging.getLogger(__name__)
 
 class TokenCounter:
-    """Utility class for more accurate token counting."""
+    """
+    Utility class for more accurate token counting.
     
-    def __init__(self, model_name: str = "claude-3"):
+    The tokenizer is loaded on first use, and token counts are memoized in an
+    LRU cache keyed by a hash of the text. Repeated counts over a mostly
+    unchanged conversation history are therefore cache hits. If the tokenizer
+    cannot be loaded (e.g. offline, without a cached encoding file), counts
+    fall back to an estimate of ~4 characters per token.
+    """
+    
+    def __init__(self, model_name: str = "claude-3", cache_size: int = 4096):
         """
         Initialize the token counter.
         
         Args:
             model_name: Model name to use for tokenization.
                 For Claude models, we use 'cl100k_base' tokenizer which is close to Claude's tokenization.
+            cache_size: Maximum number of memoized token counts
         """
-        # Claude uses a tokenizer similar to GPT-4's cl100k_base
-        self.tokenizer = tiktoken.get_encoding("cl100k_base")
+        self.model_name = model_name
+        self.cache_size = cache_size
+        
+        self._tokenizer = None
+        self._tokenizer_loaded = False
+        self._count_cache: "OrderedDict[bytes, int]" = OrderedDict()
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._lock = threading.Lock()
+    
+    @property
+    def tokenizer(self) -> Any:
+        """The tiktoken encoding, loaded on first access (None if it could not be loaded)."""
+        if not self._tokenizer_loaded:
+            with self._lock:
+                if not self._tokenizer_loaded:
+                    try:
+                        # Claude uses a tokenizer similar to GPT-4's cl100k_base
+                        self._tokenizer = tiktoken.get_encoding("cl100k_base")
+                    except Exception as e:
+                        logger.warning(f"Could not load the cl100k_base tokenizer, estimating token counts: {str(e)}")
+                    self._tokenizer_loaded = True
+        return self._tokenizer
     
     def count_tokens(self, text: str) -> int:
         """
@@ -27,7 +62,56 @@ class TokenCounter:
         Returns:
             Token count
         """
-        return len(self.tokenizer.encode(text))
+        return self.count_tokens_batch([text])[0]
+    
+    def count_tokens_batch(self, texts: List[str], num_threads: int = 8) -> List[int]:
+        """
+        Count tokens for many texts, encoding only those not already cached.
+        
+        Cache misses are encoded together with tiktoken's encode_batch, which
+        spreads the work across threads.
+        
+        Args:
+            texts: Texts to count tokens for
+            num_threads: Number of threads used by encode_batch
+            
+        Returns:
+            Token counts in the same order as texts
+        """
+        keys = [self._cache_key(text) for text in texts]
+        counts: List[Optional[int]] = [None] * len(texts)
+        missing: Dict[bytes, List[int]] = {}  # key -> positions in texts
+        
+        with self._lock:
+            for position, key in enumerate(keys):
+                if key in self._count_cache:
+                    self._count_cache.move_to_end(key)
+                    counts[position] = self._count_cache[key]
+                    self._cache_hits += 1
+                else:
+                    missing.setdefault(key, []).append(position)
+                    self._cache_misses += 1
+        
+        if missing:
+            missing_texts = [texts[positions[0]] for positions in missing.values()]
+            tokenizer = self.tokenizer
+            if tokenizer is None:
+                lengths = EstimatedTokenCounter().count_tokens_batch(missing_texts)
+            elif len(missing_texts) == 1:
+                lengths = [len(tokenizer.encode(missing_texts[0]))]
+            else:
+                lengths = [len(tokens) for tokens in tokenizer.encode_batch(missing_texts, num_threads=num_threads)]
+            
+            with self._lock:
+                for (key, positions), length in zip(missing.items(), lengths):
+                    for position in positions:
+                        counts[position] = length
+                    self._count_cache[key] = length
+                
+                while len(self._count_cache) > self.cache_size:
+                    self._count_cache.popitem(last=False)
+        
+        return counts
     
     def count_message_tokens(self, messages: List[Dict[str, Any]]) -> Dict[str, int]:
         """
@@ -39,9 +123,7 @@ class TokenCounter:
         Returns:
             Dictionary with prompt_tokens, likely_completion_tokens, and total
         """
-        prompt_tokens = 0
-        likely_completion_tokens = 0
-        
+        contents = []
         for message in messages:
             content = message.get("content", "")
             if isinstance(content, list):  # Handle content parts for multimodal
@@ -50,10 +132,15 @@ class TokenCounter:
                     if part.get("type") == "text":
                         text_content += part.get("text", "")
                 content = text_content
-                
-            # Count tokens in the message
-            token_count = self.count_tokens(content)
-            
+            contents.append(content)
+        
+        # Count all messages at once so unchanged history is served from the cache
+        token_counts = self.count_tokens_batch(contents)
+        
+        prompt_tokens = 0
+        likely_completion_tokens = 0
+        
+        for message, token_count in zip(messages, token_counts):
             # Add to appropriate counter
             if message.get("role") == "assistant":
                 likely_completion_tokens += token_count
@@ -66,17 +153,42 @@ class TokenCounter:
             "total": prompt_tokens + likely_completion_tokens
         }
     
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """
+        Get token count cache statistics.
+        
+        Returns:
+            Dictionary with hits, misses, hit rate and current cache size
+        """
+        with self._lock:
+            lookups = self._cache_hits + self._cache_misses
+            return {
+                "hits": self._cache_hits,
+                "misses": self._cache_misses,
+                "hit_rate": self._cache_hits / lookups if lookups else 0.0,
+                "size": len(self._count_cache)
+            }
+    
+    @staticmethod
+    def _cache_key(text: str) -> bytes:
+        """Hash text into a compact cache key."""
+        return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    
     def estimate_cost(self, 
                       prompt_tokens: int, 
                       completion_tokens: int, 
-                      model: str = "claude-3-opus-20240229") -> float:
+                      model: str = "claude-3-opus-20240229",
+                      cache_creation_tokens: int = 0,
+                      cache_read_tokens: int = 0) -> float:
         """
         Estimate the cost of an API call based on token counts.
         
         Args:
-            prompt_tokens: Number of tokens in the prompt
+            prompt_tokens: Number of uncached tokens in the prompt
             completion_tokens: Number of tokens in the completion
             model: Model name
+            cache_creation_tokens: Prompt tokens written to the prompt cache
+            cache_read_tokens: Prompt tokens served from the prompt cache
             
         Returns:
             Estimated cost in USD
@@ -97,4 +209,67 @@ class TokenCounter:
         input_cost = (prompt_tokens / 1_000_000) * model_prices["input"]
         output_cost = (completion_tokens / 1_000_000) * model_prices["output"]
         
-        return input_cost + output_cost
\ No newline at end of file
+        # Cache writes are billed at 1.25x the input price, cache reads at 0.1x
+        cache_cost = (
+            (cache_creation_tokens / 1_000_000) * model_prices["input"] * 1.25
+            + (cache_read_tokens / 1_000_000) * model_prices["input"] * 0.1
+        )
+        
+        return input_cost + output_cost + cache_cost
+    
+    @staticmethod
+    def usage_from_response(response: Any) -> Dict[str, int]:
+        """
+        Extract exact token usage from a Claude API response.
+        
+        Args:
+            response: Claude API response (Message) or None
+            
+        Returns:
+            Dictionary with input_tokens, output_tokens, cache_creation_input_tokens
+            and cache_read_input_tokens (0 where not reported)
+        """
+        usage = getattr(response, "usage", None)
+        return {
+            field: getattr(usage, field, 0) or 0
+            for field in (
+                "input_tokens",
+                "output_tokens",
+                "cache_creation_input_tokens",
+                "cache_read_input_tokens"
+            )
+        }
+
+
+class EstimatedTokenCounter:
+    """
+    Tokenizer-free token estimate of ~4 characters per token.
+    
+    Used where no TokenCounter is supplied, so packing context never needs
+    to load (or download) the tiktoken encoding, and by TokenCounter when
+    the encoding cannot be loaded.
+    """
+    
+    def count_tokens(self, text: str) -> int:
+        """
+        Estimate the number of tokens in a text string.
+        
+        Args:
+            text: Text to estimate token count for
+            
+        Returns:
+            Estimated token count, rounded up
+        """
+        return (len(text) + 3) // 4
+    
+    def count_tokens_batch(self, texts: List[str]) -> List[int]:
+        """
+        Estimate token counts for many texts.
+        
+        Args:
+            texts: Texts to estimate token counts for
+            
+        Returns:
+            Estimated token counts in the same order as texts
+        """
+        return [self.count_tokens(text) for text in texts]
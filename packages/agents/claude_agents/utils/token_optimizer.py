@@ -1,10 +1,118 @@
 import json
 import logging
 import re
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .prompt_rewriter import PromptRewriter, RewriteRule
+from .response_filter import DEFAULT_RESPONSE_FILTERS, StreamingResponseFilter
 
 logger = logging.getLogger(__name__)
 
+# Common phrases and their shorter equivalents (medium and high compression)
+COMMON_PHRASE_ABBREVIATIONS = {
+    "for example": "e.g.",
+    "that is to say": "i.e.",
+    "in other words": "i.e.",
+    "please note that": "note:",
+    "it is important to": "importantly,",
+    "it is recommended to": "recommend:",
+    "in order to": "to",
+    "as well as": "&",
+    "with respect to": "re:",
+    "with regard to": "re:"
+}
+
+# Redundant prefixes removed from bullet points (high compression)
+REDUNDANT_BULLET_PREFIXES = [
+    "Please ensure that you",
+    "Make sure to",
+    "You should",
+    "It is necessary to"
+]
+
+# Verbose instruction patterns and their replacements (high compression)
+INSTRUCTION_PATTERNS = [
+    ("I would like you to", ""),
+    ("Your task is to", ""),
+    ("I need you to", ""),
+    ("Please provide", "Provide"),
+    ("Please generate", "Generate"),
+    ("Please create", "Create"),
+    ("Please implement", "Implement"),
+    ("Please write", "Write"),
+]
+
+# Runs of spaces and of three or more newlines
+_MULTIPLE_SPACES_PATTERN = re.compile(r" {2,}")
+_MULTIPLE_NEWLINES_PATTERN = re.compile(r"\n{3,}")
+
+def _abbreviation_rules() -> List[RewriteRule]:
+    """Rewrite rules for COMMON_PHRASE_ABBREVIATIONS."""
+    # Phrases abbreviated after "in order to" also match once it has become "to"
+    # (e.g. "with respect in order to" -> "with respect to" -> "re:")
+    phrases = list(COMMON_PHRASE_ABBREVIATIONS)
+    later_phrases = phrases[phrases.index("in order to") + 1:]
+    rules = [
+        RewriteRule(r"\b" + re.escape(phrase[:-2]) + r"in order to\b", COMMON_PHRASE_ABBREVIATIONS[phrase])
+        for phrase in later_phrases
+        if phrase.endswith(" to")
+    ]
+
+    # "that is to say" is abbreviated before "please note that" can claim "that"
+    rules.append(
+        RewriteRule(r"\bplease note that is to say\b", lambda text: text[:-len("that is to say")] + "i.e.")
+    )
+
+    return rules + [
+        RewriteRule(r"\b" + re.escape(phrase) + r"\b", replacement)
+        for phrase, replacement in COMMON_PHRASE_ABBREVIATIONS.items()
+    ]
+
+def _condense_rules(after_abbreviation: bool = False) -> List[RewriteRule]:
+    """
+    Rewrite rules for REDUNDANT_BULLET_PREFIXES and INSTRUCTION_PATTERNS.
+
+    Args:
+        after_abbreviation: Whether the rules are combined with the abbreviation
+            rules, in which case prefixes and patterns ending in "to" also match
+            "in order to" (which abbreviation would have turned into "to")
+    """
+    def with_in_order_to(phrase: str) -> str:
+        if after_abbreviation and phrase.endswith(" to"):
+            return re.escape(phrase[:-2]) + r"(?:to|in order to\b)"
+        return re.escape(phrase)
+
+    prefix_patterns = [
+        (prefix, re.compile(re.escape(prefix) + " ", re.IGNORECASE))
+        for prefix in REDUNDANT_BULLET_PREFIXES
+    ]
+
+    def remove_prefixes(text: str, removed_on_line: set) -> str:
+        # Remove the prefixes in list order, each at most once per line; removing
+        # one can expose another (e.g. "- You should Make sure to ...")
+        body = text[2:]
+        if after_abbreviation:
+            body = re.sub("in order to", "to", body, flags=re.IGNORECASE)
+        for prefix, pattern in prefix_patterns:
+            match = pattern.match(body)
+            if match and prefix not in removed_on_line:
+                body = body[match.end():]
+                removed_on_line.add(prefix)
+        return "- " + body
+
+    # A bullet followed by a run of redundant prefixes
+    prefix_chain = "- (?:(?:" + "|".join(with_in_order_to(prefix) for prefix in REDUNDANT_BULLET_PREFIXES) + ") )+"
+
+    return [RewriteRule(prefix_chain, remove_prefixes, line_scoped=True)] + [
+        RewriteRule(with_in_order_to(pattern), replacement)
+        for pattern, replacement in INSTRUCTION_PATTERNS
+    ]
+
+# Precompiled single-pass rewriters for each compression stage
+_ABBREVIATION_REWRITER = PromptRewriter(_abbreviation_rules())
+_CONDENSE_REWRITER = PromptRewriter(_condense_rules())
+_HIGH_COMPRESSION_REWRITER = PromptRewriter(_abbreviation_rules() + _condense_rules(after_abbreviation=True))
+
 class TokenOptimizer:
     """
     Utilities for optimizing token usage in Claude API calls.
@@ -12,19 +120,32 @@ class TokenOptimizer:
     """
 
     @staticmethod
-    def compress_prompt(prompt: str, compression_level: str = "medium") -> str:
+    def compress_prompt(
+        prompt: Union[str, List[Dict[str, Any]]],
+        compression_level: str = "medium"
+    ) -> Union[str, List[Dict[str, Any]]]:
         """
         Compress a prompt to reduce token usage.
         
         Args:
-            prompt: The prompt text to compress
+            prompt: The prompt text to compress, or a list of content blocks
+                whose text blocks are compressed (other keys, such as
+                cache_control, are kept)
             compression_level: Compression aggressiveness (low, medium, high)
             
         Returns:
-            Compressed prompt
+            Compressed prompt, in the same form as given
         """
         if not prompt:
             return prompt
+        
+        if isinstance(prompt, list):
+            return [
+                {**block, "text": TokenOptimizer.compress_prompt(block["text"], compression_level)}
+                if isinstance(block, dict) and block.get("type") == "text" and isinstance(block.get("text"), str)
+                else block
+                for block in prompt
+            ]
             
         # Apply compression based on level
         if compression_level == "low":
@@ -35,10 +156,10 @@ class TokenOptimizer:
             compressed = TokenOptimizer._remove_extra_whitespace(prompt)
             compressed = TokenOptimizer._abbreviate_common_phrases(compressed)
         elif compression_level == "high":
-            # Aggressive compression including structural changes
+            # Aggressive compression including structural changes: abbreviation
+            # and condensing run as one pass over the prompt
             compressed = TokenOptimizer._remove_extra_whitespace(prompt)
-            compressed = TokenOptimizer._abbreviate_common_phrases(compressed)
-            compressed = TokenOptimizer._condense_instructions(compressed)
+            compressed = _HIGH_COMPRESSION_REWRITER.rewrite(compressed)
         else:
             compressed = prompt
             
@@ -96,7 +217,7 @@ class TokenOptimizer:
             
         # Default filters if none provided
         if not filters:
-            filters = ["thinking", "explanation", "reasoning"]
+            filters = DEFAULT_RESPONSE_FILTERS
         
         # Find and remove thinking/explanation sections
         for filter_term in filters:
@@ -116,6 +237,29 @@ class TokenOptimizer:
         
         return response.strip()
     
+    @staticmethod
+    def filter_response_stream(chunks: Iterable[str], filters: List[str] = None) -> Iterator[str]:
+        """
+        Filter unnecessary content from a streamed response as it arrives.
+        
+        Args:
+            chunks: Response text chunks (e.g., text deltas from a message stream)
+            filters: Optional list of sections to filter (e.g., ["explanation", "thinking"])
+            
+        Yields:
+            Filtered text chunks
+        """
+        response_filter = StreamingResponseFilter(filters)
+        
+        for chunk in chunks:
+            filtered = response_filter.feed(chunk)
+            if filtered:
+                yield filtered
+        
+        filtered = response_filter.flush()
+        if filtered:
+            yield filtered
+    
     @staticmethod
     def optimize_api_parameters(params: Dict[str, Any], budget_tier: str = "standard") -> Dict[str, Any]:
         """
@@ -179,7 +323,52 @@ class TokenOptimizer:
                 )
         
         return optimized
-    
+
+    @staticmethod
+    def apply_prompt_caching(params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Mark the stable prefix of a request as cacheable with Anthropic prompt caching.
+
+        The system prompt, the tool definitions and all conversation history before the
+        newest turn are marked with ephemeral cache breakpoints, so repeated agent calls
+        only pay full prefill for the part of the prompt that actually changed.
+
+        Args:
+            params: Claude API parameters
+
+        Returns:
+            Parameters with cache_control breakpoints added (the input is not modified)
+        """
+        cached = params.copy()
+        cache_control = {"type": "ephemeral"}
+
+        # System prompt: convert to content blocks and mark the last one,
+        # unless the caller already placed its own breakpoints
+        system = cached.get("system")
+        if isinstance(system, str) and system:
+            cached["system"] = [{"type": "text", "text": system, "cache_control": cache_control}]
+        elif isinstance(system, list) and system:
+            if not any(isinstance(block, dict) and "cache_control" in block for block in system):
+                cached["system"] = system[:-1] + [{**system[-1], "cache_control": cache_control}]
+
+        # Tool definitions: a breakpoint on the last tool caches the whole list
+        tools = cached.get("tools")
+        if tools:
+            cached["tools"] = tools[:-1] + [{**tools[-1], "cache_control": cache_control}]
+
+        # History: everything before the newest message is stable between calls
+        messages = cached.get("messages") or []
+        if len(messages) > 1:
+            previous = messages[-2]
+            content = previous.get("content", "")
+            if isinstance(content, str) and content:
+                content = [{"type": "text", "text": content, "cache_control": cache_control}]
+            elif isinstance(content, list) and content:
+                content = content[:-1] + [{**content[-1], "cache_control": cache_control}]
+            cached["messages"] = list(messages[:-2]) + [{**previous, "content": content}, messages[-1]]
+
+        return cached
+
     @staticmethod
     def estimate_monthly_cost(
         avg_prompt_tokens: int,
@@ -335,10 +524,10 @@ class TokenOptimizer:
     def _remove_extra_whitespace(text: str) -> str:
         """Remove unnecessary whitespace from text."""
         # Replace multiple spaces with a single space
-        text = re.sub(r' {2,}', ' ', text)
+        text = _MULTIPLE_SPACES_PATTERN.sub(' ', text)
         
         # Replace multiple newlines with at most two
-        text = re.sub(r'\n{3,}', '\n\n', text)
+        text = _MULTIPLE_NEWLINES_PATTERN.sub('\n\n', text)
         
         # Trim leading/trailing whitespace from lines
         lines = text.split('\n')
@@ -350,55 +539,12 @@ class TokenOptimizer:
     @staticmethod
     def _abbreviate_common_phrases(text: str) -> str:
         """Replace common phrases with shorter equivalents."""
-        replacements = {
-            "for example": "e.g.",
-            "that is to say": "i.e.",
-            "in other words": "i.e.",
-            "please note that": "note:",
-            "it is important to": "importantly,",
-            "it is recommended to": "recommend:",
-            "in order to": "to",
-            "as well as": "&",
-            "with respect to": "re:",
-            "with regard to": "re:"
-        }
-        
-        for phrase, replacement in replacements.items():
-            text = re.sub(r'\b' + re.escape(phrase) + r'\b', replacement, text, flags=re.IGNORECASE)
-            
-        return text
+        return _ABBREVIATION_REWRITER.rewrite(text)
     
     @staticmethod
     def _condense_instructions(text: str) -> str:
         """Condense verbose instructions into more compact form."""
-        # Convert bullet lists with redundant prefixes
-        redundant_prefixes = [
-            r"Please ensure that you", 
-            r"Make sure to",
-            r"You should",
-            r"It is necessary to"
-        ]
-        
-        for prefix in redundant_prefixes:
-            pattern = rf"- {prefix} (.*?)(?=\n|$)"
-            text = re.sub(pattern, r"- \1", text, flags=re.IGNORECASE)
-        
-        # Convert redundant instruction patterns
-        patterns = [
-            (r"I would like you to", ""),
-            (r"Your task is to", ""),
-            (r"I need you to", ""),
-            (r"Please provide", "Provide"),
-            (r"Please generate", "Generate"),
-            (r"Please create", "Create"),
-            (r"Please implement", "Implement"),
-            (r"Please write", "Write"),
-        ]
-        
-        for pattern, replacement in patterns:
-            text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
-            
-        return text
+        return _CONDENSE_REWRITER.rewrite(text)
     
     @staticmethod
     def _generate_optimization_suggestions(
@@ -0,0 +1,73 @@
+"""
+Benchmark the overhead of TaskPatternLibrary.apply_pattern with and without prompt caching.
+
+For every task pattern, applies it for the planner, executor and critic agents
+(as the orchestration pipeline does for one task) and reports the time per
+apply_pattern call when every prompt is regenerated versus when the patterns'
+prompt caches are warm. Also checks that both produce identical prompts and
+reports the size of the stable, cacheable system prompt prefix.
+
+Usage:
+    python scripts/benchmark_apply_pattern.py [--repeat 2000]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from packages.agents.claude_agents.patterns.reasoning_patterns import AGENT_RESPONSIBILITIES  # noqa: E402
+from packages.agents.claude_agents.patterns.task_patterns import TASK_PRESETS, TaskPatternLibrary  # noqa: E402
+
+AGENT_TYPES = ["planner", "executor", "critic"]
+
+TASK = "Build a service that aggregates order events and reports weekly revenue per region"
+
+def clear_prompt_caches(library):
+    """Empty every prompt cache, so the next apply_pattern regenerates all prompts."""
+    for pattern in library.patterns.values():
+        pattern.prompt_cache.clear()
+        for reasoning_pattern in pattern.reasoning_library.patterns.values():
+            reasoning_pattern.prompt_cache.clear()
+
+def apply_for_agents(library, preset):
+    params = {key: value for key, value in preset.items() if key != "task_pattern"}
+    return [library.apply_pattern(preset["task_pattern"], TASK, agent_type=agent_type, **params) for agent_type in AGENT_TYPES]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000, help="Tasks per preset to time")
+    args = parser.parse_args()
+
+    library = TaskPatternLibrary()
+    calls = args.repeat * len(AGENT_TYPES)
+    print(f"{'preset':<28} {'prefix chars':>12} {'uncached us':>12} {'cached us':>10} {'speedup':>8}")
+
+    for name, preset in TASK_PRESETS.items():
+        clear_prompt_caches(library)
+        uncached_result = apply_for_agents(library, preset)
+        cached_result = apply_for_agents(library, preset)
+        assert uncached_result == cached_result
+
+        # Same prompts as the pattern generates directly
+        pattern = library.get_pattern(preset["task_pattern"])
+        params = {key: value for key, value in preset.items() if key != "task_pattern"}
+        assert cached_result[0]["system_prompt"] == pattern.generate_system_prompt(**params) + AGENT_RESPONSIBILITIES["planner"]
+
+        def uncached():
+            clear_prompt_caches(library)
+            apply_for_agents(library, preset)
+
+        uncached_seconds = timeit.timeit(uncached, number=args.repeat)
+        cached_seconds = timeit.timeit(lambda: apply_for_agents(library, preset), number=args.repeat)
+
+        print(
+            f"{name:<28} {len(cached_result[0]['stable_prefix']):>12,} "
+            f"{uncached_seconds / calls * 1e6:>12.1f} {cached_seconds / calls * 1e6:>10.1f} "
+            f"{uncached_seconds / cached_seconds:>7.1f}x"
+        )
+
+if __name__ == "__main__":
+    main()
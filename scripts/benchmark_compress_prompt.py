@@ -0,0 +1,121 @@
+"""
+Benchmark TokenOptimizer.compress_prompt against the previous multi-pass implementation.
+
+Builds a large code-review style prompt (roughly 50k tokens by default), checks
+that both implementations produce identical output and reports the time per call.
+
+Usage:
+    python scripts/benchmark_compress_prompt.py [--tokens 50000] [--repeat 20]
+"""
+
+import argparse
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from packages.agents.claude_agents.utils.token_optimizer import TokenOptimizer  # noqa: E402
+
+# Previous implementation: one re.sub pass per phrase and pattern
+
+def legacy_remove_extra_whitespace(text):
+    text = re.sub(r" {2,}", " ", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    lines = [line.strip() for line in text.split("\n")]
+    return "\n".join(lines).strip()
+
+def legacy_abbreviate_common_phrases(text):
+    replacements = {
+        "for example": "e.g.",
+        "that is to say": "i.e.",
+        "in other words": "i.e.",
+        "please note that": "note:",
+        "it is important to": "importantly,",
+        "it is recommended to": "recommend:",
+        "in order to": "to",
+        "as well as": "&",
+        "with respect to": "re:",
+        "with regard to": "re:"
+    }
+    for phrase, replacement in replacements.items():
+        text = re.sub(r"\b" + re.escape(phrase) + r"\b", replacement, text, flags=re.IGNORECASE)
+    return text
+
+def legacy_condense_instructions(text):
+    for prefix in ["Please ensure that you", "Make sure to", "You should", "It is necessary to"]:
+        text = re.sub(rf"- {prefix} (.*?)(?=\n|$)", r"- \1", text, flags=re.IGNORECASE)
+    patterns = [
+        ("I would like you to", ""),
+        ("Your task is to", ""),
+        ("I need you to", ""),
+        ("Please provide", "Provide"),
+        ("Please generate", "Generate"),
+        ("Please create", "Create"),
+        ("Please implement", "Implement"),
+        ("Please write", "Write"),
+    ]
+    for pattern, replacement in patterns:
+        text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
+    return text
+
+def legacy_compress_prompt(prompt, compression_level="medium"):
+    compressed = legacy_remove_extra_whitespace(prompt)
+    if compression_level in ("medium", "high"):
+        compressed = legacy_abbreviate_common_phrases(compressed)
+    if compression_level == "high":
+        compressed = legacy_condense_instructions(compressed)
+    return compressed
+
+# Benchmark prompt
+
+INSTRUCTIONS = """I would like you to review the following module.
+- Please ensure that you check error handling as well as input validation.
+- Make sure to flag functions that are too long, for example over 50 lines.
+- You should note performance issues with respect to database access.
+Please note that it is important to keep suggestions actionable in order to help the team.
+
+"""
+
+CODE = '''
+def process_records(records, batch_size=100):
+    """Process records in batches, that is to say in fixed size chunks."""
+    results = []
+    for start in range(0, len(records), batch_size):
+        batch = records[start:start + batch_size]
+        # Validate every record in order to skip malformed input
+        valid = [record for record in batch if record.get("id") is not None]
+        results.extend(transform(record) for record in valid)
+    return results
+
+'''
+
+def build_prompt(target_tokens):
+    """Build a prompt of roughly target_tokens tokens (~4 characters per token)."""
+    chunk = INSTRUCTIONS + CODE * 5
+    repeats = max(1, target_tokens * 4 // len(chunk))
+    return chunk * repeats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=50000, help="Approximate prompt size in tokens")
+    parser.add_argument("--repeat", type=int, default=20, help="Calls per measurement")
+    args = parser.parse_args()
+
+    prompt = build_prompt(args.tokens)
+    print(f"Prompt: {len(prompt):,} characters (~{len(prompt) // 4:,} tokens)\n")
+    print(f"{'level':<8} {'legacy ms':>10} {'current ms':>11} {'speedup':>8}")
+
+    for level in ("low", "medium", "high"):
+        assert legacy_compress_prompt(prompt, level) == TokenOptimizer.compress_prompt(prompt, level), level
+
+        legacy = min(timeit.repeat(lambda: legacy_compress_prompt(prompt, level), number=args.repeat, repeat=3))
+        current = min(timeit.repeat(lambda: TokenOptimizer.compress_prompt(prompt, level), number=args.repeat, repeat=3))
+
+        legacy_ms = legacy / args.repeat * 1000
+        current_ms = current / args.repeat * 1000
+        print(f"{level:<8} {legacy_ms:>10.2f} {current_ms:>11.2f} {legacy_ms / current_ms:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark prompt tokens per plan step with shared history vs isolated step contexts.
+
+Runs chain-shaped plans of increasing length against an offline stand-in for
+the API client and reports the prompt tokens sent for each step. With a shared
+history every call carries all earlier prompts and completions, so tokens per
+step grow with the plan; isolated step contexts stay flat.
+
+Usage:
+    python scripts/benchmark_step_context.py [--lengths 5 10 20 40] [--completion-words 200]
+"""
+
+import argparse
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from packages.agents.claude_agents.agents.executor import ExecutorAgent  # noqa: E402
+from packages.agents.claude_agents.utils.token_counter import TokenCounter  # noqa: E402
+
+class OfflineClient:
+    """Stand-in API client that counts prompt tokens and returns fixed-size completions."""
+
+    def __init__(self, token_counter, completion_words):
+        self.token_counter = token_counter
+        self.completion = " ".join(["result"] * completion_words)
+        self.prompt_tokens = []
+
+    def send_message(self, messages, system=None, **kwargs):
+        tokens = self.token_counter.count_message_tokens(messages)["total"]
+        if system:
+            tokens += self.token_counter.count_tokens(system)
+        self.prompt_tokens.append(tokens)
+        return SimpleNamespace(content=[SimpleNamespace(text=self.completion)])
+
+def chain_plan(length):
+    """Plan where every step depends on the previous one."""
+    return [
+        {
+            "id": f"step_{i}",
+            "description": f"Carry out step {i} of the analysis",
+            "expected_outcome": f"Findings for step {i}",
+            "dependencies": [f"step_{i - 1}"] if i else [],
+        }
+        for i in range(length)
+    ]
+
+def run_shared_history(steps, client):
+    """Previous behaviour: every step goes through one growing history with all previous results."""
+    executor = ExecutorAgent(client, context_token_budget=None)
+    previous_results = {}
+    for step in steps:
+        task = {
+            "id": step["id"],
+            "description": step["description"],
+            "context": {
+                "plan_objective": "benchmark",
+                "expected_outcome": step["expected_outcome"],
+                "previous_results": previous_results,
+            },
+        }
+        previous_results[step["id"]] = executor.process(task)
+
+def run_isolated(steps, client):
+    """Current behaviour: each step gets its own context with only its dependency results."""
+    executor = ExecutorAgent(client)
+    previous_results = {}
+    for step in steps:
+        previous_results[step["id"]] = executor.process_step(
+            step, {"objective": "benchmark", "previous_results": previous_results}
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lengths", type=int, nargs="+", default=[5, 10, 20, 40], help="Plan lengths to run")
+    parser.add_argument("--completion-words", type=int, default=200, help="Words per simulated completion")
+    args = parser.parse_args()
+
+    token_counter = TokenCounter()
+    print(f"{'steps':>6} {'shared mean':>12} {'shared last':>12} {'isolated mean':>14} {'isolated last':>14}")
+
+    for length in args.lengths:
+        steps = chain_plan(length)
+        shared = OfflineClient(token_counter, args.completion_words)
+        isolated = OfflineClient(token_counter, args.completion_words)
+        run_shared_history(steps, shared)
+        run_isolated(steps, isolated)
+
+        print(
+            f"{length:>6} "
+            f"{sum(shared.prompt_tokens) / length:>12,.0f} {shared.prompt_tokens[-1]:>12,} "
+            f"{sum(isolated.prompt_tokens) / length:>14,.0f} {isolated.prompt_tokens[-1]:>14,}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Tests for the asyncio multi-task orchestration pipeline."""
+
+import asyncio
+import json
+
+import pytest
+
+from packages.agents.claude_agents.api.async_client import AsyncClaudeAPIClient, FairConcurrencyBudget
+from packages.agents.claude_agents.api.rate_limiter import RateLimiter
+from packages.agents.claude_agents.api.stub_server import StubAnthropicServer
+from packages.agents.claude_agents.orchestration.async_pipeline import AsyncOrchestrationPipeline
+
+
+def test_budget_caps_in_flight_calls_and_alternates_between_tasks():
+    budget = FairConcurrencyBudget(max_in_flight=2)
+    order = []
+
+    async def call(key, index):
+        async with budget.slot(key):
+            order.append(f"{key}{index}")
+            await asyncio.sleep(0.01)
+
+    async def main():
+        # Task "a" queues many calls before task "b" queues any
+        calls = [call("a", i) for i in range(6)] + [call("b", i) for i in range(2)]
+        await asyncio.gather(*calls)
+
+    asyncio.run(main())
+
+    assert budget.get_stats()["peak_in_flight"] == 2
+    assert budget.get_stats()["in_flight"] == 0
+    assert budget.get_stats()["acquired"] == {"a": 6, "b": 2}
+    # Once both tasks are waiting, freed slots alternate between them
+    assert order.index("b1") < order.index("a4")
+
+
+def plan_json(task):
+    steps = [
+        {"id": "fetch", "description": f"Fetch data for {task}", "dependencies": []},
+        {"id": "notes", "description": f"Take notes for {task}", "dependencies": []},
+        {"id": "report", "description": f"Report on {task}", "dependencies": ["fetch", "notes"]},
+    ]
+    return json.dumps({"objective": task, "steps": steps})
+
+
+def responder(params):
+    tools = json.dumps(params.get("tools", []))
+    prompt = json.dumps(params["messages"])
+    if "create_plan" in tools:
+        task = "alpha" if "alpha" in prompt else "beta"
+        return f"```json\n{plan_json(task)}\n```"
+    if "evaluate_output" in tools:
+        return '```json\n{"quality_score": 9, "meets_requirements": true}\n```'
+    return "done"
+
+
+def test_tasks_run_concurrently_with_separate_state():
+    with StubAnthropicServer(responder=responder, response_delay=0.05) as server:
+        client = AsyncClaudeAPIClient(
+            api_key="test",
+            base_url=server.base_url,
+            rate_limiter=RateLimiter(),
+            max_in_flight=3,
+        )
+        pipeline = AsyncOrchestrationPipeline(client)
+
+        results = asyncio.run(pipeline.run_tasks([
+            {"id": "task-alpha", "description": "Analyze alpha"},
+            {"id": "task-beta", "description": "Analyze beta"},
+        ]))
+
+        requests = list(server.requests)
+
+    assert [result["status"] for result in results] == ["completed", "completed"]
+    assert results[0]["final_plan"]["objective"] == "alpha"
+    assert results[1]["final_plan"]["objective"] == "beta"
+    assert sorted(results[0]["final_results"]["step_results"]) == ["fetch", "notes", "report"]
+
+    # Plan, three steps, summary and critique for each task
+    assert len(requests) == 12
+    stats = client.budget.get_stats()
+    assert stats["acquired"] == {"task-alpha": 6, "task-beta": 6}
+    assert 1 < stats["peak_in_flight"] <= 3
+
+    assert pipeline.tasks["task-beta"].to_dict()["status"] == "completed"
+    assert pipeline.planner.history == []
+
+
+def test_finished_states_are_bounded_and_running_ids_cannot_be_reused():
+    with StubAnthropicServer(responder=responder) as server:
+        client = AsyncClaudeAPIClient(api_key="test", base_url=server.base_url, rate_limiter=RateLimiter())
+        pipeline = AsyncOrchestrationPipeline(client, max_finished_tasks=1)
+
+        async def main():
+            await pipeline.run_task("Analyze alpha", task_id="first")
+            await pipeline.run_task("Analyze beta", task_id="second")
+
+            running = asyncio.ensure_future(pipeline.run_task("Analyze alpha", task_id="third"))
+            await asyncio.sleep(0)
+            with pytest.raises(ValueError):
+                await pipeline.run_task("Analyze beta", task_id="third")
+            return list(pipeline.tasks), await running
+
+        kept, result = asyncio.run(main())
+
+    # "first" was dropped once "second" finished; "third" was running when reused
+    assert kept == ["second", "third"]
+    assert result["status"] == "completed"
+    assert list(pipeline.tasks) == ["third"]
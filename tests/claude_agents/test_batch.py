@@ -0,0 +1,96 @@
+"""Tests for OptimizedClaudeClient.send_batch against the local stub server."""
+
+import pytest
+
+from packages.agents.claude_agents.api.optimized_client import OptimizedClaudeClient
+from packages.agents.claude_agents.api.rate_limiter import RateLimiter
+from packages.agents.claude_agents.api.stub_server import StubAnthropicServer
+
+
+@pytest.fixture
+def server():
+    with StubAnthropicServer() as stub:
+        yield stub
+
+
+def make_client(server, **kwargs):
+    return OptimizedClaudeClient(
+        api_key="test-key",
+        base_url=server.base_url,
+        rate_limiter=RateLimiter(),
+        **kwargs
+    )
+
+
+def test_send_batch_maps_results_to_input_order(server):
+    client = make_client(server, enable_caching=False)
+    requests = [{"messages": [{"role": "user", "content": f"question {i}"}]} for i in range(4)]
+    requests[2]["custom_id"] = "third"
+
+    results = client.send_batch(requests, poll_interval=0.01)
+
+    assert [result["custom_id"] for result in results] == ["request-0", "request-1", "third", "request-3"]
+    assert [result["response"].content[0].text for result in results] == [
+        f"Echo: question {i}" for i in range(4)
+    ]
+    assert all(result["status"] == "succeeded" for result in results)
+    assert len(server.batches) == 1
+    assert client.get_usage_stats()["request_count"] == 4
+
+
+def test_send_batch_serves_cached_responses(server):
+    client = make_client(server)
+    messages = [{"role": "user", "content": "hello"}]
+    client.send_message(messages)
+
+    results = client.send_batch([{"messages": messages}], poll_interval=0.01)
+
+    assert results[0]["status"] == "cached"
+    assert results[0]["response"].content[0].text == "Echo: hello"
+    assert server.batches == {}
+
+
+def test_send_batch_splits_large_workloads(server):
+    client = make_client(server, enable_caching=False)
+    requests = [{"messages": [{"role": "user", "content": f"q{i}"}]} for i in range(5)]
+
+    results = client.send_batch(requests, poll_interval=0.01, max_batch_size=2)
+
+    assert len(server.batches) == 3
+    assert [result["response"].content[0].text for result in results] == [f"Echo: q{i}" for i in range(5)]
+
+
+def test_send_batch_rejects_duplicate_custom_ids(server):
+    client = make_client(server)
+    requests = [
+        {"custom_id": "same", "messages": [{"role": "user", "content": "a"}]},
+        {"custom_id": "same", "messages": [{"role": "user", "content": "b"}]},
+    ]
+
+    with pytest.raises(ValueError):
+        client.send_batch(requests)
+
+
+def test_send_batch_cancels_on_timeout(server):
+    server.batch_processing_time = 60
+    client = make_client(server, enable_caching=False)
+
+    with pytest.raises(TimeoutError):
+        client.send_batch([{"messages": [{"role": "user", "content": "slow"}]}], poll_interval=0.01, timeout=0.1)
+
+    assert all(batch["canceled"] for batch in server.batches.values())
+
+
+def test_default_custom_ids_do_not_collide_with_supplied_ones(server):
+    client = make_client(server, enable_caching=False)
+    requests = [{"messages": [{"role": "user", "content": f"question {i}"}]} for i in range(3)]
+    requests[0]["custom_id"] = "request-1"
+
+    results = client.send_batch(requests, poll_interval=0.01)
+
+    assert [result["custom_id"] for result in results] == ["request-1", "request-1-1", "request-2"]
+    assert [result["response"].content[0].text for result in results] == [f"Echo: question {i}" for i in range(3)]
+
+    requests[2]["custom_id"] = "request-1"
+    with pytest.raises(ValueError):
+        client.send_batch(requests, poll_interval=0.01)
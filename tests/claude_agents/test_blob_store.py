@@ -0,0 +1,84 @@
+"""Tests for spilling large pipeline outputs to the blob store."""
+
+import os
+from types import SimpleNamespace
+
+from packages.agents.claude_agents.agents.executor import ExecutorAgent
+from packages.agents.claude_agents.orchestration.blob_store import BlobStore, is_blob_ref
+from packages.agents.claude_agents.orchestration.pipeline import OrchestrationPipeline
+from packages.agents.claude_agents.utils.token_counter import EstimatedTokenCounter
+
+LARGE_OUTPUT = "def generated():\n    pass\n" * 2000
+
+
+def test_large_strings_are_stored_once_and_resolved(tmp_path):
+    store = BlobStore(str(tmp_path), min_size=1024)
+    data = {"completion": LARGE_OUTPUT, "outputs": [LARGE_OUTPUT, "small"], "tokens": 3}
+
+    spilled = store.externalize(data)
+
+    assert is_blob_ref(spilled["completion"])
+    assert spilled["completion"] == spilled["outputs"][0]
+    assert spilled["completion"]["size"] == len(LARGE_OUTPUT)
+    assert spilled["outputs"][1] == "small"
+    assert store.resolve(spilled) == data
+    assert sum(len(files) for _, _, files in os.walk(tmp_path)) == 1
+
+
+class PromptRecordingClient:
+    """Client returning a large output for the "generate" step and recording prompts."""
+
+    token_counter = EstimatedTokenCounter()
+
+    def __init__(self):
+        self.prompts = []
+
+    def send_message(self, messages, **kwargs):
+        prompt = messages[-1]["content"]
+        self.prompts.append(prompt)
+        text = LARGE_OUTPUT if "Generate the code" in prompt else "done"
+        return SimpleNamespace(content=[SimpleNamespace(text=text)])
+
+
+class StaticPlanner:
+    def process(self, task):
+        return {
+            "objective": task,
+            "steps": [
+                {"id": "generate", "description": "Generate the code", "dependencies": []},
+                {"id": "review", "description": "Review the code", "dependencies": ["generate"]},
+            ],
+        }
+
+
+class PassingCritic:
+    def __init__(self):
+        self.outputs = []
+
+    def process(self, output, requirements=None):
+        self.outputs.append(output)
+        return {"quality_score": 9, "meets_requirements": True}
+
+
+def test_pipeline_keeps_references_in_state_and_loads_them_for_prompts(tmp_path):
+    client = PromptRecordingClient()
+    critic = PassingCritic()
+    pipeline = OrchestrationPipeline(
+        api_client=client,
+        planner=StaticPlanner(),
+        executor=ExecutorAgent(client),
+        critic=critic,
+        blob_store=BlobStore(str(tmp_path), min_size=4096),
+    )
+
+    result = pipeline.execute("tool")
+    pipeline.close()
+
+    stored = pipeline.state["execution_results"]["iteration_1"]["step_results"]["generate"]
+    assert is_blob_ref(stored["completion"])
+    assert all(is_blob_ref(cached["completion"]) for cached in pipeline.step_cache.values() if cached["step_id"] == "generate")
+
+    review_prompt = next(prompt for prompt in client.prompts if "Review the code" in prompt)
+    assert "def generated()" in review_prompt
+    assert "def generated()" in str(critic.outputs[0])
+    assert result["final_results"]["step_results"]["generate"]["completion"] == LARGE_OUTPUT
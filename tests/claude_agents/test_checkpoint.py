@@ -0,0 +1,118 @@
+"""Tests for orchestration checkpoints and resuming interrupted tasks."""
+
+import pytest
+
+from packages.agents.claude_agents.orchestration.checkpoint import CheckpointStore
+from packages.agents.claude_agents.orchestration.pipeline import OrchestrationPipeline
+
+
+class Crash(BaseException):
+    """Stands in for the process dying mid-task."""
+
+
+class CountingPlanner:
+    def __init__(self):
+        self.calls = 0
+
+    def process(self, task):
+        self.calls += 1
+        return {
+            "objective": task,
+            "steps": [
+                {"id": "fetch", "description": "Fetch", "dependencies": []},
+                {"id": "analyze", "description": "Analyze", "dependencies": ["fetch"]},
+                {"id": "report", "description": "Report", "dependencies": ["analyze"]},
+            ],
+        }
+
+
+class CrashingExecutor:
+    def __init__(self, crash_on=None):
+        self.crash_on = crash_on
+        self.executed = []
+
+    def process_step(self, step, context):
+        if step["id"] == self.crash_on:
+            raise Crash()
+        self.executed.append(step["id"])
+        return {"completion": f"{step['id']} done", "inputs": sorted(context["previous_results"])}
+
+    def process(self, task):
+        self.executed.append("summary")
+        return {"completion": "summary"}
+
+
+class PassingCritic:
+    def process(self, output, requirements=None):
+        return {"quality_score": 9, "meets_requirements": True}
+
+
+def make_pipeline(store, planner, executor):
+    return OrchestrationPipeline(
+        api_client=object(),
+        planner=planner,
+        executor=executor,
+        critic=PassingCritic(),
+        checkpoint_store=store,
+    )
+
+
+def test_resume_skips_completed_steps(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    planner = CountingPlanner()
+
+    pipeline = make_pipeline(store, planner, CrashingExecutor(crash_on="report"))
+    with pytest.raises(Crash):
+        pipeline.execute("write a report")
+    pipeline.close()
+    task_id = pipeline.state["task"]["id"]
+
+    # A fresh process picks the task up where it stopped
+    executor = CrashingExecutor()
+    resumed = make_pipeline(store, planner, executor)
+    result = resumed.resume(task_id)
+    resumed.close()
+
+    assert result["task_id"] == task_id
+    assert result["status"] == "completed"
+    assert planner.calls == 1
+    assert executor.executed == ["report", "summary"]
+    assert result["final_results"]["step_results"]["report"]["inputs"] == ["analyze", "fetch"]
+    assert sorted(result["final_results"]["cached_steps"]) == ["analyze", "fetch"]
+
+    # Finished tasks are returned without running anything
+    again = make_pipeline(store, planner, CrashingExecutor(crash_on="fetch"))
+    assert again.resume(task_id)["final_results"]["summary"] == "summary"
+
+
+def test_checkpoints_are_appended_and_tolerate_torn_writes(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    store.append("task-1", "task", task={"id": "task-1", "description": "x", "context": {}})
+    store.append("task-1", "step", iteration=1, step_id="a", key="k1", result={"completion": "a"})
+    size = (tmp_path / "task-1.jsonl").stat().st_size
+
+    store.append("task-1", "step", iteration=1, step_id="b", key="k2", result={"completion": "b"})
+    assert (tmp_path / "task-1.jsonl").read_text().count("\n") == 3
+
+    # Cut the last line short, as if the process died while writing it
+    with open(tmp_path / "task-1.jsonl", "r+") as f:
+        f.truncate(size + 10)
+
+    state = store.load("task-1")
+    assert state["step_results"] == {"k1": {"completion": "a"}}
+    assert store.list_tasks() == ["task-1"]
+    assert store.load("missing") is None
+
+    with pytest.raises(ValueError):
+        OrchestrationPipeline(api_client=object(), planner=object(), executor=object(), critic=object()).resume("task-1")
+
+
+def test_events_appended_after_a_torn_line_are_kept(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    store.append("task-1", "step", iteration=1, step_id="a", key="k1", result={"completion": "a"})
+    with open(tmp_path / "task-1.jsonl", "a") as f:
+        f.write('{"type": "step", "iteration": 1, "step_id": "b", "ke')
+
+    store.append("task-1", "step", iteration=1, step_id="c", key="k3", result={"completion": "c"})
+
+    assert store.load("task-1")["step_results"] == {"k1": {"completion": "a"}, "k3": {"completion": "c"}}
@@ -0,0 +1,87 @@
+"""Tests for the token-budgeted context packer."""
+
+import json
+from types import SimpleNamespace
+
+from packages.agents.claude_agents.agents.executor import ExecutorAgent
+from packages.agents.claude_agents.utils.context_packer import (
+    TRUNCATION_MARKER,
+    ContextItem,
+    ContextPacker,
+)
+
+
+class CharTokenCounter:
+    """Counts one token per four characters."""
+
+    def count_tokens(self, text):
+        return (len(text) + 3) // 4
+
+
+class RecordingClient:
+    """Minimal API client that records the prompts it is sent."""
+
+    def __init__(self):
+        self.token_counter = CharTokenCounter()
+        self.messages = []
+
+    def send_message(self, messages, **kwargs):
+        self.messages.append(messages[-1]["content"])
+        return SimpleNamespace(content=[SimpleNamespace(text="done")])
+
+
+def test_everything_fits_in_compact_json():
+    packer = ContextPacker(CharTokenCounter(), budget=1000)
+    items = ContextPacker.items_from_dict({"a": {"x": [1, 2]}, "b": "text"})
+
+    assert packer.render(items) == '{"a":{"x":[1,2]},"b":"text"}'
+
+
+def test_prefers_high_score_density_and_keeps_order():
+    counter = CharTokenCounter()
+    packer = ContextPacker(counter, budget=60, min_item_tokens=1000)
+    items = [
+        ContextItem("low", "l" * 100, score=0.1),
+        ContextItem("high", "h" * 100, score=1.0),
+        ContextItem("small", "s" * 20, score=0.5),
+    ]
+
+    packed = packer.pack(items)
+
+    assert list(packed) == ["high", "small"]
+    assert counter.count_tokens(packer.render(items)) <= 60
+
+
+def test_truncates_best_remaining_item_into_leftover_budget():
+    counter = CharTokenCounter()
+    packer = ContextPacker(counter, budget=80, min_item_tokens=10)
+    items = [
+        ContextItem("keep", "k" * 100, score=1.0),
+        ContextItem("big", {"data": "d" * 1000}, score=0.9),
+        ContextItem("fixed", "f" * 1000, score=5.0, truncatable=False),
+    ]
+
+    packed = packer.pack(items)
+
+    assert packed["keep"] == "k" * 100
+    assert packed["big"].endswith(TRUNCATION_MARKER)
+    assert "fixed" not in packed
+    assert counter.count_tokens(packer.render(items)) <= 80
+
+
+def test_executor_step_context_holds_only_dependencies():
+    client = RecordingClient()
+    executor = ExecutorAgent(client, context_token_budget=200)
+    previous_results = {f"step_{i}": {"completion": str(i) * 400} for i in range(1, 6)}
+
+    executor.process_step(
+        {"id": "step_6", "description": "Combine", "dependencies": ["step_5"]},
+        {"objective": "Build it", "previous_results": previous_results},
+    )
+
+    prompt = client.messages[-1]
+    context = json.loads(prompt.split("CONTEXT:\n", 1)[1])
+    assert context["plan_objective"] == "Build it"
+    assert context["previous_results.step_5"] == previous_results["step_5"]
+    assert [key for key in context if key.startswith("previous_results.")] == ["previous_results.step_5"]
+    assert client.token_counter.count_tokens(prompt.split("CONTEXT:\n", 1)[1]) <= 200
@@ -0,0 +1,145 @@
+"""Tests for deadline-aware orchestration."""
+
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+from packages.agents.claude_agents.agents.critic import CriticAgent
+from packages.agents.claude_agents.agents.executor import ExecutorAgent
+from packages.agents.claude_agents.api.model_router import ModelRouter
+from packages.agents.claude_agents.orchestration.checkpoint import CheckpointStore
+from packages.agents.claude_agents.orchestration.pipeline import OrchestrationPipeline
+from packages.agents.claude_agents.utils.token_counter import EstimatedTokenCounter
+
+FAST = "claude-3-haiku-20240307"
+
+
+class SlowClient:
+    """Client taking `delay` seconds per call (`fast_delay` on the fast model); the first critique fails."""
+
+    token_counter = EstimatedTokenCounter()
+
+    def __init__(self, delay, fast_delay=None):
+        self.delay = delay
+        self.fast_delay = delay if fast_delay is None else fast_delay
+        self.evaluations = 0
+        self.models = []
+        self.lock = threading.Lock()
+
+    def send_message(self, messages, model=None, tools=None, **kwargs):
+        time.sleep(self.fast_delay if model == FAST else self.delay)
+        text = "done"
+        if tools and any(tool["function"]["name"] == "evaluate_output" for tool in tools):
+            with self.lock:
+                self.evaluations += 1
+                passed = self.evaluations > 1
+            text = "```json\n" + json.dumps({"quality_score": 9 if passed else 3, "meets_requirements": passed}) + "\n```"
+        with self.lock:
+            self.models.append(model)
+        usage = SimpleNamespace(input_tokens=50, output_tokens=5, cache_read_input_tokens=0, cache_creation_input_tokens=0)
+        return SimpleNamespace(content=[SimpleNamespace(text=text)], usage=usage, model=model)
+
+
+class CountingPlanner:
+    def __init__(self, steps):
+        self.steps = steps
+        self.refinements = 0
+
+    def process(self, task):
+        return {"objective": task, "steps": self.steps}
+
+    def refine_plan(self, plan, feedback):
+        self.refinements += 1
+        return {"objective": plan["objective"], "steps": [dict(step, description=step["description"] + " again") for step in self.steps]}
+
+
+def chain(*step_ids):
+    return [
+        {"id": step_id, "description": f"Write the {step_id}", "dependencies": list(step_ids[:index][-1:])}
+        for index, step_id in enumerate(step_ids)
+    ]
+
+
+def make_pipeline(client, planner, **kwargs):
+    return OrchestrationPipeline(
+        api_client=client,
+        planner=planner,
+        executor=ExecutorAgent(client),
+        critic=CriticAgent(client),
+        max_iterations=3,
+        **kwargs
+    )
+
+
+def test_stops_refining_and_keeps_best_result_when_next_iteration_cannot_fit():
+    client = SlowClient(delay=0.1)
+    planner = CountingPlanner(chain("outline", "draft"))
+    pipeline = make_pipeline(client, planner)
+
+    # One iteration (two steps, summary, critique) takes about 0.4s
+    result = pipeline.execute("report", deadline=0.6)
+    pipeline.close()
+
+    assert result["status"] == "deadline_reached"
+    assert planner.refinements == 0
+    assert result["result_iteration"] == 1
+    assert result["final_feedback"]["quality_score"] == 3
+    assert [degradation["action"] for degradation in result["degradations"]] == ["stop_refining"]
+    assert result["degradations"][0]["estimated_seconds"] > result["degradations"][0]["remaining_seconds"]
+
+
+def test_deadline_during_execution_stops_dispatching_steps():
+    client = SlowClient(delay=0.1)
+    pipeline = make_pipeline(client, CountingPlanner(chain("a", "b", "c", "d")), parallel_execution=False)
+
+    result = pipeline.execute("report", deadline=0.15)
+    pipeline.close()
+
+    assert result["status"] == "deadline_reached"
+    assert result["final_results"]["deadline_reached"] is True
+    assert sorted(result["final_results"]["step_results"]) == ["a", "b"]
+    assert result["final_feedback"] == {}
+    assert [degradation["action"] for degradation in result["degradations"]] == ["stop_execution", "skip_critique"]
+    # No summary or critique call was made
+    assert len(client.models) == 2
+
+
+def test_switches_to_fast_models_when_they_fit_the_deadline():
+    client = SlowClient(delay=0.1, fast_delay=0.005)
+    router = ModelRouter()
+    pipeline = make_pipeline(client, CountingPlanner(chain("analysis")), model_router=router)
+
+    # The first iteration (standard step, fast summary, large critique) takes about 0.2s
+    result = pipeline.execute("report", deadline=0.35)
+    pipeline.close()
+
+    assert result["status"] == "completed"
+    assert result["iterations"] == 2
+    assert [degradation["action"] for degradation in result["degradations"]] == ["fast_models"]
+    assert client.models[-3:] == [FAST, FAST, FAST]
+
+
+def test_resume_after_deadline_finishes_the_interrupted_iteration(tmp_path):
+    client = SlowClient(delay=0.05)
+    pipeline = make_pipeline(
+        client,
+        CountingPlanner(chain("a", "b", "c", "d")),
+        parallel_execution=False,
+        checkpoint_store=CheckpointStore(str(tmp_path)),
+    )
+
+    first = pipeline.execute("report", deadline=0.08)
+    result = pipeline.resume(first["task_id"])
+    pipeline.close()
+
+    assert first["status"] == "deadline_reached"
+    assert sorted(first["final_results"]["step_results"]) == ["a", "b"]
+    assert result["status"] == "completed"
+
+    # Iteration 1 ran to the end before its critique, reusing the checkpointed steps
+    iteration_1 = pipeline.state["execution_results"]["iteration_1"]
+    assert sorted(iteration_1["step_results"]) == ["a", "b", "c", "d"]
+    assert "deadline_reached" not in iteration_1
+    assert pipeline.state["step_cache_hits"]["iteration_1"] == ["a", "b"]
+    assert pipeline.state["feedback"]["iteration_1"]["quality_score"] == 3
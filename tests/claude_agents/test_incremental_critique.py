@@ -0,0 +1,134 @@
+"""Tests for incremental step critique in the orchestration pipeline."""
+
+import threading
+import time
+from types import SimpleNamespace
+
+from packages.agents.claude_agents.agents.critic import CriticAgent
+from packages.agents.claude_agents.orchestration.pipeline import OrchestrationPipeline
+
+
+class StaticPlanner:
+    def __init__(self, plan):
+        self.plan = plan
+        self.refinements = 0
+
+    def process(self, task):
+        return self.plan
+
+    def refine_plan(self, plan, feedback):
+        self.refinements += 1
+        return plan
+
+
+class SlowExecutor:
+    def __init__(self, delays):
+        self.delays = delays
+        self.executed = []
+        self.summaries = 0
+        self.events = []
+
+    def process_step(self, step, context):
+        self.executed.append(step["id"])
+        time.sleep(self.delays.get(step["id"], 0))
+        self.events.append((f"done {step['id']}", time.time()))
+        return {"completion": step["id"]}
+
+    def process(self, task):
+        self.summaries += 1
+        return {"completion": "summary"}
+
+
+class StepCritic:
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.evaluated = []
+        self.events = []
+        self.lock = threading.Lock()
+
+    def evaluate_step(self, step, result, objective=""):
+        with self.lock:
+            self.evaluated.append(step["id"])
+            self.events.append((f"evaluate {step['id']}", time.time()))
+        if step["id"] in self.failing:
+            return {"quality_score": 2, "meets_requirements": False, "overall_feedback": "wrong"}
+        return {"quality_score": 9, "meets_requirements": True, "issues": [{"severity": "minor", "description": "nit"}]}
+
+    def process(self, output, requirements=None):
+        raise AssertionError("the full critique should not run in incremental mode")
+
+
+def chain_plan(*step_ids):
+    steps = []
+    for index, step_id in enumerate(step_ids):
+        steps.append({
+            "id": step_id,
+            "description": f"Do {step_id}",
+            "dependencies": [step_ids[index - 1]] if index else [],
+        })
+    return {"objective": "test", "steps": steps}
+
+
+def test_steps_are_critiqued_while_later_steps_run():
+    executor = SlowExecutor({"second": 0.3})
+    critic = StepCritic()
+    pipeline = OrchestrationPipeline(
+        api_client=object(),
+        planner=StaticPlanner(chain_plan("first", "second")),
+        executor=executor,
+        critic=critic,
+        incremental_critique=True,
+    )
+
+    result = pipeline.execute("test")
+    pipeline.close()
+
+    evaluate_first = dict(critic.events)["evaluate first"]
+    assert evaluate_first < dict(executor.events)["done second"]
+    assert result["status"] == "completed"
+    assert result["final_feedback"]["quality_score"] == 9
+    assert result["final_feedback"]["issues"][0]["location"] == "first"
+    assert executor.summaries == 1
+
+
+def test_failing_step_stops_iteration_and_reuses_evaluations():
+    executor = SlowExecutor({"second": 0.2})
+    critic = StepCritic(failing={"first"})
+    planner = StaticPlanner(chain_plan("first", "second", "third"))
+    pipeline = OrchestrationPipeline(
+        api_client=object(),
+        planner=planner,
+        executor=executor,
+        critic=critic,
+        max_iterations=2,
+        max_concurrency=1,
+        incremental_critique=True,
+    )
+
+    result = pipeline.execute("test")
+    pipeline.close()
+
+    assert "third" not in executor.executed
+    assert executor.summaries == 0
+    assert planner.refinements == 1
+    assert result["final_results"]["stopped_early"] is True
+    assert result["final_feedback"]["meets_requirements"] is False
+    assert "Step first: wrong" in result["final_feedback"]["overall_feedback"]
+    # Unchanged steps and their evaluations are reused in the second iteration
+    assert critic.evaluated.count("first") == 1
+
+
+def test_evaluate_step_leaves_history_untouched():
+    class TextClient:
+        def send_message(self, messages, **kwargs):
+            self.prompt = messages[-1]["content"]
+            return SimpleNamespace(content=[SimpleNamespace(text="Looks correct.")])
+
+    client = TextClient()
+    critic = CriticAgent(client, context_token_budget=None)
+
+    evaluation = critic.evaluate_step({"description": "Add numbers", "expected_outcome": "3"}, {"completion": "3"}, "math")
+
+    assert evaluation["overall_feedback"] == "Looks correct."
+    assert "PLAN OBJECTIVE: math" in client.prompt
+    assert critic.history == []
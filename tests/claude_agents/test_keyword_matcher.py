@@ -0,0 +1,34 @@
+"""Tests for the shared keyword matcher used to recommend patterns."""
+
+from packages.agents.claude_agents.patterns.keyword_matcher import KeywordMatcher
+from packages.agents.claude_agents.patterns.reasoning_patterns import REASONING_KEYWORDS, ReasoningPatternLibrary
+from packages.agents.claude_agents.patterns.task_patterns import TASK_KEYWORDS, TaskPatternLibrary
+
+
+def test_matches_overlapping_keywords_case_insensitively():
+    matcher = KeywordMatcher({"data": ["Data", "dataset", "set"], "code": ["code", "decide"], "none": []})
+
+    assert matcher.match("Load the DATASET and codecide") == {
+        "data": ["data", "dataset", "set"],
+        "code": ["code", "decide"],
+        "none": [],
+    }
+
+
+def test_recommendations_score_every_keyword_of_both_libraries():
+    task = "Analyze the dataset and compare alternatives before we decide; review the data step by step"
+
+    recommendation = TaskPatternLibrary().recommend_pattern(task)
+    reasoning = ReasoningPatternLibrary().recommend_pattern(task, "business research")
+
+    assert recommendation["scores"] == {
+        name: sum(keyword in task.lower() for keyword in keywords) for name, keywords in TASK_KEYWORDS.items()
+    }
+    assert recommendation["recommended_task_pattern"] == "data_analysis"
+    assert recommendation["reasoning"] == "Task contains relevant keywords: analyze, data, dataset."
+
+    expected = {name: sum(keyword in task.lower() for keyword in keywords) for name, keywords in REASONING_KEYWORDS.items()}
+    for pattern in ("tree_of_thoughts", "debate", "scientific_method", "debate"):
+        expected[pattern] += 2
+    assert reasoning["scores"] == expected
+    assert reasoning["recommended_pattern"] == max(expected, key=expected.get)
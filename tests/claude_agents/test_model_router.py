@@ -0,0 +1,103 @@
+"""Tests for complexity-aware model routing."""
+
+import json
+import threading
+from types import SimpleNamespace
+
+from packages.agents.claude_agents.agents.critic import CriticAgent
+from packages.agents.claude_agents.agents.executor import ExecutorAgent
+from packages.agents.claude_agents.api.model_router import ModelRouter
+from packages.agents.claude_agents.orchestration.pipeline import OrchestrationPipeline
+from packages.agents.claude_agents.utils.token_counter import EstimatedTokenCounter
+
+FAST, STANDARD, LARGE = "claude-3-haiku-20240307", "claude-3-sonnet-20240229", "claude-3-opus-20240229"
+
+
+def test_tiers_by_role_complexity_and_escalation():
+    router = ModelRouter()
+
+    assert router.tier_for("planner") == "large"
+    assert router.tier_for("executor", "low") == "fast"
+    assert router.tier_for("executor") == "standard"
+    assert router.tier_for("executor", "low", escalation=1) == "standard"
+    assert router.tier_for("executor", "medium", escalation=5) == "large"
+    assert not router.can_escalate("critic")
+
+    with router.route("summary") as route:
+        assert route.model == FAST
+
+
+class ModelRecordingClient:
+    """Client recording the model of each call; the critic fails the first evaluation."""
+
+    token_counter = EstimatedTokenCounter()
+
+    def __init__(self):
+        self.calls = []
+        self.evaluations = 0
+        self.lock = threading.Lock()
+
+    def send_message(self, messages, model=None, tools=None, **kwargs):
+        prompt = messages[-1]["content"]
+        if tools and any(tool["function"]["name"] == "evaluate_output" for tool in tools):
+            with self.lock:
+                self.evaluations += 1
+                passed = self.evaluations > 1
+            text = "```json\n" + json.dumps({"quality_score": 9 if passed else 2, "meets_requirements": passed}) + "\n```"
+            kind = "critique"
+        else:
+            text = "done"
+            kind = "summary" if "Summarize" in prompt else prompt.split("TASK: ")[1].split("\n")[0]
+        with self.lock:
+            self.calls.append((kind, model))
+        usage = SimpleNamespace(input_tokens=100, output_tokens=10, cache_read_input_tokens=0, cache_creation_input_tokens=0)
+        return SimpleNamespace(content=[SimpleNamespace(text=text)], usage=usage, model=model)
+
+
+class StaticPlanner:
+    def process(self, task):
+        return {
+            "objective": task,
+            "steps": [
+                {"id": "lookup", "description": "Simple lookup of the figures", "dependencies": []},
+                {"id": "analysis", "description": "Write the analysis", "dependencies": ["lookup"]},
+            ],
+        }
+
+    def refine_plan(self, plan, feedback):
+        return plan
+
+
+def test_pipeline_routes_steps_and_escalates_after_failed_critique():
+    client = ModelRecordingClient()
+    router = ModelRouter()
+    pipeline = OrchestrationPipeline(
+        api_client=client,
+        planner=StaticPlanner(),
+        executor=ExecutorAgent(client),
+        critic=CriticAgent(client),
+        max_iterations=2,
+        model_router=router,
+    )
+
+    result = pipeline.execute("quarterly report")
+    pipeline.close()
+
+    assert result["status"] == "completed"
+    assert client.calls == [
+        ("Simple lookup of the figures", FAST),
+        ("Write the analysis", STANDARD),
+        ("summary", FAST),
+        ("critique", LARGE),
+        # Escalated steps are rerun on the next tier instead of reusing the cached results
+        ("Simple lookup of the figures", STANDARD),
+        ("Write the analysis", LARGE),
+        ("summary", FAST),
+        ("critique", LARGE),
+    ]
+
+    stats = router.get_stats()
+    assert stats["fast"]["calls"] == 3
+    assert stats["large"]["calls"] == 3
+    assert stats["large"]["cost"] > stats["fast"]["cost"] > 0
+    assert stats["standard"]["model"] == STANDARD
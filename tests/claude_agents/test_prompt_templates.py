@@ -0,0 +1,59 @@
+"""Tests for cached pattern prompts and their cacheable system prefix."""
+
+from packages.agents.claude_agents.api.optimized_client import OptimizedClaudeClient
+from packages.agents.claude_agents.api.rate_limiter import RateLimiter
+from packages.agents.claude_agents.api.stub_server import StubAnthropicServer
+from packages.agents.claude_agents.patterns.reasoning_patterns import ReasoningPatternLibrary
+from packages.agents.claude_agents.patterns.task_patterns import TaskPatternLibrary
+from packages.agents.claude_agents.utils.token_optimizer import TokenOptimizer
+
+
+def test_apply_pattern_caches_prompts_and_exposes_stable_prefix():
+    library = TaskPatternLibrary()
+    pattern = library.get_pattern("code_generation")
+    expected_system = pattern.generate_system_prompt(language="python", reasoning_pattern="chain_of_thought")
+
+    planner = library.apply_pattern("code_generation", "Parse a CSV file", reasoning_pattern="chain_of_thought", language="python")
+    critic = library.apply_pattern("code_generation", "Parse a CSV file", agent_type="critic", reasoning_pattern="chain_of_thought", language="python")
+
+    assert planner["system_prompt"] == expected_system + "\nYour primary responsibility is to create effective plans and strategies."
+    assert planner["stable_prefix"] == critic["stable_prefix"] == expected_system
+    assert planner["task_prompt"] == pattern.generate_task_prompt("Parse a CSV file", language="python", reasoning_pattern="chain_of_thought")
+    assert pattern.prompt_cache.get_stats() == {"size": 2, "hits": 2, "misses": 2}
+
+    # The caller's breakpoint on the prefix is kept when the client applies prompt caching
+    params = TokenOptimizer.apply_prompt_caching({"system": critic["system_blocks"], "messages": []})
+    assert params["system"][0] == {"type": "text", "text": expected_system, "cache_control": {"type": "ephemeral"}}
+    assert "cache_control" not in params["system"][1]
+
+
+def test_list_parameters_are_part_of_the_cache_key():
+    debate = ReasoningPatternLibrary().get_pattern("debate")
+
+    first = debate.task_prompt("Pick a database", perspectives=["Cost", "Speed"])
+    second = debate.task_prompt("Pick a database", perspectives=["Cost", "Safety"])
+
+    assert "Safety" in second and "Safety" not in first
+    assert debate.task_prompt("Pick a database", perspectives=["Cost", "Speed"]) is first
+
+
+def test_system_blocks_can_be_sent_through_the_optimized_client():
+    applied = TaskPatternLibrary().apply_pattern("code_generation", "Parse a CSV file", language="python")
+
+    with StubAnthropicServer() as server:
+        for budget_tier in ("economy", "standard"):
+            client = OptimizedClaudeClient(
+                api_key="test-key",
+                base_url=server.base_url,
+                rate_limiter=RateLimiter(),
+                budget_tier=budget_tier,
+                enable_caching=False,
+            )
+            client.send_message([{"role": "user", "content": applied["task_prompt"]}], system=applied["system_blocks"])
+
+            system = server.requests[-1]["system"]
+            assert [block["type"] for block in system] == ["text", "text"]
+            assert system[0]["cache_control"] == {"type": "ephemeral"}
+            assert system[0]["text"] == TokenOptimizer.compress_prompt(
+                applied["stable_prefix"], "high" if budget_tier == "economy" else "medium"
+            )
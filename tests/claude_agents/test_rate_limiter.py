@@ -0,0 +1,76 @@
+"""Tests for the header-driven RateLimiter."""
+
+from packages.agents.claude_agents.api import rate_limiter as rate_limiter_module
+from packages.agents.claude_agents.api.rate_limiter import RateLimiter
+
+HEADERS = {
+    "anthropic-ratelimit-requests-limit": "60",
+    "anthropic-ratelimit-requests-remaining": "0",
+    "anthropic-ratelimit-input-tokens-limit": "6000",
+    "anthropic-ratelimit-input-tokens-remaining": "6000",
+    "anthropic-ratelimit-output-tokens-limit": "600",
+    "anthropic-ratelimit-output-tokens-remaining": "600",
+}
+
+
+def test_unlimited_until_headers_are_seen():
+    limiter = RateLimiter()
+
+    assert limiter.acquire(input_tokens=10_000, output_tokens=4096) == 0.0
+
+
+def test_update_from_headers_refills_buckets():
+    limiter = RateLimiter()
+    limiter.update_from_headers(HEADERS)
+
+    state = limiter.get_state()["buckets"]
+    assert state["requests"]["limit"] == 60
+    assert state["input_tokens"]["limit"] == 6000
+    assert state["output_tokens"]["tokens"] == 600
+
+
+def test_acquire_paces_when_bucket_is_empty(monkeypatch):
+    sleeps = []
+    clock = [1000.0]
+    monkeypatch.setattr(rate_limiter_module.time, "time", lambda: clock[0])
+
+    def fake_sleep(seconds):
+        sleeps.append(seconds)
+        clock[0] += seconds
+
+    monkeypatch.setattr(rate_limiter_module.time, "sleep", fake_sleep)
+
+    limiter = RateLimiter()
+    limiter.update_from_headers(HEADERS)
+    waited = limiter.acquire(input_tokens=100, output_tokens=10)
+
+    # 60 requests/min refill one request per second
+    assert sleeps == [1.0]
+    assert waited == 1.0
+
+
+def test_retry_after_blocks_all_callers(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(rate_limiter_module.time, "time", lambda: clock[0])
+
+    limiter = RateLimiter()
+    limiter.update_from_headers({"Retry-After": "7"})
+
+    assert limiter.get_state()["blocked_until"] == 1007.0
+
+
+def test_state_file_is_shared_between_instances(tmp_path):
+    state_file = str(tmp_path / "ratelimit.json")
+    first = RateLimiter(state_file=state_file)
+    second = RateLimiter(state_file=state_file)
+
+    first.update_from_headers(HEADERS)
+    first.penalize(30)
+
+    state = second.get_state()
+    assert state["buckets"]["input_tokens"]["limit"] == 6000
+    assert state["blocked_until"] > 0
+
+
+def test_shared_returns_process_wide_instance():
+    assert RateLimiter.shared() is RateLimiter.shared()
@@ -0,0 +1,181 @@
+"""Tests for hedged requests and circuit breaking."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from packages.agents.claude_agents.api.client import ClaudeAPIClient
+from packages.agents.claude_agents.api.optimized_client import OptimizedClaudeClient
+from packages.agents.claude_agents.api.rate_limiter import RateLimiter
+from packages.agents.claude_agents.api.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LatencyTracker,
+    hedged_call,
+)
+from packages.agents.claude_agents.api.stub_server import StubAnthropicServer
+
+
+def test_latency_tracker_percentiles():
+    tracker = LatencyTracker(min_samples=10)
+    for i in range(1, 10):
+        tracker.record(i / 100)
+
+    assert tracker.percentile(95) is None
+
+    tracker.record(1.0)
+    assert tracker.percentile(50) == 0.05
+    assert tracker.percentile(95) == 1.0
+
+
+def test_circuit_breaker_opens_and_recovers():
+    breaker = CircuitBreaker(failure_threshold=0.5, min_calls=4, recovery_time=0.05)
+    for outcome in (True, False, True, False):
+        breaker.record_success() if outcome else breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+    time.sleep(0.06)
+    assert breaker.allow_request()  # Trial call
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_hedged_call_returns_first_success():
+    calls = []
+
+    def slow():
+        calls.append("slow")
+        time.sleep(0.5)
+        return "slow"
+
+    def fast():
+        calls.append("fast")
+        return "fast"
+
+    with ThreadPoolExecutor() as executor:
+        start = time.time()
+        assert hedged_call(slow, 0.02, executor, hedge=fast) == "fast"
+        assert time.time() - start < 0.4
+
+    assert calls == ["slow", "fast"]
+
+
+def test_hedged_call_raises_when_both_fail():
+    def fail():
+        raise RuntimeError("boom")
+
+    with ThreadPoolExecutor() as executor:
+        with pytest.raises(RuntimeError):
+            hedged_call(fail, 0.01, executor)
+
+
+def test_client_hedges_slow_calls():
+    call_count = iter(range(1000))
+    lock = threading.Lock()
+
+    def responder(params):
+        with lock:
+            first = next(call_count) == 0
+        if first:
+            time.sleep(1.0)
+        return "done"
+
+    with StubAnthropicServer(responder=responder) as server:
+        client = ClaudeAPIClient(
+            api_key="test-key",
+            base_url=server.base_url,
+            rate_limiter=RateLimiter(),
+            hedge_requests=True,
+        )
+        tracker = LatencyTracker(min_samples=1)
+        tracker.record(0.05)
+        client.latency_trackers[client.model] = tracker
+
+        start = time.time()
+        response = client.send_message([{"role": "user", "content": "hi"}])
+
+        assert response.content[0].text == "done"
+        assert time.time() - start < 0.9
+        assert len(server.requests) == 2
+
+
+def test_open_circuit_fails_over_to_fallback_model():
+    breaker = CircuitBreaker(min_calls=1, recovery_time=60)
+    breaker.record_failure()
+
+    with StubAnthropicServer() as server:
+        client = ClaudeAPIClient(
+            api_key="test-key",
+            base_url=server.base_url,
+            rate_limiter=RateLimiter(),
+            fallback_model="claude-3-haiku-20240307",
+            circuit_breaker=breaker,
+        )
+        client.send_message([{"role": "user", "content": "hi"}])
+        assert server.requests[-1]["model"] == "claude-3-haiku-20240307"
+
+        client.fallback_model = None
+        with pytest.raises(CircuitOpenError):
+            client.send_message([{"role": "user", "content": "hi"}])
+
+
+def test_losing_hedged_request_is_still_accounted_for():
+    call_count = iter(range(1000))
+    lock = threading.Lock()
+
+    def responder(params):
+        with lock:
+            first = next(call_count) == 0
+        if first:
+            time.sleep(0.3)
+        return "done"
+
+    with StubAnthropicServer(responder=responder) as server:
+        client = OptimizedClaudeClient(
+            api_key="test-key",
+            base_url=server.base_url,
+            rate_limiter=RateLimiter(),
+            enable_caching=False,
+            hedge_requests=True,
+        )
+        tracker = LatencyTracker(min_samples=1)
+        tracker.record(0.05)
+        client.latency_trackers[client.model] = tracker
+
+        client.send_message([{"role": "user", "content": "hi"}])
+        assert client.cost_tracker["request_count"] == 1
+
+        deadline = time.time() + 2
+        while client.cost_tracker["request_count"] < 2 and time.time() < deadline:
+            time.sleep(0.02)
+        assert client.cost_tracker["request_count"] == 2
+        assert client._hedge_pool() is client._hedge_pool()
+
+
+def test_rate_limiters_and_breakers_are_kept_per_model():
+    small, large = "claude-test-small", "claude-test-large"
+    breaker = CircuitBreaker(min_calls=1, recovery_time=60)
+    limits = {"anthropic-ratelimit-input-tokens-limit": "123456", "anthropic-ratelimit-input-tokens-remaining": "123000"}
+
+    with StubAnthropicServer(rate_limit_headers=limits) as server:
+        client = ClaudeAPIClient(api_key="test-key", base_url=server.base_url, model=large, circuit_breaker=breaker)
+        client.send_message([{"role": "user", "content": "hi"}], model=small)
+
+        # The small model's headers only refill the small model's buckets
+        assert client._rate_limiter(small) is RateLimiter.shared(model=small)
+        assert client._rate_limiter(small).get_state()["buckets"]["input_tokens"]["limit"] == 123456
+        assert client.rate_limiter.get_state()["buckets"]["input_tokens"]["limit"] is None
+
+        # An outage of the small model opens its circuit only
+        client._circuit_breaker(small).record_failure()
+        with pytest.raises(CircuitOpenError):
+            client.send_message([{"role": "user", "content": "hi"}], model=small)
+        client.send_message([{"role": "user", "content": "hi"}])
+        assert server.requests[-1]["model"] == large
+        assert breaker.state == CircuitBreaker.CLOSED
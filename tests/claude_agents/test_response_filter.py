@@ -0,0 +1,64 @@
+"""Tests for the streaming response filter."""
+
+import random
+
+import pytest
+
+from packages.agents.claude_agents.utils.response_filter import StreamingResponseFilter
+from packages.agents.claude_agents.utils.token_optimizer import TokenOptimizer
+
+RESPONSES = [
+    "<thinking>\nThe user wants a sorted list.\n</thinking>\n\nHere is the sorted list: 1, 2, 3.",
+    "Result: 42\n\nExplanation: I multiplied six by seven.\n\nLet me know if you need more.",
+    "*Reasoning:* the cache is cold.\n\nUse a warm-up request first.",
+    "  Answer first.\n\n\n\n<Thinking>Hidden</thinking>\n\n\n*thinking*\nstill hidden\n\nDone.  ",
+    "Step 1\n<explanation>why</explanation>Step 2\n\nreasoning: because\n\nStep 3",
+    "No filtered sections here, just *emphasis* and a <b>tag</b>.",
+    "explanation: everything is hidden until the end",
+]
+
+
+def chunked(text, rng, max_chunk=7):
+    chunks = []
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, max_chunk)
+        chunks.append(text[position:position + size])
+        position += size
+    return chunks
+
+
+@pytest.mark.parametrize("response", RESPONSES)
+def test_stream_matches_filter_response(response):
+    expected = TokenOptimizer.filter_response(response)
+    rng = random.Random(0)
+
+    assert "".join(TokenOptimizer.filter_response_stream([response])) == expected
+    for _ in range(50):
+        assert "".join(TokenOptimizer.filter_response_stream(chunked(response, rng))) == expected
+
+
+def test_clean_text_is_emitted_without_waiting_for_the_stream():
+    response_filter = StreamingResponseFilter()
+
+    assert response_filter.feed("The answer is 4") == "The answer is 4"
+    assert response_filter.feed(". <think") == "."
+    assert response_filter.feed("ing>secret") == ""
+    assert response_filter.feed("</thinking> Done.") == "  Done."
+    assert response_filter.flush() == ""
+
+
+def test_discarded_sections_are_not_buffered():
+    response_filter = StreamingResponseFilter(["thinking"])
+    response_filter.feed("<thinking>")
+    for _ in range(1000):
+        response_filter.feed("lots of hidden reasoning ")
+
+    assert len(response_filter._buffer) < len("</thinking>")
+    assert response_filter.feed("</thinking>visible") == "visible"
+
+
+def test_custom_filters():
+    chunks = ["Notes: draft\n", "\nFinal: ship it"]
+
+    assert "".join(TokenOptimizer.filter_response_stream(chunks, ["notes"])) == "Final: ship it"
@@ -0,0 +1,185 @@
+"""Tests for the ready-queue DAG scheduler."""
+
+import threading
+import time
+
+import pytest
+
+from packages.agents.claude_agents.orchestration.pipeline import OrchestrationPipeline
+from packages.agents.claude_agents.orchestration.scheduler import DAGScheduler, DependencyCycleError
+
+
+def test_cycles_are_detected_upfront():
+    calls = []
+
+    with pytest.raises(DependencyCycleError) as error:
+        DAGScheduler().run({"a": [], "b": ["c"], "c": ["d"], "d": ["b"]}, calls.append)
+
+    assert error.value.cycle in (["b", "c", "d", "b"], ["c", "d", "b", "c"], ["d", "b", "c", "d"])
+    assert calls == []
+
+
+def test_dependents_start_as_soon_as_their_dependencies_finish():
+    events = []
+    lock = threading.Lock()
+
+    def run_task(task_id):
+        with lock:
+            events.append(f"start {task_id}")
+        time.sleep(0.3 if task_id == "slow" else 0.01)
+        with lock:
+            events.append(f"end {task_id}")
+        return task_id.upper()
+
+    scheduler = DAGScheduler(max_concurrency=3)
+    results = scheduler.run({"slow": [], "fast": [], "after_fast": ["fast"], "after_both": ["slow", "fast"]}, run_task)
+    scheduler.shutdown()
+
+    assert results == {"slow": "SLOW", "fast": "FAST", "after_fast": "AFTER_FAST", "after_both": "AFTER_BOTH"}
+    assert events.index("start after_fast") < events.index("end slow")
+    assert events.index("start after_both") > events.index("end slow")
+
+
+def test_critical_path_first_and_concurrency_cap():
+    order = []
+    running = []
+    peak = [0]
+    lock = threading.Lock()
+
+    def run_task(task_id):
+        with lock:
+            order.append(task_id)
+            running.append(task_id)
+            peak[0] = max(peak[0], len(running))
+        time.sleep(0.02)
+        with lock:
+            running.remove(task_id)
+
+    dependencies = {"leaf": [], "short": [], "chain_1": [], "chain_2": ["chain_1"], "chain_3": ["chain_2"]}
+    assert DAGScheduler.critical_path_lengths(dependencies)["chain_1"] == 3
+
+    DAGScheduler(max_concurrency=1).run(dependencies, run_task)
+    assert order[0] == "chain_1"
+
+    order.clear()
+    DAGScheduler(max_concurrency=2).run({f"t{i}": [] for i in range(8)}, run_task)
+    assert peak[0] == 2
+    assert len(order) == 8
+
+
+def test_errors_without_handler_are_raised():
+    def run_task(task_id):
+        if task_id == "bad":
+            raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        DAGScheduler().run({"bad": [], "after": ["bad"]}, run_task)
+
+
+class RecordingExecutor:
+    def __init__(self):
+        self.contexts = {}
+
+    def process_step(self, step, context):
+        if step["id"] == "broken":
+            raise RuntimeError("step failed")
+        self.contexts[step["id"]] = sorted(context["previous_results"])
+        return {"completion": step["id"]}
+
+    def process(self, task):
+        return {"completion": "summary"}
+
+
+def test_pipeline_runs_plan_through_scheduler():
+    executor = RecordingExecutor()
+    pipeline = OrchestrationPipeline(api_client=object(), executor=executor, max_concurrency=2)
+    plan = {
+        "objective": "test",
+        "steps": [
+            {"id": "report", "dependencies": ["analyze", "broken"]},
+            {"id": "analyze", "dependencies": ["fetch"]},
+            {"id": "fetch", "dependencies": []},
+            {"id": "broken", "dependencies": []},
+        ],
+    }
+
+    results = pipeline._execute_plan(plan)
+    pipeline.close()
+
+    assert results["step_results"]["broken"]["status"] == "failed"
+    assert executor.contexts["report"] == ["analyze", "broken", "fetch"]
+    assert results["completed_steps"] == 4
+
+    plan["steps"][2]["dependencies"] = ["report"]
+    with pytest.raises(DependencyCycleError):
+        pipeline._execute_plan(plan)
+
+
+class FakePlanner:
+    def __init__(self, plan):
+        self.plan = plan
+
+    def process(self, task):
+        return self.plan
+
+    def refine_plan(self, plan, feedback):
+        # Only the "analyze" step changes
+        steps = [dict(step) for step in plan["steps"]]
+        steps[1]["description"] = "Analyze the data more carefully"
+        return {**plan, "steps": steps}
+
+
+class FakeCritic:
+    def process(self, output, requirements=None):
+        return {"quality_score": 0, "meets_requirements": False, "overall_feedback": "again"}
+
+
+class CountingExecutor(RecordingExecutor):
+    def __init__(self):
+        super().__init__()
+        self.executed = []
+
+    def process_step(self, step, context):
+        self.executed.append(step["id"])
+        return {"completion": step["description"], "step_id": step["id"]}
+
+
+def test_unchanged_steps_are_reused_across_iterations():
+    plan = {
+        "objective": "report",
+        "steps": [
+            {"id": "fetch", "description": "Fetch the data", "dependencies": []},
+            {"id": "analyze", "description": "Analyze the data", "dependencies": ["fetch"]},
+            {"id": "report", "description": "Write the report", "dependencies": ["analyze"]},
+            {"id": "notes", "description": "Write notes", "dependencies": ["fetch"]},
+        ],
+    }
+    executor = CountingExecutor()
+    pipeline = OrchestrationPipeline(
+        api_client=object(),
+        planner=FakePlanner(plan),
+        executor=executor,
+        critic=FakeCritic(),
+        max_iterations=2,
+    )
+
+    result = pipeline.execute("report")
+    pipeline.close()
+
+    assert result["status"] == "max_iterations_reached"
+    assert sorted(pipeline.state["step_cache_hits"]["iteration_2"]) == ["fetch", "notes"]
+    assert sorted(executor.executed) == sorted(["fetch", "analyze", "report", "notes", "analyze", "report"])
+    assert result["final_results"]["step_results"]["notes"]["completion"] == "Write notes"
+
+
+def test_cached_steps_are_not_reused_for_another_objective():
+    executor = CountingExecutor()
+    pipeline = OrchestrationPipeline(api_client=object(), executor=executor)
+    step = {"id": "summary", "description": "Summarize the findings", "dependencies": []}
+
+    pipeline._execute_plan({"objective": "Review the Q1 report", "steps": [dict(step)]})
+    pipeline._execute_plan({"objective": "Review the Q2 report", "steps": [dict(step)]})
+    pipeline._execute_plan({"objective": "Review the Q2 report", "steps": [dict(step)]})
+    pipeline.close()
+
+    assert executor.executed == ["summary", "summary"]
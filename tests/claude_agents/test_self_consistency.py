@@ -0,0 +1,113 @@
+"""Tests for concurrent self-consistency sampling."""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from packages.agents.claude_agents.patterns.reasoning_patterns import ANSWER_FORMAT_INSTRUCTION, ReasoningPatternLibrary
+
+
+class ScriptedClient:
+    """Client returning scripted (delay, text) responses in call order; a text of None fails the call."""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def send_message(self, messages, system=None, **kwargs):
+        with self.lock:
+            delay, text = self.script[self.calls]
+            self.calls += 1
+        time.sleep(delay)
+        if text is None:
+            raise RuntimeError("sample failed")
+        return SimpleNamespace(content=[SimpleNamespace(text=text)])
+
+
+def test_majority_vote_stops_once_the_answer_is_decided():
+    client = ScriptedClient([
+        (0.01, "1. Add them up\nAnswer: 42"),
+        (0.02, "1. Add them\nFinal Answer: 42."),
+        (0.03, "Answer: 41"),
+        (0.04, "Answer:   42"),
+        (1.0, "Answer: 41"),
+    ])
+    library = ReasoningPatternLibrary()
+
+    start = time.time()
+    result = library.apply_pattern("chain_of_thought", "What is 40 + 2?", api_client=client, samples=5)
+    elapsed = time.time() - start
+
+    consistency = result["self_consistency"]
+    assert consistency["answer"] == "42"
+    assert consistency["votes"] == {"42": 3, "41": 1}
+    assert consistency["agreement"] == 0.75
+    assert consistency["completed"] == 4
+    # 3 votes to 1 can't be overtaken by the one outstanding (already running) sample
+    assert consistency["abandoned"] == 1
+    assert consistency["cancelled"] == 0
+    assert elapsed < 0.5
+    assert "task_prompt" in result
+
+
+def test_self_reflection_votes_on_its_answer_line_and_other_patterns_are_rejected():
+    client = ScriptedClient([
+        (0, "Initial solution: a\nReflection: b\nRefined solution: Use a bounded\nqueue with backpressure.\nFinal Answer: A queue"),
+        (0, "Initial solution: c\nReflection: d\nRefined solution: A queue, since producers are bursty.\nFinal Answer: **a queue.**"),
+        (0, "Refined solution: A queue.\nFinal Answer: a Queue"),
+        (0.5, "Refined solution: A stack"),
+        (0, "Refined solution: A stack"),
+    ])
+    library = ReasoningPatternLibrary()
+
+    result = library.apply_pattern("self_reflection", "Design it", api_client=client, samples=5, max_concurrency=1)
+
+    consistency = result["self_consistency"]
+    assert consistency["answer"] == "A queue"
+    assert consistency["votes"] == {"a queue": 3}
+    # The fourth sample was already running, the fifth was still queued and never sent
+    assert (consistency["completed"], consistency["abandoned"], consistency["cancelled"]) == (3, 1, 1)
+    assert client.calls == 4
+    with pytest.raises(ValueError):
+        library.apply_pattern("debate", "Design it", api_client=client, samples=3)
+
+
+def test_failed_samples_count_towards_stopping_and_samples_must_be_positive():
+    client = ScriptedClient([
+        (0.01, "Answer: 42"),
+        (0.02, "Answer: 42"),
+        (0.03, None),
+        (1.0, "Answer: 41"),
+    ])
+    pattern = ReasoningPatternLibrary().get_pattern("chain_of_thought")
+
+    start = time.time()
+    consistency = pattern.self_consistency(client, "system", "What is 40 + 2?", samples=4)
+
+    assert time.time() - start < 0.5
+    assert consistency["votes"] == {"42": 2}
+    assert consistency["completed"] == 3
+    assert consistency["abandoned"] == 1
+    with pytest.raises(ValueError):
+        pattern.self_consistency(client, "system", "What is 40 + 2?", samples=0)
+
+
+def test_samples_are_asked_for_an_answer_line_and_answers_are_normalized():
+    client = ScriptedClient([
+        (0, "Adding 40 and 2.\nTherefore, the answer is 42."),
+        (0, "40 + 2 = 42\nConclusion: 42"),
+        (0, "Final Answer: `42`"),
+    ])
+    pattern = ReasoningPatternLibrary().get_pattern("chain_of_thought")
+    prompts = []
+    send_message = client.send_message
+    client.send_message = lambda messages, **kwargs: prompts.append(messages[-1]["content"]) or send_message(messages, **kwargs)
+
+    consistency = pattern.self_consistency(client, "system", "What is 40 + 2?", samples=3, max_concurrency=1)
+
+    assert consistency["votes"] == {"42": 2}
+    assert all(prompt.endswith(ANSWER_FORMAT_INSTRUCTION) for prompt in prompts)
+    assert [pattern.normalize_answer(answer) for answer in ("The answer is 42.", "So, the final answer is: **42**", "42")] == ["42"] * 3
@@ -0,0 +1,119 @@
+"""Tests for the embedding-based SemanticCache."""
+
+from packages.agents.claude_agents.api.optimized_client import OptimizedClaudeClient
+from packages.agents.claude_agents.api.rate_limiter import RateLimiter
+from packages.agents.claude_agents.api.semantic_cache import SemanticCache
+from packages.agents.claude_agents.api.stub_server import StubAnthropicServer
+
+
+def make_params(content, system="You are helpful.", temperature=0.7, model="claude-3-haiku-20240307"):
+    return {
+        "model": model,
+        "system": system,
+        "temperature": temperature,
+        "messages": [{"role": "user", "content": content}],
+    }
+
+
+PROMPT = "Summarize the quarterly revenue report and list the three largest cost drivers."
+
+
+def test_formatting_only_differences_hit():
+    cache = SemanticCache(use_faiss=False)
+    cache.add(make_params(PROMPT), "response")
+
+    reformatted = "  summarize the quarterly revenue report,\n\nand list the three largest cost drivers!  "
+    match = cache.lookup(make_params(reformatted))
+
+    assert match is not None
+    assert match[0] == "response"
+    assert match[1] > 0.99
+
+
+def test_different_prompt_misses():
+    cache = SemanticCache(use_faiss=False)
+    cache.add(make_params(PROMPT), "response")
+
+    assert cache.lookup(make_params("Write a haiku about autumn leaves falling in the park.")) is None
+
+
+def test_lookups_are_scoped_by_model_temperature_and_system():
+    cache = SemanticCache(use_faiss=False)
+    cache.add(make_params(PROMPT), "response")
+
+    assert cache.lookup(make_params(PROMPT, system="You are terse.")) is None
+    assert cache.lookup(make_params(PROMPT, temperature=0.0)) is None
+    assert cache.lookup(make_params(PROMPT, model="claude-3-opus-20240229")) is None
+    assert cache.lookup(make_params(PROMPT)) is not None
+
+
+def test_stats_and_eviction():
+    cache = SemanticCache(use_faiss=False, max_entries=5)
+    for i in range(6):
+        cache.add(make_params(f"{PROMPT} Variant number {i}."), f"response {i}")
+
+    cache.lookup(make_params(f"{PROMPT} Variant number 5."))
+    cache.lookup(make_params("Something else entirely, about gardening tools."))
+
+    stats = cache.get_stats()
+    assert stats["entries"] == 5
+    assert stats["evictions"] == 1
+    assert stats["lookups"] == 2
+    assert stats["hits"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_client_serves_near_duplicates_from_semantic_cache():
+    with StubAnthropicServer() as server:
+        client = OptimizedClaudeClient(
+            api_key="test-key",
+            base_url=server.base_url,
+            rate_limiter=RateLimiter(),
+            semantic_cache=SemanticCache(use_faiss=False),
+        )
+
+        first = client.send_message([{"role": "user", "content": PROMPT}])
+        second = client.send_message([{"role": "user", "content": PROMPT.upper() + "  "}])
+
+        assert second is first
+        assert len(server.requests) == 1
+        assert client.get_usage_stats()["semantic_cache"]["hits"] == 1
+
+
+def test_operators_and_max_tokens_are_not_ignored():
+    cache = SemanticCache(use_faiss=False)
+    question = "Compute a - b for a = 10 and b = 3, and explain each step of the calculation."
+    cache.add(dict(make_params(question), max_tokens=64), "7")
+
+    assert cache.lookup(dict(make_params(question.replace(" - ", " + ")), max_tokens=64)) is None
+    assert cache.lookup(dict(make_params(question), max_tokens=1024)) is None
+    assert cache.lookup(dict(make_params(question.replace(" - ", "-")), max_tokens=64))[0] == "7"
+
+
+def test_long_shared_history_does_not_hide_a_changed_question():
+    history = [
+        {"role": "user", "content": f"Here is part {i} of the contract: the supplier delivers goods monthly."}
+        for i in range(20)
+    ] + [{"role": "assistant", "content": "I have read the contract."}]
+
+    def ask(question, earlier_turns=history):
+        return dict(make_params(question), messages=earlier_turns + [{"role": "user", "content": question}])
+
+    cache = SemanticCache(use_faiss=False)
+    cache.add(ask("Is the supplier allowed to terminate the contract early?"), "YES")
+
+    assert cache.lookup(ask("Is the buyer required to pay for goods that arrive late?")) is None
+    assert cache.lookup(ask("Is the supplier allowed to terminate the contract early?", history[1:])) is None
+    assert cache.lookup(ask("is the supplier allowed to terminate the contract early"))[0] == "YES"
+
+
+def test_lexical_fallback_misses_on_negation_and_version_numbers():
+    cache = SemanticCache(use_faiss=False)
+    negated = "Explain why this queue implementation is NOT thread safe when several producers push at once."
+    pinned = "Write a script that parses the log files and reports errors per hour. Use Python 3.8"
+    cache.add(make_params(negated), "not safe")
+    cache.add(make_params(pinned), "3.8 script")
+
+    assert cache.lookup(make_params(negated.replace("NOT ", ""))) is None
+    assert cache.lookup(make_params(pinned.replace("3.8", "3.12"))) is None
+    assert cache.lookup(make_params(pinned.lower() + ".")) is not None
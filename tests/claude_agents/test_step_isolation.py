@@ -0,0 +1,61 @@
+"""Tests for isolated per-step executor contexts."""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from packages.agents.claude_agents.agents.executor import ExecutorAgent
+from packages.agents.claude_agents.orchestration.pipeline import OrchestrationPipeline
+from packages.agents.claude_agents.utils.token_counter import EstimatedTokenCounter
+
+
+class MessageCountingClient:
+    """API client that records how many messages and characters each call sends."""
+
+    token_counter = EstimatedTokenCounter()
+
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def send_message(self, messages, **kwargs):
+        with self.lock:
+            self.calls.append((len(messages), sum(len(message["content"]) for message in messages)))
+        return SimpleNamespace(content=[SimpleNamespace(text="result " * 50)])
+
+
+def chain_plan(length):
+    return {
+        "objective": "chain",
+        "steps": [
+            {"id": f"step_{i}", "description": f"Step {i}", "dependencies": [f"step_{i - 1}"] if i else []}
+            for i in range(length)
+        ],
+    }
+
+
+def test_concurrent_steps_do_not_share_history():
+    client = MessageCountingClient()
+    executor = ExecutorAgent(client)
+    steps = [{"id": f"step_{i}", "description": f"Step {i}"} for i in range(20)]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda step: executor.process_step(step, {"objective": "x"}), steps))
+
+    assert [result["step_id"] for result in results] == [step["id"] for step in steps]
+    assert all(message_count == 1 for message_count, _ in client.calls)
+    assert executor.history == []
+
+
+def test_prompt_size_per_step_stays_flat_as_plans_grow():
+    sizes = []
+    for length in (5, 20):
+        client = MessageCountingClient()
+        pipeline = OrchestrationPipeline(api_client=client, executor=ExecutorAgent(client))
+        pipeline._execute_plan(chain_plan(length))
+        pipeline.close()
+
+        step_calls = client.calls[:-1]  # The last call is the summary
+        sizes.append(max(characters for _, characters in step_calls))
+
+    assert sizes[1] <= sizes[0] + 10
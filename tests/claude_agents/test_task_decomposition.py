@@ -0,0 +1,83 @@
+"""Tests for the decomposition cache and local rebalancing in TaskDecomposer."""
+
+from types import SimpleNamespace
+
+from packages.agents.claude_agents.orchestration.task_decomposition import TaskDecomposer
+from packages.agents.claude_agents.utils.token_counter import EstimatedTokenCounter
+
+STUB_CLIENT = SimpleNamespace(token_counter=EstimatedTokenCounter())
+
+
+class CountingPlanner:
+    def __init__(self, steps=None):
+        self.prompts = []
+        self.steps = steps or [
+            {"id": "step_1", "description": "Collect the numbers", "dependencies": []},
+            {"id": "step_2", "description": "Summarize the numbers", "dependencies": ["step_1"]},
+        ]
+
+    def process(self, prompt):
+        self.prompts.append(prompt)
+        return {"objective": "x", "steps": self.steps}
+
+
+def subtask(subtask_id, complexity, dependencies=()):
+    return {
+        "id": subtask_id,
+        "description": f"Do {subtask_id}",
+        "expected_outcome": f"{subtask_id} done",
+        "dependencies": list(dependencies),
+        "complexity": complexity,
+        "status": "pending",
+    }
+
+
+def test_decompositions_are_cached_by_normalized_task():
+    planner = CountingPlanner()
+    decomposer = TaskDecomposer(api_client=STUB_CLIENT, planner=planner)
+
+    first = decomposer.decompose("Write the weekly report.")
+    first[0]["status"] = "done"
+    second = decomposer.decompose("  write the WEEKLY   report ")
+
+    assert len(planner.prompts) == 1
+    assert second[0]["status"] == "pending"
+
+    decomposer.decompose("Write the weekly report", context={"week": 2})
+    assert len(planner.prompts) == 2
+
+
+def test_low_complexity_chains_are_merged_without_the_planner():
+    planner = CountingPlanner()
+    decomposer = TaskDecomposer(api_client=STUB_CLIENT, planner=planner, max_subtasks=4)
+    subtasks = [
+        subtask("fetch", "low"),
+        subtask("clean", "low", ["fetch"]),
+        subtask("model", "high", ["clean"]),
+        subtask("outline", "low"),
+        subtask("draft", "low", ["outline"]),
+        subtask("publish", "medium", ["model", "draft"]),
+    ]
+
+    rebalanced = decomposer.rebalance_subtasks(subtasks)
+
+    assert planner.prompts == []
+    by_id = {item["id"]: item for item in rebalanced}
+    assert sorted(by_id) == ["fetch", "model", "outline", "publish"]
+    assert by_id["fetch"]["merged_from"] == ["fetch", "clean"]
+    assert by_id["fetch"]["complexity"] == "medium"
+    assert by_id["model"]["dependencies"] == ["fetch"]
+    assert by_id["publish"]["dependencies"] == ["model", "outline"]
+    # The input is left untouched
+    assert subtasks[2]["dependencies"] == ["clean"]
+
+
+def test_planner_combines_when_local_merging_is_not_enough():
+    planner = CountingPlanner()
+    decomposer = TaskDecomposer(api_client=STUB_CLIENT, planner=planner, max_subtasks=2)
+    subtasks = [subtask("a", "high"), subtask("b", "high", ["a"]), subtask("c", "low")]
+
+    rebalanced = decomposer.rebalance_subtasks(subtasks)
+
+    assert len(planner.prompts) == 1
+    assert [item["id"] for item in rebalanced] == ["step_1", "step_2"]
@@ -0,0 +1,91 @@
+"""Tests for the lazily-loaded, memoized TokenCounter."""
+
+import pytest
+
+from packages.agents.claude_agents.utils import token_counter as token_counter_module
+from packages.agents.claude_agents.utils.context_packer import ContextPacker
+from packages.agents.claude_agents.utils.token_counter import EstimatedTokenCounter, TokenCounter
+
+
+class WhitespaceEncoding:
+    """Stand-in for a tiktoken encoding that records what it encodes."""
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, text):
+        self.encoded.append(text)
+        return text.split()
+
+    def encode_batch(self, texts, num_threads=8):
+        self.encoded.extend(texts)
+        return [text.split() for text in texts]
+
+
+@pytest.fixture
+def encoding(monkeypatch):
+    fake = WhitespaceEncoding()
+    loads = []
+
+    def get_encoding(name):
+        loads.append(name)
+        return fake
+
+    monkeypatch.setattr(token_counter_module.tiktoken, "get_encoding", get_encoding)
+    fake.loads = loads
+    return fake
+
+
+def test_tokenizer_is_loaded_lazily(encoding):
+    counter = TokenCounter()
+    assert encoding.loads == []
+
+    assert counter.count_tokens("one two three") == 3
+    assert encoding.loads == ["cl100k_base"]
+
+
+def test_counts_are_memoized(encoding):
+    counter = TokenCounter()
+    counter.count_tokens("one two three")
+    counter.count_tokens("one two three")
+
+    assert encoding.encoded == ["one two three"]
+    assert counter.get_cache_stats()["hits"] == 1
+
+
+def test_history_recount_is_mostly_cache_hits(encoding):
+    counter = TokenCounter()
+    history = [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"message number {i}"}
+        for i in range(200)
+    ]
+
+    first = counter.count_message_tokens(history)
+    history.append({"role": "user", "content": "one more message"})
+    second = counter.count_message_tokens(history)
+
+    assert first["total"] == 600
+    assert second["total"] == 603
+    assert len(encoding.encoded) == 201
+    assert counter.get_cache_stats()["hits"] == 200
+
+
+def test_batch_matches_single_counts_and_evicts(encoding):
+    counter = TokenCounter(cache_size=2)
+    texts = ["a b", "c d e", "a b", "f"]
+
+    assert counter.count_tokens_batch(texts) == [2, 3, 2, 1]
+    assert counter.get_cache_stats()["size"] == 2
+    assert [counter.count_tokens(text) for text in texts] == [2, 3, 2, 1]
+
+
+def test_falls_back_to_an_estimate_when_the_tokenizer_cannot_load(monkeypatch):
+    def offline(name):
+        raise OSError("no network")
+
+    monkeypatch.setattr(token_counter_module.tiktoken, "get_encoding", offline)
+    counter = TokenCounter()
+
+    assert counter.count_tokens_batch(["abcdefgh", "abcde"]) == [2, 2]
+    assert counter.tokenizer is None
+    assert isinstance(ContextPacker().token_counter, EstimatedTokenCounter)
@@ -0,0 +1,58 @@
+"""Tests for the TokenOptimizer utilities in claude_agents."""
+
+from packages.agents.claude_agents.utils.token_optimizer import TokenOptimizer
+
+
+def _params():
+    return {
+        "model": "claude-3-opus-20240229",
+        "system": "You are a planner.",
+        "tools": [{"name": "first"}, {"name": "create_plan"}],
+        "messages": [
+            {"role": "user", "content": "Plan the task"},
+            {"role": "assistant", "content": "Here is a plan"},
+            {"role": "user", "content": "Refine it"},
+        ],
+    }
+
+
+def test_apply_prompt_caching_marks_stable_prefix():
+    cached = TokenOptimizer.apply_prompt_caching(_params())
+
+    assert cached["system"] == [
+        {"type": "text", "text": "You are a planner.", "cache_control": {"type": "ephemeral"}}
+    ]
+    assert "cache_control" not in cached["tools"][0]
+    assert cached["tools"][-1]["cache_control"] == {"type": "ephemeral"}
+
+    # Older history is cacheable, the newest turn is not
+    assert cached["messages"][1]["content"][-1]["cache_control"] == {"type": "ephemeral"}
+    assert cached["messages"][-1] == {"role": "user", "content": "Refine it"}
+
+
+def test_apply_prompt_caching_does_not_modify_input():
+    params = _params()
+    TokenOptimizer.apply_prompt_caching(params)
+
+    assert params == _params()
+
+
+def test_apply_prompt_caching_respects_existing_system_breakpoints():
+    params = _params()
+    params["system"] = [
+        {"type": "text", "text": "stable", "cache_control": {"type": "ephemeral"}},
+        {"type": "text", "text": "variable"},
+    ]
+
+    cached = TokenOptimizer.apply_prompt_caching(params)
+
+    assert cached["system"] == params["system"]
+
+
+def test_apply_prompt_caching_single_message_has_no_history_breakpoint():
+    params = {"messages": [{"role": "user", "content": "Hello"}]}
+
+    cached = TokenOptimizer.apply_prompt_caching(params)
+
+    assert cached["messages"] == params["messages"]
+    assert "system" not in cached
@@ -0,0 +1,94 @@
+"""Tests for orchestration tracing and the timeline exporter."""
+
+import time
+from types import SimpleNamespace
+
+from packages.agents.claude_agents.agents.executor import ExecutorAgent
+from packages.agents.claude_agents.monitoring.tracing import TimelineExporter, Tracer
+from packages.agents.claude_agents.orchestration.pipeline import OrchestrationPipeline
+from packages.agents.claude_agents.utils.token_counter import EstimatedTokenCounter
+
+
+class UsageClient:
+    """API client returning responses with usage; prompts mentioning "slowly" take longer."""
+
+    token_counter = EstimatedTokenCounter()
+
+    def send_message(self, messages, **kwargs):
+        if "slowly" in messages[-1]["content"]:
+            time.sleep(0.15)
+        usage = SimpleNamespace(input_tokens=120, output_tokens=30, cache_read_input_tokens=100, cache_creation_input_tokens=0)
+        return SimpleNamespace(content=[SimpleNamespace(text="done")], usage=usage, model="claude-test")
+
+
+class StaticPlanner:
+    def process(self, task):
+        return {
+            "objective": task,
+            "steps": [
+                {"id": "fetch", "description": "Fetch the data slowly", "dependencies": []},
+                {"id": "analyze", "description": "Analyze the data", "dependencies": ["fetch"]},
+                {"id": "notes", "description": "Write notes", "dependencies": []},
+            ],
+        }
+
+    def refine_plan(self, plan, feedback):
+        return plan
+
+
+class SecondTimeCritic:
+    def __init__(self):
+        self.calls = 0
+
+    def process(self, output, requirements=None):
+        self.calls += 1
+        return {"quality_score": 9 if self.calls > 1 else 3, "meets_requirements": self.calls > 1}
+
+
+def test_pipeline_spans_and_timeline():
+    tracer = Tracer(export_to_otel=False)
+    client = UsageClient()
+    pipeline = OrchestrationPipeline(
+        api_client=client,
+        planner=StaticPlanner(),
+        executor=ExecutorAgent(client),
+        critic=SecondTimeCritic(),
+        max_concurrency=2,
+        tracer=tracer,
+    )
+
+    result = pipeline.execute("report")
+    pipeline.close()
+
+    exporter = TimelineExporter(tracer)
+    timeline = exporter.timeline(result["task_id"])
+    names = [span["name"] for span in timeline["spans"]]
+    assert names.count("step") == 6
+    assert {"task", "plan", "execute", "summary", "critique", "refine"} <= set(names)
+
+    steps = [span for span in timeline["spans"] if span["name"] == "step"]
+    first_fetch = next(span for span in steps if span["attributes"]["step.id"] == "fetch")
+    assert first_fetch["attributes"]["prompt_tokens"] == 120
+    assert first_fetch["attributes"]["cache_read_tokens"] == 100
+    assert first_fetch["attributes"]["model"] == "claude-test"
+    assert first_fetch["attributes"]["cache_hit"] is False
+    assert "queue_wait_seconds" in first_fetch["attributes"]
+    # The second iteration reuses the unchanged steps
+    assert [span["attributes"]["cache_hit"] for span in steps[3:]] == [True, True, True]
+
+    first_execution = timeline["executions"][0]
+    assert first_execution["critical_path"] == ["fetch", "analyze"]
+    assert first_execution["idle_worker_seconds"] > 0.05
+
+    flamegraph = exporter.flamegraph(result["task_id"])
+    assert flamegraph["name"] == "task"
+    execute = next(child for child in flamegraph["children"] if child["name"] == "execute")
+    assert "step fetch" in [child["name"] for child in execute["children"]]
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer(enabled=False)
+    with tracer.span("task", trace_id="t") as span:
+        span.set_attributes(status="completed")
+    assert tracer.get_spans("t") == []
+    assert tracer.trace_ids() == []
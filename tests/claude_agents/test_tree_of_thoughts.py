@@ -0,0 +1,69 @@
+"""Tests for the parallel tree-of-thoughts beam search."""
+
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+from packages.agents.claude_agents.patterns.reasoning_patterns import TreeOfThoughtsPattern
+
+
+class BranchingClient:
+    """Client answering branch prompts with their candidate number and scoring paths by their last thought."""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.lock = threading.Lock()
+
+    def send_message(self, messages, **kwargs):
+        with self.lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_flight -= 1
+
+        prompt = messages[-1]["content"]
+        if "This is candidate" in prompt:
+            text = "idea " + re.search(r"candidate (\d+) of", prompt).group(1)
+        elif "Rate how likely" in prompt:
+            # Candidate 2 is the most promising at every level
+            last_thought = prompt.split("Partial reasoning:\n")[1].split("\n\n")[0].splitlines()[-1]
+            text = {"2": "9", "3": "6"}.get(last_thought[-1], "score: 2")
+        else:
+            text = "solution"
+        return SimpleNamespace(content=[SimpleNamespace(text=text)])
+
+
+def test_beam_search_keeps_top_paths_and_scales_with_depth():
+    client = BranchingClient()
+    pattern = TreeOfThoughtsPattern()
+
+    start = time.time()
+    result = pattern.explore(client, "Plan the migration", breadth=4, depth=2, beam_width=2, max_concurrency=8)
+    elapsed = time.time() - start
+
+    assert result["best_path"] == ["idea 2", "idea 2"]
+    assert result["score"] == 9.0
+    assert result["solution"] == "solution"
+    assert [node["path"] for node in result["levels"][0][:2]] == [["idea 2"], ["idea 3"]]
+    assert len(result["levels"][1]) == 8
+    # 4 + 4 calls at the first level, 8 + 8 at the second, plus the solution
+    assert result["api_calls"] == client.calls == 25
+    assert client.peak_in_flight == 8
+    # Five rounds of calls: generate and score per level, then the solution
+    assert elapsed < 25 * client.delay / 2
+
+
+def test_concurrency_budget_limits_calls_in_flight():
+    client = BranchingClient(delay=0.01)
+
+    result = TreeOfThoughtsPattern().explore(client, "Plan", breadth=3, depth=1, max_concurrency=2, complete=False)
+
+    assert client.peak_in_flight == 2
+    assert result["solution"] == ""
+    assert result["api_calls"] == 6
@@ -0,0 +1,84 @@
+"""Tests for exact usage accounting from API responses."""
+
+import pytest
+
+from packages.agents.claude_agents.api.client import ClaudeAPIClient
+from packages.agents.claude_agents.api.optimized_client import OptimizedClaudeClient
+from packages.agents.claude_agents.api.rate_limiter import RateLimiter
+from packages.agents.claude_agents.api.stub_server import StubAnthropicServer
+from packages.agents.claude_agents.monitoring.dashboard import AgentMonitor
+
+
+@pytest.fixture
+def server():
+    with StubAnthropicServer() as stub:
+        yield stub
+
+
+@pytest.fixture
+def monitor(tmp_path):
+    return AgentMonitor(log_dir=str(tmp_path), log_interval=3600)
+
+
+def test_usage_comes_from_response_without_pre_call_tokenization(server, monitor, monkeypatch):
+    client = OptimizedClaudeClient(
+        api_key="test-key",
+        base_url=server.base_url,
+        rate_limiter=RateLimiter(),
+        monitor=monitor,
+    )
+
+    def fail(*args, **kwargs):
+        raise AssertionError("messages should not be tokenized before the call")
+
+    monkeypatch.setattr(client.token_counter, "count_message_tokens", fail)
+
+    response = client.send_message([{"role": "user", "content": "Explain token buckets in detail."}])
+
+    stats = client.get_usage_stats()
+    assert stats["prompt_tokens"] == response.usage.input_tokens
+    assert stats["completion_tokens"] == response.usage.output_tokens
+
+    metrics = monitor.get_current_metrics()["api"]
+    assert metrics["prompt_tokens"] == response.usage.input_tokens
+    assert metrics["total_cost"] == pytest.approx(stats["total_cost"])
+
+
+def test_monitor_records_per_model_histograms(server, monitor):
+    client = ClaudeAPIClient(
+        api_key="test-key",
+        base_url=server.base_url,
+        rate_limiter=RateLimiter(),
+        monitor=monitor,
+    )
+
+    for i in range(3):
+        client.send_message([{"role": "user", "content": f"question {i}"}])
+
+    throughput = monitor.get_model_throughput()[client.model]
+    assert throughput["requests"] == 3
+    assert sum(throughput["latency_histogram"].values()) == 3
+    assert sum(throughput["output_tokens_histogram"].values()) == 3
+    assert throughput["tokens_per_second"] > 0
+
+
+def test_track_api_call_counts_cache_tokens(monitor):
+    monitor.track_api_call(
+        success=True,
+        prompt_tokens=100,
+        completion_tokens=50,
+        model="claude-3-haiku-20240307",
+        response_time=1.5,
+        cost=0.001,
+        cache_creation_tokens=1000,
+        cache_read_tokens=2000,
+    )
+
+    metrics = monitor.get_current_metrics()["api"]
+    assert metrics["cache_creation_input_tokens"] == 1000
+    assert metrics["cache_read_input_tokens"] == 2000
+    assert metrics["total_tokens"] == 3150
+
+    model_stats = metrics["model_stats"]["claude-3-haiku-20240307"]
+    assert model_stats["latency_histogram"]["<=2.0"] == 1
+    assert model_stats["output_tokens_histogram"]["<=64"] == 1